@@ -4,6 +4,7 @@ SmartAgent - Advanced API Server
 שירת API מתקדם עם תכונות חדשות
 """
 
+import gzip
 import json
 import sqlite3
 from http.server import HTTPServer, BaseHTTPRequestHandler
@@ -89,12 +90,17 @@ class SmartAgentAdvancedAPI(BaseHTTPRequestHandler):
 
     def send_json_response(self, data):
         """שליחת תגובה JSON"""
+        body = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
         self.send_response(200)
         self.send_header("Content-type", "application/json; charset=utf-8")
         self.send_header("Access-Control-Allow-Origin", "*")
+        if len(body) >= 1024 and "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body, compresslevel=6)
+            self.send_header("Content-Encoding", "gzip")
+            self.send_header("Vary", "Accept-Encoding")
+        self.send_header("Content-Length", str(len(body)))
         self.end_headers()
-        json_str = json.dumps(data, ensure_ascii=False, indent=2)
-        self.wfile.write(json_str.encode("utf-8"))
+        self.wfile.write(body)
 
     def get_technicians(self):
         """קבלת רשימת טכנאים"""
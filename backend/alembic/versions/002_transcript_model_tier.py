@@ -0,0 +1,25 @@
+"""Record which Whisper tier produced a transcript
+
+Revision ID: 002
+Revises: 001
+Create Date: 2025-09-02 10:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = "002"
+down_revision = "001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # fast, escalated, accurate, streaming
+    op.add_column("transcripts", sa.Column("model_tier", sa.String(length=20), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("transcripts", "model_tier")
@@ -0,0 +1,43 @@
+"""Transactional outbox for Celery tasks
+
+Revision ID: 003
+Revises: 002
+Create Date: 2025-09-08 10:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = "003"
+down_revision = "002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "outbox_messages",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("task_name", sa.String(length=255), nullable=False),
+        sa.Column("args", sa.JSON(), nullable=True),
+        sa.Column("options", sa.JSON(), nullable=True),
+        sa.Column("attempts", sa.Integer(), nullable=True),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("published_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    # The relay only scans unpublished rows
+    op.create_index(
+        "ix_outbox_messages_unpublished",
+        "outbox_messages",
+        ["id"],
+        postgresql_where=sa.text("published_at IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_outbox_messages_unpublished", table_name="outbox_messages")
+    op.drop_table("outbox_messages")
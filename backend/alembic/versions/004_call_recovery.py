@@ -0,0 +1,33 @@
+"""Stuck-call recovery: dead letter status, attempts, queue and claim times
+
+Revision ID: 004
+Revises: 003
+Create Date: 2025-09-10 10:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = "004"
+down_revision = "003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # ALTER TYPE ... ADD VALUE cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TYPE callstatusenum ADD VALUE IF NOT EXISTS 'DEAD_LETTER'")
+
+    op.add_column("calls", sa.Column("recovery_attempts", sa.Integer(), nullable=True))
+    op.add_column("calls", sa.Column("queued_at", sa.DateTime(), nullable=True))
+    op.add_column("calls", sa.Column("claimed_at", sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("calls", "claimed_at")
+    op.drop_column("calls", "queued_at")
+    op.drop_column("calls", "recovery_attempts")
+    # Postgres cannot drop an enum value; DEAD_LETTER stays in the type
@@ -0,0 +1,32 @@
+"""Call priorities and VIP customers
+
+Revision ID: 005
+Revises: 004
+Create Date: 2025-09-11 10:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = "005"
+down_revision = "004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Celery priority, 0 = most urgent; 6 is the normal level
+    op.add_column(
+        "calls", sa.Column("priority", sa.Integer(), nullable=True, server_default="6")
+    )
+    op.add_column(
+        "customers",
+        sa.Column("vip_status", sa.Boolean(), nullable=True, server_default=sa.false()),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("customers", "vip_status")
+    op.drop_column("calls", "priority")
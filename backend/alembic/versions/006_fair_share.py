@@ -0,0 +1,38 @@
+"""Fair-share scheduling: org plans and parked calls
+
+Revision ID: 006
+Revises: 005
+Create Date: 2025-09-12 10:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = "006"
+down_revision = "005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # basic, pro, enterprise
+    op.add_column(
+        "organizations",
+        sa.Column("plan", sa.String(length=20), nullable=True, server_default="basic"),
+    )
+    op.add_column("calls", sa.Column("deferred_at", sa.DateTime(), nullable=True))
+    # The dispatcher only looks at parked calls
+    op.create_index(
+        "ix_calls_deferred",
+        "calls",
+        ["org_id", "priority", "deferred_at"],
+        postgresql_where=sa.text("deferred_at IS NOT NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_calls_deferred", table_name="calls")
+    op.drop_column("calls", "deferred_at")
+    op.drop_column("organizations", "plan")
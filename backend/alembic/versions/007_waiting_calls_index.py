@@ -0,0 +1,30 @@
+"""Index unclaimed calls for the autoscaling snapshot
+
+Revision ID: 007
+Revises: 006
+Create Date: 2025-09-19 10:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = "007"
+down_revision = "006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # The snapshot counts unclaimed calls by status within a lookback
+    op.create_index(
+        "ix_calls_waiting",
+        "calls",
+        ["status", "created_at"],
+        postgresql_where=sa.text("claimed_at IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_calls_waiting", table_name="calls")
@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from app.schemas import AppointmentCreate, AppointmentResponse
 from app import deps, models
+from app.serialization import appointment_serializer, streaming_json_response
 from typing import List
 from datetime import datetime, date
 
@@ -12,10 +13,10 @@ router = APIRouter()
 async def create_appointment(
     appointment_data: AppointmentCreate,
     db: Session = Depends(deps.get_db),
-    current_org: models.Organization = Depends(deps.get_current_org),
+    current_org: deps.OrgContext = Depends(deps.get_current_org),
 ):
     """Create new appointment"""
-    appointment = models.Appointment(org_id=current_org.id, **appointment_data.dict())
+    appointment = models.Appointment(org_id=current_org.id, **appointment_data.model_dump())
     db.add(appointment)
     db.commit()
     db.refresh(appointment)
@@ -29,15 +30,17 @@ async def create_appointment(
 async def list_appointments(
     date_from: str = None,
     date_to: str = None,
-    db: Session = Depends(deps.get_db),
-    current_org: models.Organization = Depends(deps.get_current_org),
+    current_org: deps.OrgContext = Depends(deps.get_current_org),
 ):
-    """List appointments"""
-    query = db.query(models.Appointment).filter(
-        models.Appointment.org_id == current_org.id
-    )
+    """List appointments (streamed as rows are read)"""
+
+    def appointments_query(db: Session):
+        query = db.query(models.Appointment).filter(
+            models.Appointment.org_id == current_org.id
+        )
+
+        # Add date filtering logic here
 
-    # Add date filtering logic here
+        return query.order_by(models.Appointment.start_at)
 
-    appointments = query.order_by(models.Appointment.start_at).all()
-    return appointments
+    return streaming_json_response(deps.SessionLocal, appointments_query, appointment_serializer)
@@ -1,31 +1,125 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.security import HTTPBearer
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from app.schemas import UserRegister, UserLogin, Token
+from typing import List
+from app.schemas import UserRegister, UserLogin, Token, RefreshRequest, SessionResponse
+from app.models import Organization, User, RoleEnum
+from app.redis_client import get_async_redis
+from app.services import auth
+from app.services.sessions import RefreshConflict, SessionError, refresh_token_store
 from app import deps
-import jwt
-from datetime import datetime, timedelta
 
 router = APIRouter()
-security = HTTPBearer()
 
 
 @router.post("/register", response_model=Token)
 async def register(user_data: UserRegister, db: Session = Depends(deps.get_db)):
     """Register new user and organization"""
-    # Implementation here
-    pass
+    taken = await run_in_threadpool(
+        lambda: db.query(User.id).filter(User.email == user_data.email).first()
+    )
+    if taken:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
+
+    password_hash = await auth.hash_password(user_data.password)
+
+    def create_owner():
+        org = Organization(name=user_data.org_name)
+        db.add(org)
+        db.flush()
+        user = User(
+            org_id=org.id,
+            email=user_data.email,
+            password_hash=password_hash,
+            full_name=user_data.full_name,
+            role=RoleEnum.OWNER,
+        )
+        db.add(user)
+        db.commit()
+        return user.id, org.id
+
+    user_id, org_id = await run_in_threadpool(create_owner)
+    return await refresh_token_store.open(user_id, org_id, RoleEnum.OWNER.value, user_data.device_id)
 
 
 @router.post("/login", response_model=Token)
 async def login(user_data: UserLogin, db: Session = Depends(deps.get_db)):
-    """Login user"""
-    # Implementation here
-    pass
+    """Login user (one session per device; logging in again replaces it)"""
+    user = await run_in_threadpool(
+        lambda: db.query(User).filter(User.email == user_data.email).first()
+    )
+    password_ok = await auth.verify_password(user.password_hash if user else None, user_data.password)
+    if not user or not password_ok or not user.is_active:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect email or password")
+
+    # Read before a commit expires them
+    user_id, org_id, role = user.id, user.org_id, user.role.value
+    if auth.needs_rehash(user.password_hash):
+        user.password_hash = await auth.hash_password(user_data.password)
+        await run_in_threadpool(db.commit)
+
+    return await refresh_token_store.open(user_id, org_id, role, user_data.device_id)
 
 
 @router.post("/refresh", response_model=Token)
-async def refresh_token(db: Session = Depends(deps.get_db)):
-    """Refresh access token"""
-    # Implementation here
-    pass
+async def refresh_token(request: RefreshRequest, db: Session = Depends(deps.get_db)):
+    """Refresh access token
+
+    The refresh token is single use: it is rotated and a new pair issued.
+    The user is re-read (one primary-key lookup) so a deactivated user
+    cannot refresh and a changed role reaches the new access token.
+    """
+    try:
+        user_id = refresh_token_store.user_id_of(request.refresh_token)
+        user = await run_in_threadpool(
+            lambda: db.query(User.is_active, User.role).filter(User.id == user_id).first()
+        )
+        if user is None or not user.is_active:
+            await refresh_token_store.revoke_user(user_id)
+            raise SessionError("user is inactive")
+        return await refresh_token_store.rotate(request.refresh_token, role=user.role.value)
+    except RefreshConflict as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except SessionError as e:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=f"Invalid token: {e}")
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(current_user: auth.CurrentUser = Depends(deps.get_current_user)):
+    """Revoke the current access token and end this device's session"""
+    await auth.revoke(get_async_redis(), current_user.jti, current_user.expires_at)
+    if current_user.session_id:
+        await refresh_token_store.end(current_user.id, current_user.session_id)
+
+
+@router.get("/sessions", response_model=List[SessionResponse])
+async def list_sessions(current_user: auth.CurrentUser = Depends(deps.get_current_user)):
+    """Devices the current user is logged in on"""
+    return await refresh_token_store.list_sessions(current_user.id)
+
+
+@router.post("/sessions/revoke")
+async def revoke_my_sessions(current_user: auth.CurrentUser = Depends(deps.get_current_user)):
+    """Log the current user out on every device"""
+    return {"revoked": await refresh_token_store.revoke_user(current_user.id)}
+
+
+@router.post("/users/{user_id}/sessions/revoke")
+async def revoke_user_sessions(
+    user_id: int,
+    db: Session = Depends(deps.get_db),
+    current_user: auth.CurrentUser = Depends(deps.require_role(RoleEnum.OWNER.value, RoleEnum.ADMIN.value)),
+):
+    """Log a user of the current org out on every device"""
+    user = db.query(User.id).filter(User.id == user_id, User.org_id == current_user.org_id).first()
+    if not user:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    return {"revoked": await refresh_token_store.revoke_user(user_id)}
+
+
+@router.post("/org/sessions/revoke")
+async def revoke_org_sessions(
+    current_user: auth.CurrentUser = Depends(deps.require_role(RoleEnum.OWNER.value)),
+):
+    """Log every user of the current org out on every device"""
+    return {"revoked": await refresh_token_store.revoke_org(current_user.org_id)}
@@ -1,46 +1,63 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Request
 from sqlalchemy.orm import Session
+from app.schemas import AgendaResponse
 from app import deps, models
+from app.serialization import appointment_serializer, followup_serializer
+from app.services.response_cache import response_cache
 from typing import List
-from datetime import date
+from datetime import date, timedelta
 
 router = APIRouter()
 
 
-@router.get("/agenda")
+@router.get("/agenda", response_model=AgendaResponse)
 async def get_agenda(
+    request: Request,
     day: date = Query(..., description="Date in YYYY-MM-DD format"),
     db: Session = Depends(deps.get_db),
-    current_org: models.Organization = Depends(deps.get_current_org),
+    current_org: deps.OrgContext = Depends(deps.get_current_org),
 ):
-    """Get daily agenda with appointments and follow-ups"""
-
-    # Get appointments for the day
-    appointments = (
-        db.query(models.Appointment)
-        .filter(
-            models.Appointment.org_id == current_org.id,
-            models.Appointment.start_at >= day,
-            models.Appointment.start_at < day.replace(day=day.day + 1),
+    """Get daily agenda with appointments and follow-ups
+
+    ETag; a matching If-None-Match gets 304.
+    """
+    next_day = day + timedelta(days=1)
+
+    def load_agenda():
+        # Get appointments for the day
+        appointments = (
+            db.query(models.Appointment)
+            .filter(
+                models.Appointment.org_id == current_org.id,
+                models.Appointment.start_at >= day,
+                models.Appointment.start_at < next_day,
+            )
+            .order_by(models.Appointment.start_at)
+            .all()
         )
-        .order_by(models.Appointment.start_at)
-        .all()
-    )
 
-    # Get follow-ups due for the day
-    followups = (
-        db.query(models.Followup)
-        .filter(
-            models.Followup.org_id == current_org.id,
-            models.Followup.due_at >= day,
-            models.Followup.due_at < day.replace(day=day.day + 1),
-            models.Followup.is_completed == False,
+        # Get follow-ups due for the day
+        followups = (
+            db.query(models.Followup)
+            .filter(
+                models.Followup.org_id == current_org.id,
+                models.Followup.due_at >= day,
+                models.Followup.due_at < next_day,
+                models.Followup.is_completed == False,
+            )
+            .order_by(models.Followup.due_at)
+            .all()
         )
-        .order_by(models.Followup.due_at)
-        .all()
-    )
 
-    return {"date": day, "appointments": appointments, "followups": followups}
+        return {
+            "date": day,
+            "appointments": appointment_serializer.many(appointments),
+            "followups": followup_serializer.many(followups),
+        }
+
+    return await response_cache.respond(
+        request, current_org.id, ("appointments", "followups"), load_agenda
+    )
 
 
 @router.post("/webhooks/calendar")
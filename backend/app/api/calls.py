@@ -1,20 +1,69 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
-from sqlalchemy.orm import Session
-from app.schemas import CallWebhook, CallResponse
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Request,
+    UploadFile,
+    File,
+    WebSocket,
+    WebSocketDisconnect,
+)
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy.orm import Session, selectinload
+from app.schemas import CallWebhook, CallResponse, call_webhook_adapter
 from app import deps, models
-from worker.tasks import transcribe_call
+from app.config import settings
+from app.serialization import ORJSONResponse, call_serializer, streaming_json_response
+from app.logging import get_logger, new_correlation_id, set_correlation_id
+from app.services.auth import TokenError, create_media_stream_token, verify_media_stream_token
+from app.services import streaming
+from app.services.events import call_status_broadcaster, publish_call_status_async
+from app.services.live_updates import live_updates
+from app.services.outbox import enqueue_task, TASK_TRANSCRIBE_CALL, TASK_EXTRACT_INFO
+from app.services.fair_share import STAGE_EXTRACT, STAGE_TRANSCRIBE
+from app.services.queue_metrics import record_arrival
+from app.services.response_cache import response_cache
+from app.services.priority import (
+    call_priority,
+    extraction_priority,
+    PRIORITY_NORMAL,
+)
 from typing import List
+from datetime import datetime
+import asyncio
+import json
+
+logger = get_logger(__name__)
 
 router = APIRouter()
 
 
-@router.post("/webhook/twilio")
+@router.post(
+    "/webhook/twilio",
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": CallWebhook.model_json_schema(by_alias=True)}
+            },
+        }
+    },
+)
 async def twilio_webhook(
-    webhook_data: CallWebhook,
+    request: Request,
     db: Session = Depends(deps.get_db),
-    current_org: models.Organization = Depends(deps.get_current_org),
+    current_org: deps.OrgContext = Depends(deps.get_current_org),
 ):
     """Receive webhook from Twilio with call recording"""
+    # Validated straight from the body bytes, without a json.loads pass
+    try:
+        webhook_data = call_webhook_adapter.validate_json(await request.body())
+    except ValidationError as e:
+        raise RequestValidationError(e.errors(include_url=False))
+
     # Create call record
     call = models.Call(
         org_id=current_org.id,
@@ -24,23 +73,313 @@ async def twilio_webhook(
         audio_url=webhook_data.recordingUrl,
         duration_seconds=webhook_data.duration,
         status=models.CallStatusEnum.PENDING_TRANSCRIPTION,
+        priority=call_priority(db, current_org.id, webhook_data.from_),
     )
     db.add(call)
-    db.commit()
-    db.refresh(call)
+    db.flush()
 
-    # Enqueue transcription task
-    transcribe_call.delay(call.id)
+    # Transcription is enqueued through the outbox, in the same transaction
+    enqueue_task(db, TASK_TRANSCRIBE_CALL, call.id, priority=call.priority)
+    db.commit()
+    record_arrival(STAGE_TRANSCRIBE)
+    await publish_call_status_async(
+        current_org.id, call.id, models.CallStatusEnum.PENDING_TRANSCRIPTION
+    )
 
     return {"message": "Call received", "call_id": call.id}
 
 
+SSE_KEEPALIVE_SECONDS = 15
+
+
+@router.get("/events")
+async def call_status_events(
+    current_org: deps.OrgContext = Depends(deps.get_current_org),
+):
+    """Server-sent events stream of call status changes for the org"""
+    org_id = current_org.id
+
+    async def event_stream():
+        queue = call_status_broadcaster.subscribe(org_id)
+        try:
+            while True:
+                try:
+                    message = await asyncio.wait_for(
+                        queue.get(), timeout=SSE_KEEPALIVE_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    # Comment line keeps proxies from closing an idle stream
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: call_status\ndata: {json.dumps(message)}\n\n"
+        finally:
+            call_status_broadcaster.unsubscribe(org_id, queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/events/ws")
+async def call_status_events_ws(
+    websocket: WebSocket,
+    current_org: deps.OrgContext = Depends(deps.get_current_org),
+):
+    """WebSocket stream of call status changes for the org"""
+    await websocket.accept()
+    queue = call_status_broadcaster.subscribe(current_org.id)
+    try:
+        while True:
+            await websocket.send_json(await queue.get())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        call_status_broadcaster.unsubscribe(current_org.id, queue)
+
+
+@router.post("/stream/token")
+async def create_stream_token(current_org: deps.OrgContext = Depends(deps.get_current_org)):
+    """Signed org token for the TwiML <Stream> of live calls
+
+    Pass it as the `token` custom parameter:
+    <Stream url="wss://.../calls/stream/twilio"><Parameter name="token" value="..."/></Stream>
+    """
+    return {
+        "token": create_media_stream_token(current_org.id),
+        "expires_in": settings.media_stream_token_expire_minutes * 60,
+    }
+
+
+WS_BAD_REQUEST = 4400
+WS_UNAUTHORIZED = 4401
+
+
+@router.websocket("/stream/twilio")
+async def twilio_media_stream(websocket: WebSocket):
+    """Live call audio from Twilio Media Streams
+
+    The TwiML <Stream> must pass a token from POST /calls/stream/token as
+    its `token` custom parameter; the call is created in the org the token
+    was issued for. Partial transcripts and extraction updates are
+    published to `live_updates` while the call is running; when the stream
+    stops the final transcript is saved and handed to extraction.
+    """
+    # WebSocket routes bypass the HTTP middleware; one ID for the whole call
+    set_correlation_id(websocket.headers.get("X-Request-ID") or new_correlation_id())
+    await websocket.accept()
+    session = None
+    finished = False
+
+    try:
+        while True:
+            try:
+                message = json.loads(await websocket.receive_text())
+            except WebSocketDisconnect:
+                break
+            event = message.get("event")
+
+            if event == "start" and session is None:
+                start = message.get("start") or {}
+                try:
+                    token = start["customParameters"]["token"]
+                    call_sid, stream_sid = start["callSid"], start["streamSid"]
+                except (KeyError, TypeError) as e:
+                    logger.warning("Media stream start without %s", e)
+                    await websocket.close(code=WS_BAD_REQUEST, reason=f"Missing {e}")
+                    return
+                try:
+                    org_id = verify_media_stream_token(token)
+                except TokenError as e:
+                    logger.warning("Media stream rejected: %s", e)
+                    await websocket.close(code=WS_UNAUTHORIZED, reason="Invalid stream token")
+                    return
+
+                call_id, status = await run_in_threadpool(_create_stream_call, org_id, call_sid)
+                await publish_call_status_async(org_id, call_id, status)
+
+                session = await run_in_threadpool(
+                    streaming.MediaStreamSession, org_id, call_sid, stream_sid
+                )
+                session.call_id = call_id
+
+            elif event == "media" and session:
+                update = await run_in_threadpool(
+                    session.handle_media, message["media"]["payload"]
+                )
+                if update:
+                    changed = update.pop("extraction_changed")
+                    await live_updates.publish(
+                        session.call_id, session.org_id, "transcript", update
+                    )
+                    if changed:
+                        await _publish_extraction(session, changed, "rules")
+                    if session.llm_task is None and session.extractor.needs_llm():
+                        session.llm_task = asyncio.create_task(
+                            _refresh_live_extraction(session)
+                        )
+
+            elif event == "stop":
+                break
+
+        if session is None:
+            return
+
+        # Final decode of the remaining audio, then continue the normal pipeline
+        text, confidence = await run_in_threadpool(session.transcriber.finish)
+        transcript_id, status = await run_in_threadpool(
+            _finish_stream_call, session, text, confidence
+        )
+        finished = True
+        record_arrival(STAGE_EXTRACT)
+        await publish_call_status_async(session.org_id, session.call_id, status)
+    finally:
+        # Also on errors: the call's live state must not outlive the stream.
+        # A call that was not handed on is resumed by the reaper.
+        if session is not None:
+            if session.llm_task:
+                session.llm_task.cancel()
+            await live_updates.close(
+                session.call_id,
+                session.org_id,
+                {"transcript_id": transcript_id} if finished else {"error": "stream ended"},
+            )
+
+
+def _create_stream_call(org_id: int, call_sid: str):
+    # Short sessions: the stream lasts as long as the phone call
+    db = deps.SessionLocal()
+    try:
+        call = models.Call(
+            org_id=org_id,
+            call_sid=call_sid,
+            status=models.CallStatusEnum.TRANSCRIBING,
+            claimed_at=datetime.utcnow(),
+        )
+        db.add(call)
+        db.commit()
+        return call.id, call.status
+    finally:
+        db.close()
+
+
+def _finish_stream_call(session, text: str, confidence: float):
+    """Save the final transcript and enqueue extraction (one transaction)"""
+    db = deps.SessionLocal()
+    try:
+        transcript = models.Transcript(
+            org_id=session.org_id,
+            call_id=session.call_id,
+            text=text,
+            confidence=confidence,
+            model_tier=streaming.TIER_STREAMING,
+        )
+        db.add(transcript)
+        call = db.query(models.Call).filter(models.Call.id == session.call_id).first()
+        call.status = models.CallStatusEnum.EXTRACTING
+        call.priority = extraction_priority(call.priority or PRIORITY_NORMAL, text)
+        call.claimed_at = None
+        call.queued_at = datetime.utcnow()
+        db.flush()
+        enqueue_task(db, TASK_EXTRACT_INFO, transcript.id, priority=call.priority)
+        db.commit()
+        return transcript.id, call.status
+    finally:
+        db.close()
+
+
+async def _publish_extraction(session, changed: list, source: str):
+    await live_updates.publish(
+        session.call_id,
+        session.org_id,
+        "extraction",
+        {
+            "changed": changed,
+            "source": source,
+            "result": session.extractor.result.model_dump(),
+        },
+    )
+
+
+async def _refresh_live_extraction(session):
+    """Run an LLM pass off the event loop and publish what it changed"""
+    try:
+        changed = await run_in_threadpool(session.extractor.refresh_with_llm)
+        if changed:
+            await _publish_extraction(session, changed, "llm")
+    finally:
+        session.llm_task = None
+
+
+@router.get("/{call_id}/live")
+async def get_live_state(
+    call_id: int,
+    current_org: deps.OrgContext = Depends(deps.get_current_org),
+):
+    """Latest transcript and extraction of a call that is still in progress"""
+    snapshot = await live_updates.latest(call_id)
+    if not snapshot or snapshot["org_id"] != current_org.id:
+        raise HTTPException(status_code=404, detail="No live data for call")
+
+    return {"call_id": call_id, **snapshot}
+
+
+@router.websocket("/{call_id}/live/ws")
+async def subscribe_live_updates(
+    websocket: WebSocket,
+    call_id: int,
+    current_org: deps.OrgContext = Depends(deps.get_current_org),
+):
+    """Push partial transcripts and job card updates while the call is live"""
+    snapshot = await live_updates.latest(call_id)
+    if not snapshot or snapshot["org_id"] != current_org.id:
+        await websocket.close(code=4404)
+        return
+
+    await websocket.accept()
+    queue = live_updates.subscribe(call_id)
+    try:
+        for kind in ("transcript", "extraction"):
+            if kind in snapshot:
+                await websocket.send_json({"type": kind, "call_id": call_id, **snapshot[kind]})
+        while True:
+            message = await queue.get()
+            await websocket.send_json(message)
+            if message["type"] == "closed":
+                break
+    except WebSocketDisconnect:
+        pass
+    finally:
+        live_updates.unsubscribe(call_id, queue)
+
+
+@router.get("/export", response_model=List[CallResponse])
+async def export_calls(
+    since: datetime = None,
+    current_org: deps.OrgContext = Depends(deps.get_current_org),
+):
+    """All calls of the org (optionally since a time), streamed as rows are read"""
+
+    def calls_query(db: Session):
+        query = (
+            db.query(models.Call)
+            .filter(models.Call.org_id == current_org.id)
+            .options(selectinload(models.Call.customer))
+        )
+        if since:
+            query = query.filter(models.Call.created_at >= since)
+        return query.order_by(models.Call.created_at)
+
+    return streaming_json_response(deps.SessionLocal, calls_query, call_serializer)
+
+
 @router.post("/upload", response_model=CallResponse)
 async def upload_call(
     audio: UploadFile = File(...),
     customer_id: int = None,
     db: Session = Depends(deps.get_db),
-    current_org: models.Organization = Depends(deps.get_current_org),
+    current_org: deps.OrgContext = Depends(deps.get_current_org),
 ):
     """Manual upload of call recording"""
     # Save file to S3, create call record, enqueue transcription
@@ -51,20 +390,27 @@ async def upload_call(
 @router.get("/{call_id}", response_model=CallResponse)
 async def get_call(
     call_id: int,
+    request: Request,
     db: Session = Depends(deps.get_db),
-    current_org: models.Organization = Depends(deps.get_current_org),
+    current_org: deps.OrgContext = Depends(deps.get_current_org),
 ):
-    """Get call details"""
-    call = (
-        db.query(models.Call)
-        .filter(models.Call.id == call_id, models.Call.org_id == current_org.id)
-        .first()
-    )
+    """Get call details (ETag; a matching If-None-Match gets 304)"""
 
-    if not call:
-        raise HTTPException(status_code=404, detail="Call not found")
+    def load_call():
+        call = (
+            db.query(models.Call)
+            .filter(models.Call.id == call_id, models.Call.org_id == current_org.id)
+            .first()
+        )
 
-    return call
+        if not call:
+            raise HTTPException(status_code=404, detail="Call not found")
+
+        return call_serializer.one(call)
+
+    return await response_cache.respond(
+        request, current_org.id, ("calls", "customers"), load_call
+    )
 
 
 @router.get("/", response_model=List[CallResponse])
@@ -72,7 +418,7 @@ async def list_calls(
     date_from: str = None,
     date_to: str = None,
     db: Session = Depends(deps.get_db),
-    current_org: models.Organization = Depends(deps.get_current_org),
+    current_org: deps.OrgContext = Depends(deps.get_current_org),
 ):
     """List calls with optional date filtering"""
     query = db.query(models.Call).filter(models.Call.org_id == current_org.id)
@@ -80,4 +426,4 @@ async def list_calls(
     # Add date filtering logic here
 
     calls = query.order_by(models.Call.created_at.desc()).limit(100).all()
-    return calls
+    return ORJSONResponse(call_serializer.many(calls))
@@ -1,6 +1,10 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 from sqlalchemy.orm import Session
+from app.schemas import IntegrationResponse
 from app import deps, models
+from app.serialization import integration_serializer
+from app.services.response_cache import response_cache
+from typing import List
 
 router = APIRouter()
 
@@ -8,7 +12,7 @@ router = APIRouter()
 @router.post("/google/connect")
 async def connect_google_calendar(
     db: Session = Depends(deps.get_db),
-    current_org: models.Organization = Depends(deps.get_current_org),
+    current_org: deps.OrgContext = Depends(deps.get_current_org),
 ):
     """Start Google Calendar OAuth flow"""
     # Implementation for Google OAuth
@@ -18,26 +22,34 @@ async def connect_google_calendar(
 @router.post("/outlook/connect")
 async def connect_outlook_calendar(
     db: Session = Depends(deps.get_db),
-    current_org: models.Organization = Depends(deps.get_current_org),
+    current_org: deps.OrgContext = Depends(deps.get_current_org),
 ):
     """Start Outlook Calendar OAuth flow"""
     # Implementation for Outlook OAuth
     pass
 
 
-@router.get("/")
+@router.get("/", response_model=List[IntegrationResponse])
 async def list_integrations(
+    request: Request,
     db: Session = Depends(deps.get_db),
-    current_org: models.Organization = Depends(deps.get_current_org),
+    current_org: deps.OrgContext = Depends(deps.get_current_org),
 ):
-    """List active integrations"""
-    integrations = (
-        db.query(models.Integration)
-        .filter(
-            models.Integration.org_id == current_org.id,
-            models.Integration.is_active == True,
+    """List active integrations (ETag; a matching If-None-Match gets 304)"""
+
+    def load_integrations():
+        integrations = (
+            db.query(models.Integration)
+            .filter(
+                models.Integration.org_id == current_org.id,
+                models.Integration.is_active == True,
+            )
+            .all()
         )
-        .all()
-    )
 
-    return integrations
+        # Never the stored config - it holds the provider tokens
+        return integration_serializer.many(integrations)
+
+    return await response_cache.respond(
+        request, current_org.id, ("integrations",), load_integrations
+    )
@@ -1,7 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy.orm import Session, selectinload
 from app.schemas import JobCreate, JobResponse
 from app import deps, models
+from app.serialization import job_serializer, streaming_json_response
+from app.services.response_cache import response_cache
 from typing import List
 
 router = APIRouter()
@@ -11,10 +13,10 @@ router = APIRouter()
 async def create_job(
     job_data: JobCreate,
     db: Session = Depends(deps.get_db),
-    current_org: models.Organization = Depends(deps.get_current_org),
+    current_org: deps.OrgContext = Depends(deps.get_current_org),
 ):
     """Create new job/service ticket"""
-    job = models.Job(org_id=current_org.id, **job_data.dict())
+    job = models.Job(org_id=current_org.id, **job_data.model_dump())
     db.add(job)
     db.commit()
     db.refresh(job)
@@ -25,35 +27,46 @@ async def create_job(
 async def list_jobs(
     status: str = None,
     q: str = None,
-    db: Session = Depends(deps.get_db),
-    current_org: models.Organization = Depends(deps.get_current_org),
+    current_org: deps.OrgContext = Depends(deps.get_current_org),
 ):
-    """List jobs with filtering"""
-    query = db.query(models.Job).filter(models.Job.org_id == current_org.id)
+    """List jobs with filtering (streamed as rows are read)"""
+
+    def jobs_query(db: Session):
+        query = (
+            db.query(models.Job)
+            .filter(models.Job.org_id == current_org.id)
+            .options(selectinload(models.Job.customer))
+        )
+
+        if status:
+            query = query.filter(models.Job.status == status)
 
-    if status:
-        query = query.filter(models.Job.status == status)
+        # Add search logic for 'q' parameter
 
-    # Add search logic for 'q' parameter
+        return query.order_by(models.Job.created_at.desc())
 
-    jobs = query.order_by(models.Job.created_at.desc()).all()
-    return jobs
+    return streaming_json_response(deps.SessionLocal, jobs_query, job_serializer)
 
 
 @router.get("/{job_id}", response_model=JobResponse)
 async def get_job(
     job_id: int,
+    request: Request,
     db: Session = Depends(deps.get_db),
-    current_org: models.Organization = Depends(deps.get_current_org),
+    current_org: deps.OrgContext = Depends(deps.get_current_org),
 ):
-    """Get job details"""
-    job = (
-        db.query(models.Job)
-        .filter(models.Job.id == job_id, models.Job.org_id == current_org.id)
-        .first()
-    )
+    """Get job details (ETag; a matching If-None-Match gets 304)"""
 
-    if not job:
-        raise HTTPException(status_code=404, detail="Job not found")
+    def load_job():
+        job = (
+            db.query(models.Job)
+            .filter(models.Job.id == job_id, models.Job.org_id == current_org.id)
+            .first()
+        )
 
-    return job
+        if not job:
+            raise HTTPException(status_code=404, detail="Job not found")
+
+        return job_serializer.one(job)
+
+    return await response_cache.respond(request, current_org.id, ("jobs", "customers"), load_job)
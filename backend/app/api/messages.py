@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 from app.schemas import MessageSend, MessageResponse
 from app import deps, models
+from app.serialization import message_serializer, streaming_json_response
 from typing import List
 
 router = APIRouter()
@@ -11,7 +12,7 @@ router = APIRouter()
 async def send_sms(
     message_data: MessageSend,
     db: Session = Depends(deps.get_db),
-    current_org: models.Organization = Depends(deps.get_current_org),
+    current_org: deps.OrgContext = Depends(deps.get_current_org),
 ):
     """Send SMS message"""
     # Implementation for SMS sending via Twilio
@@ -22,7 +23,7 @@ async def send_sms(
 async def send_whatsapp(
     message_data: MessageSend,
     db: Session = Depends(deps.get_db),
-    current_org: models.Organization = Depends(deps.get_current_org),
+    current_org: deps.OrgContext = Depends(deps.get_current_org),
 ):
     """Send WhatsApp message"""
     # Implementation for WhatsApp sending
@@ -32,14 +33,16 @@ async def send_whatsapp(
 @router.get("/", response_model=List[MessageResponse])
 async def list_messages(
     customer_id: int = None,
-    db: Session = Depends(deps.get_db),
-    current_org: models.Organization = Depends(deps.get_current_org),
+    current_org: deps.OrgContext = Depends(deps.get_current_org),
 ):
-    """List sent messages"""
-    query = db.query(models.Message).filter(models.Message.org_id == current_org.id)
+    """List sent messages (streamed as rows are read)"""
+
+    def messages_query(db: Session):
+        query = db.query(models.Message).filter(models.Message.org_id == current_org.id)
+
+        if customer_id:
+            query = query.filter(models.Message.customer_id == customer_id)
 
-    if customer_id:
-        query = query.filter(models.Message.customer_id == customer_id)
+        return query.order_by(models.Message.created_at.desc())
 
-    messages = query.order_by(models.Message.created_at.desc()).all()
-    return messages
+    return streaming_json_response(deps.SessionLocal, messages_query, message_serializer)
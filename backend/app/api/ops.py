@@ -0,0 +1,67 @@
+from fastapi import APIRouter, Depends, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response
+from prometheus_client import CollectorRegistry, CONTENT_TYPE_LATEST, generate_latest
+from sqlalchemy.orm import Session
+from app import deps
+from app.models import RoleEnum
+from app.services.auth import CurrentUser
+from app.services.failures import failure_counts
+from app.services.fair_share import queue_depths
+from app.services.queue_metrics import autoscaling_snapshot, SnapshotCollector
+
+# An org's own operational data is for its owners and admins
+require_operator = deps.require_role(RoleEnum.OWNER.value, RoleEnum.ADMIN.value)
+
+# Every user registers as the owner of a new org, so data across orgs needs
+# the platform's service token instead
+org_router = APIRouter(dependencies=[Depends(require_operator)])
+platform_router = APIRouter(dependencies=[Depends(deps.require_ops_token)])
+
+
+@org_router.get("/failures")
+async def get_failure_counts(
+    days: int = Query(1, ge=1, le=7),
+    current_user: CurrentUser = Depends(require_operator),
+):
+    """The caller's org: worker task failure counts by task, cause and outcome"""
+    counts = await run_in_threadpool(failure_counts, days, org_id=current_user.org_id)
+    return {"days": days, "failures": counts}
+
+
+@org_router.get("/queues")
+async def get_queue_depths(
+    db: Session = Depends(deps.get_db),
+    current_user: CurrentUser = Depends(require_operator),
+):
+    """The caller's org: calls in each pipeline stage and worker slots in use"""
+    depths = await run_in_threadpool(queue_depths, db, org_id=current_user.org_id)
+    return {"queues": depths}
+
+
+@platform_router.get("/fleet/failures")
+async def get_fleet_failure_counts(days: int = Query(1, ge=1, le=7)):
+    """Worker task failure counts of every org"""
+    counts = await run_in_threadpool(failure_counts, days)
+    return {"days": days, "failures": counts}
+
+
+@platform_router.get("/autoscaling")
+async def get_autoscaling(db: Session = Depends(deps.get_db)):
+    """Per-stage queue depth, rates, service time and recommended workers"""
+    stages = await run_in_threadpool(autoscaling_snapshot, db)
+    return {"stages": stages}
+
+
+@platform_router.get("/autoscaling/metrics")
+async def get_autoscaling_metrics(db: Session = Depends(deps.get_db)):
+    """The autoscaling signals in Prometheus text format"""
+    stages = await run_in_threadpool(autoscaling_snapshot, db)
+    registry = CollectorRegistry()
+    registry.register(SnapshotCollector(stages))
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+
+
+router = APIRouter()
+router.include_router(org_router)
+router.include_router(platform_router)
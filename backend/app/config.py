@@ -1,5 +1,6 @@
 import os
-from pydantic import BaseSettings
+from typing import Any, Dict, List, Optional
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
@@ -24,12 +25,147 @@ class Settings(BaseSettings):
     jwt_algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
     refresh_token_expire_days: int = 7
+    # Lifetime of the signed org token a TwiML <Stream> passes to
+    # /calls/stream/twilio; checked when the stream starts
+    media_stream_token_expire_minutes: int = 60
+    # argon2id parameters - memory per hash is argon2_memory_cost_kib
+    argon2_time_cost: int = 3
+    argon2_memory_cost_kib: int = 65536
+    argon2_parallelism: int = 2
+    password_hash_workers: int = 4  # concurrent hashes per API process
+    org_settings_cache_seconds: float = 60.0
+    org_settings_cache_size: int = 10000
+    # A refresh token that was just rotated is answered with 409 instead of
+    # being treated as reuse, so concurrent refreshes from one device do
+    # not end its session
+    refresh_reuse_grace_seconds: float = 10.0
+    # "redis", or "fake" to keep sessions in an in-process fakeredis
+    # (local runs and tests)
+    session_store_backend: str = "redis"
+    # Static bearer token of platform operators and scrapers (Prometheus,
+    # the autoscaler) for the fleet-wide /ops endpoints; empty disables them
+    ops_service_token: str = ""
 
     # External APIs
     openai_api_key: str = ""
     twilio_account_sid: str = ""
     twilio_auth_token: str = ""
 
+    # Timeouts for external calls
+    llm_timeout_seconds: float = 60.0
+    audio_download_timeout_seconds: float = 30.0
+
+    # Worker retry policy
+    task_max_retries: int = 5
+    task_retry_backoff_max_seconds: int = 600
+    transcribe_rate_limit: str = "30/m"  # per worker process
+    extract_rate_limit: str = "60/m"
+
+    # Transcription engine: whisper, faster_whisper, fake, or stub (simulated
+    # latency, for load tests)
+    transcription_backend: str = "whisper"
+    faster_whisper_compute_type: str = "int8"
+    faster_whisper_cpu_threads: int = 0  # 0 = let CTranslate2 decide
+    faster_whisper_beam_size: int = 5
+    transcription_stub_rtf_scale: float = 1.0
+    transcription_stub_weak_ratio: float = 0.0
+
+    # Transcription cascade
+    whisper_fast_model: str = "tiny"
+    whisper_accurate_model: str = "small"
+    transcription_language: str = "he"
+    cascade_enabled: bool = True
+    cascade_min_segment_confidence: float = 0.6
+    cascade_max_escalated_ratio: float = 0.5
+    # Per-org overrides, e.g. {"12": {"accurate_model": "medium"}}
+    cascade_org_overrides: Dict[str, Dict[str, Any]] = {}
+
+    # Live call streaming (sliding-window decoder)
+    streaming_step_seconds: float = 2.0
+    streaming_max_window_seconds: float = 15.0
+    streaming_commit_margin_seconds: float = 1.0
+    # Outbox relay
+    outbox_relay_batch_size: int = 100
+    outbox_relay_poll_seconds: float = 0.2
+    outbox_retention_days: int = 7
+
+    # Stuck-call reaper - seconds a worker may hold a call in a status,
+    # and how long a queued call may wait before its message counts as lost
+    call_sla_transcribing_seconds: int = 1800
+    call_sla_extracting_seconds: int = 600
+    call_sla_queued_seconds: int = 21600
+    call_reaper_lookback_hours: int = 48
+    call_max_recovery_attempts: int = 3
+
+    # Priority scheduling
+    priority_cache_ttl_seconds: int = 600
+    priority_aging_seconds: int = 120  # wait before a queued call is promoted
+
+    # Fair-share scheduling - per-org limits, scaled by the plan weight
+    fair_share_plan_weights: Dict[str, float] = {"basic": 1.0, "pro": 2.0, "enterprise": 4.0}
+    fair_share_tokens_per_minute: float = 20.0
+    fair_share_burst: float = 10.0
+    fair_share_max_concurrency: int = 2
+    fair_share_lease_seconds: int = 1200  # matches the worker task_time_limit
+    fair_share_retry_seconds: float = 5.0
+
+    # Autoscaling signals (Little's law over a recent window)
+    autoscale_window_minutes: int = 5
+    autoscale_target_utilization: float = 0.7
+    autoscale_drain_seconds: float = 300.0  # clear a backlog within this time
+    autoscale_transcribe_concurrency: int = 1  # tasks per transcription worker
+    autoscale_extract_concurrency: int = 4
+    autoscale_min_workers: int = 1
+    autoscale_max_workers: int = 20
+
+    # Logging
+    log_level: str = "INFO"
+    log_json: bool = True
+    # Fraction of sub-WARNING records kept per logger (and its children)
+    log_sample_rates: Dict[str, float] = {
+        "app.services.streaming": 0.1,
+        "app.services.live_updates": 0.1,
+    }
+
+    # Readiness checks
+    health_ready_checks: List[str] = ["postgres", "redis", "minio", "whisper"]
+    health_probe_timeout_seconds: float = 1.0
+    health_cache_seconds: float = 5.0
+
+    # Metrics - port of the worker's scrape endpoint
+    worker_metrics_port: int = 9808
+
+    # Tracing - exporter is one of otlp, console, file, none
+    otel_exporter: str = "none"
+    otel_exporter_otlp_endpoint: str = "http://otel-collector:4318/v1/traces"
+    otel_file_path: str = "traces.jsonl"
+    otel_sample_ratio: float = 1.0
+
+    # Response cache - cached bodies of read endpoints, revalidated by ETag
+    response_cache_seconds: int = 300
+
+    # Response compression - smaller bodies are sent as they are
+    compression_minimum_size: int = 1024
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 4  # 0-11; higher costs much more CPU
+
+    # LLM prompt budget - longer (compacted) transcripts are extracted in
+    # chunks of llm_chunk_tokens, which keeps a prompt and its reply within
+    # a 4k context; the reply allowance is the size of the expected JSON
+    # plus llm_output_slack_tokens for the values
+    llm_chunk_tokens: int = 3000
+    llm_output_slack_tokens: int = 250
+    llm_summary_tokens: int = 200
+    # "openai", or "stub" / "replay" to run without the API (benchmarks,
+    # load tests); the stub sleeps for its modelled latency when asked to
+    llm_backend: str = "openai"
+    llm_recordings_path: str = "llm_recordings.json"
+    llm_stub_sleep: bool = False
+
+    # Incremental extraction - when a live call justifies another LLM pass
+    incremental_llm_min_new_words: int = 30
+    incremental_llm_min_interval_seconds: float = 8.0
+
     @property
     def database_url(self) -> str:
         return f"postgresql://{self.postgres_user}:{self.postgres_password}@{self.postgres_host}:{self.postgres_port}/{self.postgres_db}"
@@ -38,8 +174,21 @@ class Settings(BaseSettings):
     def redis_url(self) -> str:
         return f"redis://{self.redis_host}:{self.redis_port}/0"
 
-    class Config:
-        env_file = ".env"
+    def cascade_policy(self, org_id: Optional[int] = None) -> Dict[str, Any]:
+        """Transcription cascade policy for an org, with overrides applied"""
+        policy = {
+            "enabled": self.cascade_enabled,
+            "fast_model": self.whisper_fast_model,
+            "accurate_model": self.whisper_accurate_model,
+            "language": self.transcription_language,
+            "min_segment_confidence": self.cascade_min_segment_confidence,
+            "max_escalated_ratio": self.cascade_max_escalated_ratio,
+        }
+        if org_id is not None:
+            policy.update(self.cascade_org_overrides.get(str(org_id), {}))
+        return policy
+
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
 
 settings = Settings()
@@ -22,7 +22,8 @@ else:
     ASYNC_DATABASE_URL = DATABASE_URL
 
 # Create async engine
-async_engine = create_async_engine(ASYNC_DATABASE_URL, echo=True)
+# echo would log every SQL statement
+async_engine = create_async_engine(ASYNC_DATABASE_URL, echo=False)
 
 # Create async session factory
 AsyncSessionLocal = sessionmaker(
@@ -2,16 +2,31 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, Session
 from app.models import Base
 from fastapi import Depends, HTTPException, status
-from fastapi.security import HTTPBearer
+from fastapi.concurrency import run_in_threadpool
+from starlette.requests import HTTPConnection
+from app.config import settings
+from app.redis_client import get_async_redis
+from app.services.auth import (
+    CurrentUser,
+    OrgContext,
+    TokenError,
+    current_user_from_claims,
+    decode_token,
+    is_revoked,
+    org_settings_cache,
+)
+from app.logging import get_logger
+from typing import Optional
+import hmac
 import os
 
+logger = get_logger(__name__)
+
 DATABASE_URL = os.getenv("DATABASE_URL", "postgresql://smart:agent@db:5432/smartagent")
 
 engine = create_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-security = HTTPBearer()
-
 
 def get_db() -> Session:
     """Get database session"""
@@ -22,13 +37,92 @@ def get_db() -> Session:
         db.close()
 
 
-def get_current_user():
-    """Get current authenticated user from JWT token"""
-    # JWT validation logic here
-    pass
+def _unauthorized(detail: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def _bearer_token(connection: HTTPConnection) -> str:
+    scheme, _, token = connection.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        return token
+    # WebSocket and EventSource clients cannot set headers
+    token = connection.query_params.get("token")
+    if token:
+        return token
+    raise _unauthorized("Not authenticated")
+
+
+async def get_current_user(connection: HTTPConnection) -> CurrentUser:
+    """Get current authenticated user from JWT token
+
+    Verified from the token claims alone; the only lookup is the Redis
+    revocation check.
+    """
+    try:
+        claims = decode_token(_bearer_token(connection))
+    except TokenError as e:
+        raise _unauthorized(f"Invalid token: {e}")
+
+    user = current_user_from_claims(claims)
+    try:
+        revoked = await is_revoked(get_async_redis(), user.jti)
+    except Exception as e:
+        # Fail closed: without the revocation list a logged-out token
+        # would be accepted again
+        logger.error("Revocation check failed: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Authentication temporarily unavailable",
+        )
+    if revoked:
+        raise _unauthorized("Token has been revoked")
+    return user
+
+
+def _load_org(org_id: int) -> Optional[OrgContext]:
+    db = SessionLocal()
+    try:
+        return org_settings_cache.load(db, org_id)
+    finally:
+        db.close()
+
+
+async def get_current_org(current_user: CurrentUser = Depends(get_current_user)) -> OrgContext:
+    """Get current organization from authenticated user (cached settings)
+
+    A cache miss uses its own short session rather than get_db: yield
+    dependencies are closed only after the response, which for an event
+    stream would hold a pooled connection for the stream's lifetime.
+    """
+    org = org_settings_cache.peek(current_user.org_id)
+    if org is None:
+        org = await run_in_threadpool(_load_org, current_user.org_id)
+    if org is None:
+        raise _unauthorized("Organization not found")
+    return org
+
+
+def require_role(*roles: str):
+    """Dependency that only admits users with one of `roles`"""
+
+    async def check_role(current_user: CurrentUser = Depends(get_current_user)) -> CurrentUser:
+        if current_user.role not in roles:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient role")
+        return current_user
+
+    return check_role
+
 
+async def require_ops_token(connection: HTTPConnection) -> None:
+    """Dependency that only admits the platform's ops service token
 
-def get_current_org():
-    """Get current organization from authenticated user"""
-    # Organization extraction logic here
-    pass
+    Fleet-wide data spans every org, so no tenant role is enough for it.
+    """
+    token = _bearer_token(connection)
+    expected = settings.ops_service_token
+    if not expected or not hmac.compare_digest(token.encode(), expected.encode()):
+        raise _unauthorized("Invalid service token")
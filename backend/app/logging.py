@@ -1,15 +1,184 @@
+"""
+Structured logging
+לוגים מובנים בפורמט JSON
+
+Every record is written as one JSON line carrying the correlation ID of the
+request or Celery task that produced it. The ID is taken from the incoming
+X-Request-ID header (or generated), copied into the headers of every task
+enqueued through the outbox and restored by the worker, so all log lines of
+one call - webhook, transcription, extraction - share it.
+
+Handlers never block the caller: records go through a QueueHandler and are
+formatted and written by a listener thread. Hot loggers can be sampled
+(`log_sample_rates`), and phone numbers, emails and personal-name fields
+are redacted before anything is written.
+"""
+
+import atexit
+import copy
+import json
 import logging
+import logging.handlers
+import queue
+import random
+import re
 import sys
-from typing import Any, Dict
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from app.config import settings
+
+_correlation_id: ContextVar[Optional[str]] = ContextVar("correlation_id", default=None)
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+# Israeli and international phone numbers, with or without separators
+PHONE_PATTERN = re.compile(r"(?<!\w)(?:\+?972[-\s]?|0)(?:[2-9]\d?)[-\s]?\d{3}[-\s]?\d{4}(?!\w)")
+EMAIL_PATTERN = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+
+# `extra` fields whose values are personal data
+PII_FIELDS = {"full_name", "customer_name", "phone", "from_number", "to_number", "email"}
+
+REDACTED = "[REDACTED]"
+
+_listener = None
+
+
+def get_correlation_id() -> Optional[str]:
+    return _correlation_id.get()
+
+
+def set_correlation_id(value: Optional[str]):
+    """Bind a correlation ID to the current context; returns a reset token"""
+    return _correlation_id.set(value)
+
+
+def reset_correlation_id(token) -> None:
+    _correlation_id.reset(token)
+
+
+def new_correlation_id() -> str:
+    return uuid.uuid4().hex
+
+
+def redact(text: str) -> str:
+    """Mask phone numbers and email addresses in free text"""
+    return EMAIL_PATTERN.sub(REDACTED, PHONE_PATTERN.sub(REDACTED, text))
+
+
+class CorrelationFilter(logging.Filter):
+    """Stamps records with the correlation ID of the current context"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.correlation_id = get_correlation_id()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a fraction of sub-WARNING records of selected loggers
+
+    Rates are matched on the logger name and its parents, so a rate for
+    "app.services" also applies to "app.services.streaming".
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+
+    def rate_for(self, name: str) -> float:
+        while name:
+            if name in self.rates:
+                return self.rates[name]
+            name = name.rpartition(".")[0]
+        return 1.0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rate_for(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+
+class RedactionFilter(logging.Filter):
+    """Removes personal data from the message and `extra` fields"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.msg = redact(record.getMessage())
+        record.args = None
+        if record.exc_text:
+            record.exc_text = redact(record.exc_text)
+        for key in PII_FIELDS & set(vars(record)):
+            setattr(record, key, REDACTED)
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "correlation_id": getattr(record, "correlation_id", None),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and key not in entry:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Keeps the traceback apart from the message for the JSON formatter"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
 
 
 def setup_logging() -> None:
-    """Configure structured logging"""
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        handlers=[logging.StreamHandler(sys.stdout)],
-    )
+    """Configure non-blocking JSON logging on the root logger
+
+    Safe to call more than once; only the first call installs handlers.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stdout)
+    output.addFilter(RedactionFilter())
+    if settings.log_json:
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(
+            logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(correlation_id)s - %(message)s")
+        )
+
+    records = queue.SimpleQueue()
+    handler = _QueueHandler(records)
+    handler.addFilter(SamplingFilter(settings.log_sample_rates))
+    handler.addFilter(CorrelationFilter())
+
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(settings.log_level.upper())
+
+    _listener = logging.handlers.QueueListener(records, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
 
 
 def get_logger(name: str) -> logging.Logger:
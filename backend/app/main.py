@@ -1,24 +1,123 @@
-from fastapi import FastAPI
-from fastapi.responses import JSONResponse
-from app.api import auth, calls, jobs, appointments, messages, integrations, calendar
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response
+from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+from prometheus_client import CONTENT_TYPE_LATEST
+from app.api import (
+    auth,
+    calls,
+    jobs,
+    appointments,
+    messages,
+    integrations,
+    calendar,
+    ops,
+)
+from app.logging import (
+    new_correlation_id,
+    reset_correlation_id,
+    set_correlation_id,
+    setup_logging,
+)
+from app.deps import engine, SessionLocal
+from app.metrics import (
+    CallStatusCollector,
+    DbPoolCollector,
+    HTTP_REQUEST_DURATION,
+    render_metrics,
+)
+from app.compression import CompressionMiddleware
+from app.config import settings
+from app.serialization import ORJSONResponse
+from app.services.health import health_checker
+from app.services.priority import install_flag_invalidation_hooks
+from app.services.response_cache import install_invalidation_hooks
+from app.tracing import instrument_libraries, setup_tracing
+
+setup_logging()
+setup_tracing("smartagent-api")
+instrument_libraries(engine)
+install_invalidation_hooks()
+install_flag_invalidation_hooks()
 
 app = FastAPI(
     title="SmartAgent API",
     description="Smart Field Technician Management System",
     version="1.0.0",
+    default_response_class=ORJSONResponse,
+)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.compression_minimum_size,
+    gzip_level=settings.compression_gzip_level,
+    brotli_quality=settings.compression_brotli_quality,
 )
 
 
+@app.middleware("http")
+async def correlation_id_middleware(request: Request, call_next):
+    """Bind a correlation ID to everything logged while handling a request"""
+    correlation_id = request.headers.get("X-Request-ID") or new_correlation_id()
+    token = set_correlation_id(correlation_id)
+    try:
+        response = await call_next(request)
+    finally:
+        reset_correlation_id(token)
+    response.headers["X-Request-ID"] = correlation_id
+    return response
+
+
+@app.middleware("http")
+async def request_metrics_middleware(request: Request, call_next):
+    """Request latency labelled by route template, not by raw path"""
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        HTTP_REQUEST_DURATION.labels(
+            request.method,
+            route.path if route else "unmatched",
+            str(status),
+        ).observe(time.perf_counter() - started)
+
+
 @app.get("/")
 async def root():
     return {"message": "SmartAgent API is running", "version": "1.0.0"}
 
 
 @app.get("/health")
+@app.get("/health/live")
 async def health_check():
+    """Liveness - the process is up and serving; dependencies are not checked"""
     return {"status": "healthy", "service": "smartagent-backend"}
 
 
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness - 503 while any dependency needed to serve is unavailable"""
+    result = await health_checker.check()
+    return JSONResponse(
+        {"status": "ready" if result["ready"] else "not_ready", **result},
+        status_code=200 if result["ready"] else 503,
+    )
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint"""
+    body = await run_in_threadpool(
+        render_metrics, DbPoolCollector(engine), CallStatusCollector(SessionLocal)
+    )
+    return Response(body, media_type=CONTENT_TYPE_LATEST)
+
+
 app.include_router(auth.router, prefix="/auth")
 app.include_router(calls.router, prefix="/calls")
 app.include_router(jobs.router, prefix="/jobs")
@@ -26,3 +125,7 @@ app.include_router(appointments.router, prefix="/appointments")
 app.include_router(messages.router, prefix="/messages")
 app.include_router(integrations.router, prefix="/integrations")
 app.include_router(calendar.router, prefix="/calendar")
+app.include_router(ops.router, prefix="/ops")
+
+# One server span per request, named after the route template
+FastAPIInstrumentor.instrument_app(app, excluded_urls="health,metrics")
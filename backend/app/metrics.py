@@ -0,0 +1,182 @@
+"""
+Prometheus metrics
+מדדי Prometheus
+
+Metrics are plain prometheus_client objects. When PROMETHEUS_MULTIPROC_DIR
+is set (API with several uvicorn workers, prefork Celery pool) every
+process writes its samples to memory-mapped files in that directory and
+`render_metrics()` aggregates them at scrape time, so recording a sample
+stays a cheap local operation. The variable must be set before the
+process starts; the directory should be emptied on startup.
+
+Values that are cheap to read but expensive to keep current - DB pool
+usage, calls per status - are collected at scrape time instead.
+"""
+
+import os
+import shutil
+from datetime import datetime, timedelta
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+    multiprocess,
+    start_http_server,
+)
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import func
+
+from app.config import settings
+from app.logging import get_logger
+from app.models import Call
+
+logger = get_logger(__name__)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "smartagent_http_request_duration_seconds",
+    "API request latency by route template",
+    ["method", "route", "status"],
+)
+
+TASK_DURATION = Histogram(
+    "smartagent_task_duration_seconds",
+    "Celery task run time",
+    ["task", "state"],
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1200),
+)
+
+WHISPER_RTF = Histogram(
+    "smartagent_whisper_real_time_factor",
+    "Inference time divided by audio duration, per model",
+    ["backend", "model"],
+    buckets=(0.02, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 4.0),
+)
+
+LLM_REQUEST_DURATION = Histogram(
+    "smartagent_llm_request_duration_seconds",
+    "LLM request latency",
+    ["model", "outcome"],
+    buckets=(0.25, 0.5, 1, 2, 4, 8, 15, 30, 60),
+)
+
+LLM_TOKENS = Counter(
+    "smartagent_llm_tokens",
+    "LLM tokens used",
+    ["model", "kind"],
+)
+
+LLM_OUTPUT_PARSES = Counter(
+    "smartagent_llm_output_parses",
+    "Extraction replies by how they were parsed (clean/repaired/reasked/partial/failed)",
+    ["result"],
+)
+
+EXTRACTION_CONFIDENCE = Histogram(
+    "smartagent_extraction_confidence",
+    "Confidence of saved extractions",
+    buckets=(0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0),
+)
+
+CACHE_REQUESTS = Counter(
+    "smartagent_cache_requests",
+    "Cache lookups by cache and result (hit/miss/error)",
+    ["cache", "result"],
+)
+
+
+class DbPoolCollector:
+    """Connections of a SQLAlchemy QueuePool, read at scrape time"""
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def collect(self):
+        pool = self.engine.pool
+        if not hasattr(pool, "checkedout"):
+            # Not a QueuePool (e.g. SQLite in-memory) - nothing to report
+            return
+        family = GaugeMetricFamily(
+            "smartagent_db_pool_connections",
+            "Database pool connections by state",
+            labels=["state"],
+        )
+        family.add_metric(["checked_out"], pool.checkedout())
+        family.add_metric(["idle"], pool.checkedin())
+        family.add_metric(["overflow"], max(0, pool.overflow()))
+        yield family
+        yield GaugeMetricFamily(
+            "smartagent_db_pool_size", "Configured pool size", value=pool.size()
+        )
+
+
+class CallStatusCollector:
+    """Calls created within the reaper lookback, per status"""
+
+    def __init__(self, session_factory):
+        self.session_factory = session_factory
+
+    def collect(self):
+        family = GaugeMetricFamily(
+            "smartagent_calls",
+            f"Calls created in the last {settings.call_reaper_lookback_hours}h by status",
+            labels=["status"],
+        )
+        since = datetime.utcnow() - timedelta(hours=settings.call_reaper_lookback_hours)
+        db = self.session_factory()
+        try:
+            rows = (
+                db.query(Call.status, func.count(Call.id))
+                .filter(Call.created_at >= since)
+                .group_by(Call.status)
+                .all()
+            )
+        except Exception as e:
+            # A scrape must not fail because the database is unavailable
+            logger.warning("Failed to count calls for metrics: %s", e)
+            rows = []
+        finally:
+            db.close()
+        for status, count in rows:
+            family.add_metric([getattr(status, "value", str(status))], count)
+        yield family
+
+
+def render_metrics(*collectors) -> bytes:
+    """Exposition of this process (or all processes) plus scrape-time collectors"""
+    scraped = CollectorRegistry()
+    for collector in collectors:
+        scraped.register(collector)
+
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        recorded = CollectorRegistry()
+        multiprocess.MultiProcessCollector(recorded)
+    else:
+        recorded = REGISTRY
+    return generate_latest(recorded) + generate_latest(scraped)
+
+
+def start_worker_metrics_server(port: int) -> None:
+    """Serve the metrics of every pool process from the Celery main process
+
+    Called before the pool forks; stale files of a previous run are removed
+    so counters start from zero.
+    """
+    multiproc_dir = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if multiproc_dir:
+        shutil.rmtree(multiproc_dir, ignore_errors=True)
+        os.makedirs(multiproc_dir, exist_ok=True)
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    start_http_server(port, registry=registry)
+
+
+def mark_process_dead(pid: int) -> None:
+    """Drop the live-gauge files of an exited pool process"""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        multiprocess.mark_process_dead(pid)
@@ -8,7 +8,7 @@ from sqlalchemy import (
     JSON,
     Index,
     Text,
-    Decimal,
+    Numeric,
     Enum as SQLEnum,
 )
 from sqlalchemy.orm import declarative_base, relationship
@@ -32,6 +32,7 @@ class CallStatusEnum(enum.Enum):
     EXTRACTING = "extracting"
     COMPLETED = "completed"
     FAILED = "failed"
+    DEAD_LETTER = "dead_letter"
 
 
 class JobStatusEnum(enum.Enum):
@@ -48,6 +49,7 @@ class Organization(Base):
     id = Column(Integer, primary_key=True)
     name = Column(String(255), nullable=False)
     timezone = Column(String(50), default="Asia/Jerusalem")
+    plan = Column(String(20), default="basic")  # basic, pro, enterprise
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
 
@@ -80,6 +82,7 @@ class Customer(Base):
     name = Column(String(255))
     phone = Column(String(50))
     email = Column(String(255))
+    vip_status = Column(Boolean, default=False)
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
 
@@ -135,6 +138,13 @@ class Call(Base):
     status = Column(
         SQLEnum(CallStatusEnum), default=CallStatusEnum.PENDING_TRANSCRIPTION
     )
+    recovery_attempts = Column(Integer, default=0)
+    # When the current stage was last queued / taken by a worker (the reaper
+    # times waiting and working calls separately)
+    queued_at = Column(DateTime, default=func.now())
+    claimed_at = Column(DateTime)
+    deferred_at = Column(DateTime)  # parked by fair share, nothing queued
+    priority = Column(Integer, default=6)  # Celery priority, 0 = most urgent
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
 
@@ -152,7 +162,8 @@ class Transcript(Base):
     call_id = Column(Integer, ForeignKey("calls.id"), nullable=False)
     text = Column(Text)
     language = Column(String(10), default="he")
-    confidence = Column(Decimal(3, 2))
+    confidence = Column(Numeric(3, 2))
+    model_tier = Column(String(20))  # fast, escalated, accurate, streaming
     created_at = Column(DateTime, default=func.now())
 
     call = relationship("Call", back_populates="transcripts")
@@ -166,7 +177,7 @@ class Extraction(Base):
     call_id = Column(Integer, ForeignKey("calls.id"), nullable=False)
     extracted_data = Column(JSON)  # Structured JSON from LLM
     summary_he = Column(Text)
-    confidence = Column(Decimal(3, 2))
+    confidence = Column(Numeric(3, 2))
     created_at = Column(DateTime, default=func.now())
 
     call = relationship("Call", back_populates="extractions")
@@ -182,7 +193,7 @@ class Job(Base):
     title = Column(String(255))
     description = Column(Text)
     status = Column(SQLEnum(JobStatusEnum), default=JobStatusEnum.DRAFT)
-    agreed_price = Column(Decimal(10, 2))
+    agreed_price = Column(Numeric(10, 2))
     currency = Column(String(3), default="ILS")
     priority = Column(String(20), default="medium")  # low, medium, high, urgent
     created_at = Column(DateTime, default=func.now())
@@ -266,9 +277,40 @@ class AuditLog(Base):
     created_at = Column(DateTime, default=func.now())
 
 
+class OutboxMessage(Base):
+    __tablename__ = "outbox_messages"
+
+    id = Column(Integer, primary_key=True)
+    task_name = Column(String(255), nullable=False)
+    args = Column(JSON, default=list)
+    options = Column(JSON, default=dict)  # apply_async options (queue, priority...)
+    attempts = Column(Integer, default=0)
+    last_error = Column(Text)
+    created_at = Column(DateTime, default=func.now())
+    published_at = Column(DateTime)
+
+
 # Indexes for performance
 Index("ix_customers_org_id_phone", Customer.org_id, Customer.phone)
 Index("ix_calls_org_id_created_at", Call.org_id, Call.created_at)
 Index("ix_appointments_org_id_start_at", Appointment.org_id, Appointment.start_at)
 Index("ix_jobs_org_id_status", Job.org_id, Job.status)
 Index("ix_followups_org_id_due_at", Followup.org_id, Followup.due_at)
+Index(
+    "ix_calls_deferred",
+    Call.org_id,
+    Call.priority,
+    Call.deferred_at,
+    postgresql_where=Call.deferred_at.isnot(None),
+)
+Index(
+    "ix_calls_waiting",
+    Call.status,
+    Call.created_at,
+    postgresql_where=Call.claimed_at.is_(None),
+)
+Index(
+    "ix_outbox_messages_unpublished",
+    OutboxMessage.id,
+    postgresql_where=OutboxMessage.published_at.is_(None),
+)
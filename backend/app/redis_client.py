@@ -0,0 +1,28 @@
+"""
+Shared Redis connections
+חיבורי Redis משותפים
+"""
+
+import redis
+import redis.asyncio as aioredis
+
+from app.config import settings
+
+_client = None
+_async_client = None
+
+
+def get_redis() -> redis.Redis:
+    """Process-wide synchronous client (connection pooled)"""
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(settings.redis_url)
+    return _client
+
+
+def get_async_redis() -> aioredis.Redis:
+    """Process-wide asyncio client for use inside the API event loop"""
+    global _async_client
+    if _async_client is None:
+        _async_client = aioredis.Redis.from_url(settings.redis_url)
+    return _async_client
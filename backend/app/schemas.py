@@ -1,6 +1,6 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, TypeAdapter
 from typing import Optional, List
-from datetime import datetime
+from datetime import date, datetime
 from decimal import Decimal
 from enum import Enum
 
@@ -17,6 +17,7 @@ class CallStatusEnum(str, Enum):
     EXTRACTING = "extracting"
     COMPLETED = "completed"
     FAILED = "failed"
+    DEAD_LETTER = "dead_letter"
 
 
 class JobStatusEnum(str, Enum):
@@ -33,11 +34,13 @@ class UserRegister(BaseModel):
     password: str
     full_name: str
     org_name: str
+    device_id: Optional[str] = Field(None, max_length=64)
 
 
 class UserLogin(BaseModel):
     email: EmailStr
     password: str
+    device_id: Optional[str] = Field(None, max_length=64)
 
 
 class Token(BaseModel):
@@ -46,6 +49,16 @@ class Token(BaseModel):
     token_type: str = "bearer"
 
 
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+
+class SessionResponse(BaseModel):
+    device_id: str
+    created_at: int
+    last_refreshed_at: int
+
+
 # Customer Schemas
 class CustomerCreate(BaseModel):
     name: str
@@ -60,8 +73,7 @@ class CustomerResponse(BaseModel):
     email: Optional[str]
     created_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # Address Schema
@@ -79,8 +91,7 @@ class AddressResponse(BaseModel):
     postal_code: Optional[str]
     notes: Optional[str]
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # Device Schema
@@ -96,13 +107,12 @@ class DeviceCreate(BaseModel):
 class CallWebhook(BaseModel):
     recordingUrl: str
     callSid: str
-    from_: str = None
+    from_: Optional[str] = Field(None, alias="from")
     to: str
     startTime: str
     duration: Optional[int] = None
 
-    class Config:
-        fields = {"from_": "from"}
+    model_config = ConfigDict(populate_by_name=True)
 
 
 class CallResponse(BaseModel):
@@ -116,8 +126,7 @@ class CallResponse(BaseModel):
     created_at: datetime
     customer: Optional[CustomerResponse] = None
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # Extraction Schema (LLM Output)
@@ -186,8 +195,7 @@ class JobResponse(BaseModel):
     created_at: datetime
     customer: Optional[CustomerResponse] = None
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # Appointment Schemas
@@ -211,8 +219,35 @@ class AppointmentResponse(BaseModel):
     created_at: datetime
     customer: Optional[CustomerResponse] = None
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
+
+
+class FollowupResponse(BaseModel):
+    id: int
+    due_at: datetime
+    reason: Optional[str]
+    channel: Optional[str]
+    is_completed: bool
+    customer_id: Optional[int]
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class AgendaResponse(BaseModel):
+    date: date
+    appointments: List[AppointmentResponse]
+    followups: List[FollowupResponse]
+
+
+# Integration Schemas
+class IntegrationResponse(BaseModel):
+    id: int
+    provider: Optional[str]
+    is_active: bool
+    created_at: datetime
+    updated_at: Optional[datetime]
+
+    model_config = ConfigDict(from_attributes=True)
 
 
 # Message Schemas
@@ -230,5 +265,10 @@ class MessageResponse(BaseModel):
     status: str
     created_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
+
+
+# Validators for payloads that arrive as raw JSON on hot paths, built once
+# at import and fed bytes directly (parsing and validation in one pass)
+extraction_result_adapter = TypeAdapter(ExtractionResult)
+call_webhook_adapter = TypeAdapter(CallWebhook)
@@ -0,0 +1,293 @@
+"""
+Authentication - tokens, password hashing and the org settings cache
+אימות משתמשים: טוקנים, גיבוב סיסמאות ומטמון הגדרות ארגון
+
+Access tokens are self-contained JWTs: the user id, org id and role are in
+the claims, so authenticating a request needs no database query. The only
+per-request lookup is an O(1) EXISTS on the Redis revocation list (keyed by
+the token's jti, expiring together with the token).
+
+Passwords are hashed with argon2id. Hashing is deliberately slow and
+memory-hungry, so it runs on a small dedicated thread pool: a login storm
+queues up there instead of blocking the event loop or starving the
+threadpool every other endpoint uses.
+"""
+
+import asyncio
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Optional
+
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+from jose import JWTError, jwk, jwt
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.metrics import CACHE_REQUESTS
+from app.models import Organization
+
+ACCESS_TOKEN = "access"
+REFRESH_TOKEN = "refresh"
+MEDIA_STREAM_TOKEN = "media_stream"
+
+REVOKED_PREFIX = "revoked-jti:"
+
+
+class TokenError(Exception):
+    """Token is malformed, expired, of the wrong type or revoked"""
+
+
+class OrgContext:
+    """The caller's organization as seen by the routers
+
+    Carries what the routers need (id) plus the cached org settings, so it
+    can stand in for an Organization row without loading one.
+    """
+
+    def __init__(self, id: int, name: str, timezone: str, plan: str):
+        self.id = id
+        self.name = name
+        self.timezone = timezone
+        self.plan = plan
+
+
+class CurrentUser:
+    """Identity taken from verified access-token claims"""
+
+    def __init__(
+        self,
+        id: int,
+        org_id: int,
+        role: str,
+        jti: str,
+        expires_at: int,
+        session_id: Optional[str] = None,
+    ):
+        self.id = id
+        self.org_id = org_id
+        self.role = role
+        self.jti = jti
+        self.expires_at = expires_at
+        self.session_id = session_id
+
+
+# Password hashing
+
+_password_hasher = PasswordHasher(
+    time_cost=settings.argon2_time_cost,
+    memory_cost=settings.argon2_memory_cost_kib,
+    parallelism=settings.argon2_parallelism,
+)
+# Bounds both CPU and memory (memory_cost per concurrent hash)
+_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.password_hash_workers, thread_name_prefix="argon2"
+)
+# Verified against when the user does not exist, so a missing account
+# takes as long to reject as a wrong password
+_dummy_hash = None
+
+
+async def _run_hasher(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(_hash_executor, fn, *args)
+
+
+async def hash_password(password: str) -> str:
+    return await _run_hasher(_password_hasher.hash, password)
+
+
+async def verify_password(password_hash: Optional[str], password: str) -> bool:
+    """Constant-effort check; returns False for a missing hash"""
+    global _dummy_hash
+    if password_hash is None:
+        if _dummy_hash is None:
+            _dummy_hash = await hash_password(uuid.uuid4().hex)
+        password_hash = _dummy_hash
+        password = ""
+
+    def verify():
+        try:
+            return _password_hasher.verify(password_hash, password)
+        except (VerificationError, InvalidHashError):
+            return False
+
+    return await _run_hasher(verify)
+
+
+def needs_rehash(password_hash: str) -> bool:
+    """True when the hash was made with older argon2 parameters"""
+    return _password_hasher.check_needs_rehash(password_hash)
+
+
+# Tokens
+@lru_cache(maxsize=1)
+def _signing_key():
+    # Parsed once per process instead of on every encode/decode
+    return jwk.construct(settings.jwt_secret, settings.jwt_algorithm)
+
+
+def _encode(claims: dict) -> str:
+    return jwt.encode(claims, _signing_key(), algorithm=settings.jwt_algorithm)
+
+
+def create_token(
+    user_id: int,
+    org_id: int,
+    role: str,
+    token_type: str,
+    jti: Optional[str] = None,
+    extra_claims: Optional[dict] = None,
+) -> str:
+    now = datetime.now(timezone.utc)
+    lifetime = (
+        timedelta(minutes=settings.access_token_expire_minutes)
+        if token_type == ACCESS_TOKEN
+        else timedelta(days=settings.refresh_token_expire_days)
+    )
+    claims = {
+        "sub": str(user_id),
+        "org": org_id,
+        "role": role,
+        "type": token_type,
+        "jti": jti or uuid.uuid4().hex,
+        "iat": int(now.timestamp()),
+        "exp": int((now + lifetime).timestamp()),
+    }
+    claims.update(extra_claims or {})
+    return _encode(claims)
+
+
+def create_token_pair(
+    user_id: int,
+    org_id: int,
+    role: str,
+    refresh_jti: Optional[str] = None,
+    extra_claims: Optional[dict] = None,
+) -> dict:
+    return {
+        "access_token": create_token(user_id, org_id, role, ACCESS_TOKEN, extra_claims=extra_claims),
+        "refresh_token": create_token(
+            user_id, org_id, role, REFRESH_TOKEN, jti=refresh_jti, extra_claims=extra_claims
+        ),
+        "token_type": "bearer",
+    }
+
+
+def decode_token(token: str, token_type: str = ACCESS_TOKEN) -> dict:
+    """Verify signature, expiry and type; returns the claims"""
+    try:
+        claims = jwt.decode(token, _signing_key(), algorithms=[settings.jwt_algorithm])
+    except JWTError as e:
+        raise TokenError(str(e))
+    if claims.get("type") != token_type:
+        raise TokenError(f"expected a {token_type} token")
+    if not all(key in claims for key in ("sub", "org", "role", "jti", "exp")):
+        raise TokenError("missing claims")
+    return claims
+
+
+def create_media_stream_token(org_id: int) -> str:
+    """Token for the `token` custom parameter of an org's TwiML <Stream>"""
+    now = datetime.now(timezone.utc)
+    lifetime = timedelta(minutes=settings.media_stream_token_expire_minutes)
+    return _encode(
+        {
+            "org": org_id,
+            "type": MEDIA_STREAM_TOKEN,
+            "iat": int(now.timestamp()),
+            "exp": int((now + lifetime).timestamp()),
+        }
+    )
+
+
+def verify_media_stream_token(token: str) -> int:
+    """The org a media stream token was issued for"""
+    try:
+        claims = jwt.decode(token, _signing_key(), algorithms=[settings.jwt_algorithm])
+    except JWTError as e:
+        raise TokenError(str(e))
+    if claims.get("type") != MEDIA_STREAM_TOKEN or "org" not in claims:
+        raise TokenError(f"expected a {MEDIA_STREAM_TOKEN} token")
+    return int(claims["org"])
+
+
+def current_user_from_claims(claims: dict) -> CurrentUser:
+    return CurrentUser(
+        id=int(claims["sub"]),
+        org_id=int(claims["org"]),
+        role=claims["role"],
+        jti=claims["jti"],
+        expires_at=int(claims["exp"]),
+        session_id=claims.get("sid"),
+    )
+
+
+# Revocation list
+def _revoked_key(jti: str) -> str:
+    return f"{REVOKED_PREFIX}{jti}"
+
+
+async def revoke(client, jti: str, expires_at: int) -> None:
+    """Revoke a token until it would have expired anyway"""
+    ttl = max(1, int(expires_at - time.time()))
+    await client.set(_revoked_key(jti), 1, ex=ttl)
+
+
+async def is_revoked(client, jti: str) -> bool:
+    return bool(await client.exists(_revoked_key(jti)))
+
+
+# Org settings cache
+class OrgSettingsCache:
+    """Small per-process TTL cache of org settings (name, timezone, plan)
+
+    Org settings change rarely and every authenticated request needs them,
+    so a short TTL trades a bounded staleness for no query per request.
+    """
+
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def peek(self, org_id: int) -> Optional[OrgContext]:
+        """Cached settings, or None when missing or expired; never queries"""
+        with self._lock:
+            entry = self._entries.get(org_id)
+        if entry and entry[0] > time.monotonic():
+            CACHE_REQUESTS.labels("org_settings", "hit").inc()
+            return entry[1]
+        CACHE_REQUESTS.labels("org_settings", "miss").inc()
+        return None
+
+    def load(self, db: Session, org_id: int) -> Optional[OrgContext]:
+        """Read an org from the database and cache it"""
+        org = (
+            db.query(Organization.id, Organization.name, Organization.timezone, Organization.plan)
+            .filter(Organization.id == org_id)
+            .first()
+        )
+        if org is None:
+            return None
+        context = OrgContext(org.id, org.name, org.timezone, org.plan)
+        with self._lock:
+            if len(self._entries) >= self.max_size:
+                # Drop the entry closest to expiry
+                oldest = min(self._entries, key=lambda key: self._entries[key][0])
+                del self._entries[oldest]
+            self._entries[org_id] = (time.monotonic() + self.ttl, context)
+        return context
+
+    def invalidate(self, org_id: int) -> None:
+        with self._lock:
+            self._entries.pop(org_id, None)
+
+
+org_settings_cache = OrgSettingsCache(
+    ttl=settings.org_settings_cache_seconds, max_size=settings.org_settings_cache_size
+)
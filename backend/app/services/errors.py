@@ -0,0 +1,38 @@
+"""
+Typed service errors
+שגיאות שירות מסווגות
+
+Services raise TransientServiceError for failures worth retrying (network
+blips, throttling, 5xx) and PermanentServiceError for failures that will
+not go away on their own (missing object, bad credentials, undecodable
+audio). `cause` is a short stable label used in failure metrics.
+"""
+
+
+class ServiceError(Exception):
+    """Base class for errors raised by app services"""
+
+    transient = False
+
+    def __init__(self, cause: str, message: str = ""):
+        self.cause = cause
+        super().__init__(message or cause)
+
+
+class TransientServiceError(ServiceError):
+    """Failure that may succeed on retry"""
+
+    transient = True
+
+
+class PermanentServiceError(ServiceError):
+    """Failure that will fail again on retry"""
+
+    transient = False
+
+
+def failure_cause(error: Exception) -> str:
+    """Metric label for any exception"""
+    if isinstance(error, ServiceError):
+        return error.cause
+    return type(error).__name__
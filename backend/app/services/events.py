@@ -0,0 +1,146 @@
+"""
+Call status change notifications over Redis pub/sub
+הפצת שינויי סטטוס של שיחות דרך Redis pub/sub
+
+Workers publish every CallStatusEnum transition to a per-org channel. Each
+API process holds one pattern subscription and fans messages out to its
+local SSE/WebSocket subscribers, so dashboards no longer poll the DB.
+
+When the subscription breaks (Redis restart, network), the listener logs
+it and re-subscribes with exponential backoff. Transitions published in
+the gap are not replayed; clients can catch up with GET /calls/{call_id}.
+"""
+
+import asyncio
+import json
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import redis
+import redis.asyncio as aioredis
+
+from app.config import settings
+from app.logging import get_logger
+from app.redis_client import get_async_redis, get_redis
+
+logger = get_logger(__name__)
+
+CHANNEL_PREFIX = "call-status:"
+RESUBSCRIBE_INITIAL_SECONDS = 0.5
+RESUBSCRIBE_MAX_SECONDS = 30.0
+
+
+def status_channel(org_id: int) -> str:
+    return f"{CHANNEL_PREFIX}{org_id}"
+
+
+def _status_message(org_id: int, call_id: int, status) -> str:
+    return json.dumps(
+        {
+            "call_id": call_id,
+            "org_id": org_id,
+            "status": getattr(status, "value", status),
+            "at": datetime.now(timezone.utc).isoformat(),
+        }
+    )
+
+
+def publish_call_status(org_id: int, call_id: int, status) -> None:
+    """Publish a call status change; call after the DB commit
+
+    Never raises - a missed notification must not fail the pipeline, and
+    clients can always fall back to GET /calls/{call_id}.
+    """
+    try:
+        get_redis().publish(status_channel(org_id), _status_message(org_id, call_id, status))
+    except redis.RedisError as e:
+        logger.warning("Failed to publish status of call %s: %s", call_id, e)
+
+
+async def publish_call_status_async(org_id: int, call_id: int, status) -> None:
+    """publish_call_status for API handlers, on the asyncio client"""
+    try:
+        await get_async_redis().publish(
+            status_channel(org_id), _status_message(org_id, call_id, status)
+        )
+    except redis.RedisError as e:
+        logger.warning("Failed to publish status of call %s: %s", call_id, e)
+
+
+class RedisBroadcaster:
+    """Fans messages on a Redis channel pattern out to local subscribers
+
+    Subscribers are keyed by one field of the message (`key`). The Redis
+    subscription is opened when the first client subscribes and closed
+    when the last one leaves.
+    """
+
+    def __init__(self, pattern: str, key: str, max_queue_size: int = 100, client_factory=None):
+        self.pattern = pattern
+        self.key = key
+        self.max_queue_size = max_queue_size
+        self._client_factory = client_factory or (
+            lambda: aioredis.Redis.from_url(settings.redis_url)
+        )
+        self._subscribers = defaultdict(set)
+        self._listener = None
+
+    def subscribe(self, key) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._subscribers[key].add(queue)
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+        return queue
+
+    def unsubscribe(self, key, queue: asyncio.Queue):
+        self._subscribers[key].discard(queue)
+        if not self._subscribers[key]:
+            del self._subscribers[key]
+        if not self._subscribers and self._listener:
+            self._listener.cancel()
+            self._listener = None
+
+    def dispatch(self, message: dict):
+        for queue in self._subscribers.get(message.get(self.key), ()):
+            if queue.full():
+                # Slow consumer - drop its oldest event rather than stall the others
+                queue.get_nowait()
+            queue.put_nowait(message)
+
+    async def _listen(self):
+        """Dispatch until cancelled, re-subscribing after Redis errors"""
+        delay = RESUBSCRIBE_INITIAL_SECONDS
+        while True:
+            client = self._client_factory()
+            pubsub = client.pubsub()
+            try:
+                await pubsub.psubscribe(self.pattern)
+                delay = RESUBSCRIBE_INITIAL_SECONDS
+                async for raw in pubsub.listen():
+                    if raw["type"] != "pmessage":
+                        continue
+                    try:
+                        self.dispatch(json.loads(raw["data"]))
+                    except ValueError:
+                        logger.warning("Dropping malformed message on %s: %r", self.pattern, raw["data"])
+                # The connection closed without an error
+                logger.warning("Subscription to %s ended; re-subscribing", self.pattern)
+            except (redis.RedisError, OSError) as e:
+                logger.error(
+                    "Subscription to %s failed, re-subscribing in %.1fs: %s", self.pattern, delay, e
+                )
+            finally:
+                await pubsub.aclose()
+                await client.aclose()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RESUBSCRIBE_MAX_SECONDS)
+
+
+class CallStatusBroadcaster(RedisBroadcaster):
+    """Call status messages, filtered by org"""
+
+    def __init__(self, max_queue_size: int = 100, client_factory=None):
+        super().__init__(f"{CHANNEL_PREFIX}*", "org_id", max_queue_size, client_factory)
+
+
+call_status_broadcaster = CallStatusBroadcaster()
@@ -1,63 +1,166 @@
 import openai
 from app.config import settings
-from app.schemas import ExtractionResult
-import json
+from app.logging import get_logger
+from app.metrics import LLM_OUTPUT_PARSES, LLM_REQUEST_DURATION, LLM_TOKENS
+from app.schemas import ExtractionResult, extraction_result_adapter
+from app.services.errors import PermanentServiceError, TransientServiceError
+from app.services.field_extractors import merge_fields
+from app.services.llm_output import (
+    ParsedExtraction,
+    parse_extraction,
+    parse_json_object,
+    validate_sections,
+)
+from app.services.llm_prompt import (
+    LLM_MODEL,
+    Prompt,
+    extraction_prompts,
+    reask_prompt,
+    summary_prompt,
+)
+from app.tracing import get_tracer
+import time
+
+logger = get_logger(__name__)
+tracer = get_tracer(__name__)
 
 
 class LLMService:
     """LLM service for text extraction and analysis"""
 
     def __init__(self):
-        openai.api_key = settings.openai_api_key
+        self._client = None
+
+    @property
+    def client(self) -> openai.OpenAI:
+        # Created on first use so importing the service never needs a key
+        if self._client is None and settings.llm_backend != "openai":
+            from app.services.llm_backends import get_chat_client
+
+            self._client = get_chat_client()
+        if self._client is None:
+            self._client = openai.OpenAI(
+                api_key=settings.openai_api_key,
+                timeout=settings.llm_timeout_seconds,
+                max_retries=0,  # Retries are handled by the Celery task
+            )
+        return self._client
 
     def extract_information(self, transcript_text: str) -> ExtractionResult:
         """Extract structured information from call transcript"""
+        results = [self._extract(prompt) for prompt in extraction_prompts(transcript_text)]
+        if len(results) == 1:
+            return results[0]
+        return self._reduce(results)
 
-        system_prompt = """
-        את/ה ממלא/ת תפקיד של "סוכן הפקת מידע משיחות שירות".
-        קלט: תמליל שיחה בעברית.
-        פלט: JSON תקין בלבד לפי הסכמה המצורפת.
-        אם שדה לא מופיע – החזר null.
-        סיכום חופשי תמיד בעברית, קצר וברור לפעולה.
-        אל תנחש מחירים/כתובות אם אין רמזים.
-        אם יש "ביום חמישי ב-שלוש" והמועד עבר – הוסף שדה follow_up שדורש תיאום מחדש.
-        """
-
-        user_prompt = f"""
-        הפק/י את המידע הבא מתוך הטקסט:
-        - פרטי לקוח (שם, טלפון, אימייל, כתובת: רחוב/עיר/הערות)
-        - מכשיר/סוג טיפול (קטגוריה, מותג, דגם, תיאור בעיה, דחיפות)
-        - מחיר שסוכם (מספר, מטבע)
-        - תיאום פגישה (תאריך, שעה, משך, אישור הלקוח)
-        - Follow-up אם אין תיאום סופי
-        - סיכום חופשי בעברית (2-3 שורות)
-        החזר JSON בלבד לפי הסכמה.
-
-        טקסט:
-        ```{transcript_text}```
-        """
+    def _extract(self, prompt: Prompt) -> ExtractionResult:
+        content = self._complete(prompt.messages, prompt.max_tokens, purpose="extract")
 
         try:
-            response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt},
-                ],
-                temperature=0.1,
-                max_tokens=1000,
+            parsed = parse_extraction(content)
+        except ValueError as e:
+            # No JSON object at all - ask again for every section
+            parsed = ParsedExtraction(
+                ExtractionResult(),
+                invalid={name: str(e) for name in ExtractionResult.model_fields},
             )
 
-            result_text = response.choices[0].message.content
-            result_json = json.loads(result_text)
+        if not parsed.invalid:
+            LLM_OUTPUT_PARSES.labels("repaired" if parsed.repaired else "clean").inc()
+            return parsed.result
+        return self._reask(prompt.transcript, parsed)
+
+    def _reask(self, transcript_text: str, parsed: ParsedExtraction) -> ExtractionResult:
+        """Ask again for the invalid sections only, and merge the answer"""
+        logger.info("Re-asking LLM for invalid sections: %s", parsed.invalid)
+        prompt = reask_prompt(transcript_text, parsed.invalid)
+        content = self._complete(prompt.messages, prompt.max_tokens, purpose="reask")
 
-            return ExtractionResult(**result_json)
+        try:
+            answer = parse_json_object(content)
+        except ValueError:
+            answer = {}
+        valid, still_invalid = validate_sections(
+            {name: answer[name] for name in parsed.invalid if name in answer}
+        )
 
-        except Exception as e:
-            # Return default result with error info
+        if not parsed.result.model_fields_set and not valid:
+            LLM_OUTPUT_PARSES.labels("failed").inc()
             return ExtractionResult(
-                free_text_summary_he=f"שגיאה בעיבוד: {str(e)}", confidence=0.0
+                free_text_summary_he=f"שגיאה בעיבוד: {'; '.join(parsed.invalid.values())}",
+                confidence=0.0,
+            )
+        if still_invalid:
+            logger.warning("LLM sections still invalid after re-ask: %s", still_invalid)
+        LLM_OUTPUT_PARSES.labels("partial" if still_invalid else "reasked").inc()
+        return extraction_result_adapter.validate_python(
+            {**parsed.result.model_dump(exclude_unset=True), **valid}
+        )
+
+    def _reduce(self, results: list) -> ExtractionResult:
+        """Merge the extractions of consecutive transcript chunks
+
+        Later chunks win where they disagree, since arrangements made late
+        in a call replace earlier ones. The chunk summaries are merged by
+        one more short call.
+        """
+        usable = [result for result in results if result.confidence > 0] or results[-1:]
+        merged = {}
+        for result in usable:
+            merge_fields(merged, result.model_dump(exclude_unset=True, exclude_none=True))
+
+        summaries = [result.free_text_summary_he for result in usable if result.free_text_summary_he]
+        if len(summaries) > 1:
+            prompt = summary_prompt(summaries)
+            content = self._complete(prompt.messages, prompt.max_tokens, purpose="summary")
+            merged["free_text_summary_he"] = content.strip() or " ".join(summaries)
+        merged["confidence"] = max(result.confidence for result in usable)
+        return extraction_result_adapter.validate_python(merged)
+
+    def _complete(self, messages: list, max_tokens: int, purpose: str) -> str:
+        """Run one chat completion and return the reply text"""
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            with tracer.start_as_current_span(
+                "llm.chat_completion",
+                attributes={
+                    "llm.model": LLM_MODEL,
+                    "llm.purpose": purpose,
+                    "llm.prompt_chars": sum(len(m["content"]) for m in messages),
+                },
+            ) as span:
+                response = self.client.chat.completions.create(
+                    model=LLM_MODEL,
+                    messages=messages,
+                    temperature=0.1,
+                    max_tokens=max_tokens,
+                )
+                outcome = "ok"
+                if response.usage:
+                    span.set_attribute("llm.prompt_tokens", response.usage.prompt_tokens)
+                    span.set_attribute("llm.completion_tokens", response.usage.completion_tokens)
+                    LLM_TOKENS.labels(LLM_MODEL, "prompt").inc(response.usage.prompt_tokens)
+                    LLM_TOKENS.labels(LLM_MODEL, "completion").inc(
+                        response.usage.completion_tokens
+                    )
+        except openai.APITimeoutError as e:
+            raise TransientServiceError("llm_timeout", str(e))
+        except openai.APIConnectionError as e:
+            raise TransientServiceError("llm_connection", str(e))
+        except openai.RateLimitError as e:
+            raise TransientServiceError("llm_rate_limit", str(e))
+        except openai.InternalServerError as e:
+            raise TransientServiceError("llm_server_error", str(e))
+        except (openai.AuthenticationError, openai.PermissionDeniedError) as e:
+            raise PermanentServiceError("llm_auth", str(e))
+        except openai.APIStatusError as e:
+            raise PermanentServiceError("llm_request_rejected", str(e))
+        finally:
+            LLM_REQUEST_DURATION.labels(LLM_MODEL, outcome).observe(
+                time.perf_counter() - started
             )
+        return response.choices[0].message.content or ""
 
 
 llm_service = LLMService()
@@ -0,0 +1,75 @@
+"""
+Task failure counters by cause
+מוני כשלונות משימות לפי סיבה
+
+Counts are kept in one Redis hash per day (field "org|task|cause|outcome"),
+so recording a failure is a single HINCRBY and old days expire on their own.
+Outcomes: "retry" (transient, will be retried), "exhausted" (transient,
+out of retries) and "permanent".
+"""
+
+from datetime import date, timedelta
+
+import redis
+
+from app.logging import get_logger
+from app.redis_client import get_redis
+from app.services.errors import failure_cause
+
+logger = get_logger(__name__)
+
+KEY_PREFIX = "task-failures:"
+RETENTION_DAYS = 8
+
+
+def _day_key(day: date) -> str:
+    return f"{KEY_PREFIX}{day.isoformat()}"
+
+
+def failure_outcome(error: Exception, will_retry: bool) -> str:
+    if will_retry:
+        return "retry"
+    if getattr(error, "transient", False):
+        return "exhausted"
+    return "permanent"
+
+
+def record_failure(task_name: str, error: Exception, will_retry: bool, org_id: int = None) -> None:
+    """Count one task failure; never raises"""
+    cause = failure_cause(error)
+    field = f"{org_id or ''}|{task_name}|{cause}|{failure_outcome(error, will_retry)}"
+    key = _day_key(date.today())
+    try:
+        pipe = get_redis().pipeline()
+        pipe.hincrby(key, field, 1)
+        pipe.expire(key, RETENTION_DAYS * 86400)
+        pipe.execute()
+    except redis.RedisError as e:
+        logger.warning("Failed to record failure of %s: %s", task_name, e)
+
+
+def failure_counts(days: int = 1, client=None, org_id: int = None) -> list:
+    """Failure counts for the last `days` days, most frequent first
+
+    With `org_id`, only that org's failures; otherwise the whole fleet.
+    """
+    client = client or get_redis()
+    today = date.today()
+    pipe = client.pipeline()
+    for offset in range(days):
+        pipe.hgetall(_day_key(today - timedelta(days=offset)))
+
+    totals = {}
+    for day_counts in pipe.execute():
+        for field, count in day_counts.items():
+            field = field.decode() if isinstance(field, bytes) else field
+            org, task, cause, outcome = field.split("|")
+            if org_id is not None and org != str(org_id):
+                continue
+            totals[task, cause, outcome] = totals.get((task, cause, outcome), 0) + int(count)
+
+    counts = [
+        {"task": task, "cause": cause, "outcome": outcome, "count": count}
+        for (task, cause, outcome), count in totals.items()
+    ]
+    return sorted(counts, key=lambda c: c["count"], reverse=True)
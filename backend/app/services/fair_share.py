@@ -0,0 +1,281 @@
+"""
+Per-org fair-share scheduling for worker tasks
+חלוקה הוגנת של משאבי העיבוד בין ארגונים
+
+Before a pipeline task does real work it asks for a slot for its org. A
+slot needs a token from the org's bucket (refilled at a rate weighted by
+the org's plan) and a free place under the org's concurrency cap. Both
+checks run in one Lua script so every worker in the fleet sees the same
+state. A task that is denied does not hold a worker, so a large org
+backfilling a backlog cannot starve small orgs.
+
+A denied call is parked in the database (`Call.deferred_at`) rather than
+re-sent with a countdown: ETA messages sit in worker memory whatever the
+prefetch limit, and re-sending every few seconds would churn the outbox
+and the broker for every waiting call. Parked calls form a per-org wait
+list. They are enqueued again, most urgent first, when a task of the same
+org and stage releases its slot, and by a periodic sweep
+(`dispatch_deferred_calls`) for capacity that frees up as buckets refill.
+
+Concurrency is tracked as leases in a sorted set scored by expiry, so a
+worker that dies without releasing its slot only holds it until the lease
+runs out.
+"""
+
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import redis
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.logging import get_logger
+from app.models import Call, CallStatusEnum, Organization, Transcript
+from app.redis_client import get_redis
+from app.services.outbox import enqueue_task, TASK_EXTRACT_INFO, TASK_TRANSCRIBE_CALL
+
+logger = get_logger(__name__)
+
+KEY_PREFIX = "fair-share:"
+
+STAGE_TRANSCRIBE = "transcribe"
+STAGE_EXTRACT = "extract"
+
+# Statuses of a call that is waiting for, or using, a worker of a stage
+STAGE_STATUSES = {
+    STAGE_TRANSCRIBE: [CallStatusEnum.PENDING_TRANSCRIPTION, CallStatusEnum.TRANSCRIBING],
+    STAGE_EXTRACT: [CallStatusEnum.EXTRACTING],
+}
+
+# KEYS: bucket hash, lease zset
+# ARGV: now, refill rate (tokens/s), burst, concurrency cap, lease id,
+#       lease ttl, retry delay when the cap is reached
+# Returns {1, 0} when admitted, {0, wait_ms} when not
+ACQUIRE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local burst = tonumber(ARGV[3])
+local cap = tonumber(ARGV[4])
+local ttl = tonumber(ARGV[6])
+
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', now)
+if redis.call('ZCARD', KEYS[2]) >= cap then
+    local first = redis.call('ZRANGE', KEYS[2], 0, 0, 'WITHSCORES')
+    local retry = tonumber(ARGV[7])
+    return {0, math.ceil(math.min(retry, tonumber(first[2]) - now) * 1000)}
+end
+
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or burst
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+if tokens < 1 then
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+    return {0, math.ceil((1 - tokens) / rate * 1000)}
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tokens - 1, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 60)
+redis.call('ZADD', KEYS[2], now + ttl, ARGV[5])
+redis.call('EXPIRE', KEYS[2], ttl + 60)
+return {1, 0}
+"""
+
+
+def _bucket_key(stage: str, org_id: int) -> str:
+    return f"{KEY_PREFIX}bucket:{stage}:{org_id}"
+
+
+def _lease_key(stage: str, org_id: int) -> str:
+    return f"{KEY_PREFIX}leases:{stage}:{org_id}"
+
+
+def plan_limits(plan: str) -> dict:
+    """Refill rate, burst and concurrency cap for an org's plan"""
+    weight = settings.fair_share_plan_weights.get(plan or "", 1.0)
+    return {
+        "rate_per_second": settings.fair_share_tokens_per_minute * weight / 60.0,
+        "burst": max(1.0, settings.fair_share_burst * weight),
+        "max_concurrency": max(1, int(settings.fair_share_max_concurrency * weight)),
+    }
+
+
+class FairShareLease:
+    """Outcome of an acquire; release it when the task finishes"""
+
+    def __init__(self, stage: str, org_id: int, lease_id: str = None, wait_seconds: float = 0.0):
+        self.stage = stage
+        self.org_id = org_id
+        self.lease_id = lease_id
+        self.wait_seconds = wait_seconds
+
+    @property
+    def admitted(self) -> bool:
+        return self.lease_id is not None
+
+    def release(self, client=None) -> None:
+        if not self.admitted:
+            return
+        try:
+            (client or get_redis()).zrem(_lease_key(self.stage, self.org_id), self.lease_id)
+        except redis.RedisError as e:
+            # The lease expires on its own
+            logger.warning("Failed to release %s slot of org %s: %s", self.stage, self.org_id, e)
+
+
+def acquire(stage: str, org_id: int, plan: str = None, client=None, now: float = None) -> FairShareLease:
+    """Ask for a worker slot for one task of an org
+
+    Fails open: if Redis is unavailable the task is admitted, so the
+    scheduler can never stop the pipeline on its own.
+    """
+    limits = plan_limits(plan)
+    lease_id = uuid.uuid4().hex
+    client = client or get_redis()
+    try:
+        admitted, wait_ms = client.eval(
+            ACQUIRE_SCRIPT,
+            2,
+            _bucket_key(stage, org_id),
+            _lease_key(stage, org_id),
+            now if now is not None else time.time(),
+            limits["rate_per_second"],
+            limits["burst"],
+            limits["max_concurrency"],
+            lease_id,
+            settings.fair_share_lease_seconds,
+            settings.fair_share_retry_seconds,
+        )
+    except redis.RedisError as e:
+        logger.warning("Fair-share scheduler unavailable, admitting task: %s", e)
+        return FairShareLease(stage, org_id, lease_id)
+
+    if admitted:
+        return FairShareLease(stage, org_id, lease_id)
+    return FairShareLease(stage, org_id, wait_seconds=max(1.0, int(wait_ms) / 1000.0))
+
+
+# Deferred calls
+
+def defer(call: Call, now: datetime = None) -> None:
+    """Park a call that was denied a slot; nothing is queued for it"""
+    call.deferred_at = now or datetime.utcnow()
+
+
+def dispatch_deferred(db: Session, stage: str, org_id: int, limit: int, now: datetime = None) -> list:
+    """Enqueue up to `limit` of an org's parked calls for a stage
+
+    Most urgent first, then longest waiting. Returns the call ids; the
+    caller commits.
+    """
+    if limit <= 0:
+        return []
+    now = now or datetime.utcnow()
+    calls = (
+        db.query(Call)
+        .filter(
+            Call.org_id == org_id,
+            Call.status.in_(STAGE_STATUSES[stage]),
+            Call.deferred_at.isnot(None),
+        )
+        .order_by(Call.priority, Call.deferred_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    dispatched = []
+    for call in calls:
+        if stage == STAGE_TRANSCRIBE:
+            enqueue_task(db, TASK_TRANSCRIBE_CALL, call.id, priority=call.priority)
+        else:
+            transcript = (
+                db.query(Transcript.id)
+                .filter(Transcript.call_id == call.id)
+                .order_by(Transcript.id.desc())
+                .first()
+            )
+            if transcript is None:
+                continue
+            enqueue_task(db, TASK_EXTRACT_INFO, transcript.id, priority=call.priority)
+        call.deferred_at = None
+        call.queued_at = now
+        dispatched.append(call.id)
+    return dispatched
+
+
+def dispatch_deferred_calls(db: Session, client=None, now: datetime = None) -> list:
+    """Enqueue parked calls each org has free slots for (periodic sweep)
+
+    Commits per org and stage. Returns (org_id, stage, call_ids) tuples.
+    """
+    now = now or datetime.utcnow()
+    client = client or get_redis()
+    orgs = (
+        db.query(Call.org_id, Organization.plan)
+        .join(Organization, Organization.id == Call.org_id)
+        .filter(Call.deferred_at.isnot(None))
+        .distinct()
+        .all()
+    )
+    dispatched = []
+    for org_id, plan in orgs:
+        cap = plan_limits(plan)["max_concurrency"]
+        for stage in STAGE_STATUSES:
+            try:
+                running = client.zcount(_lease_key(stage, org_id), time.time(), "+inf")
+            except redis.RedisError:
+                running = 0  # acquire fails open too
+            call_ids = dispatch_deferred(db, stage, org_id, cap - int(running), now=now)
+            db.commit()
+            if call_ids:
+                dispatched.append((org_id, stage, call_ids))
+    return dispatched
+
+
+def queue_depths(db: Session, client=None, now: datetime = None, org_id: int = None) -> list:
+    """Per-org waiting and running counts for each stage
+
+    `calls` counts calls in the stage's statuses (within the reaper
+    lookback, on the (org_id, created_at) index), whether waiting or being
+    worked on; `running` counts live leases. `org_id` limits it to one org.
+    """
+    now = now or datetime.utcnow()
+    client = client or get_redis()
+    query = db.query(Call.org_id, Call.status, func.count(Call.id))
+    if org_id is not None:
+        query = query.filter(Call.org_id == org_id)
+    rows = (
+        query.filter(
+            Call.created_at >= now - timedelta(hours=settings.call_reaper_lookback_hours),
+            Call.status.in_(
+                [status for statuses in STAGE_STATUSES.values() for status in statuses]
+            ),
+        )
+        .group_by(Call.org_id, Call.status)
+        .all()
+    )
+    counts = {}
+    for org_id, status, count in rows:
+        counts.setdefault(org_id, {})[status] = count
+
+    pipe = client.pipeline()
+    org_ids = sorted(counts)
+    for org_id in org_ids:
+        for stage in STAGE_STATUSES:
+            pipe.zcount(_lease_key(stage, org_id), time.time(), "+inf")
+    running = iter(pipe.execute())
+
+    depths = []
+    for org_id in org_ids:
+        for stage, statuses in STAGE_STATUSES.items():
+            depths.append(
+                {
+                    "org_id": org_id,
+                    "stage": stage,
+                    "calls": sum(counts[org_id].get(status, 0) for status in statuses),
+                    "running": int(next(running)),
+                }
+            )
+    return depths
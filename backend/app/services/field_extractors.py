@@ -0,0 +1,276 @@
+"""
+Deterministic field extractors for Hebrew service-call transcripts
+חילוץ שדות מבוסס כללים מתמלילי שיחות שירות
+
+Cheap regex/keyword rules that run on every transcript segment. Each
+extractor returns a partial dict in the ExtractionResult shape, containing
+only the fields it found.
+"""
+
+import re
+from datetime import date, timedelta
+
+PHONE_RE = re.compile(r"(?:\+972[-\s]?|0)(5\d|[2-489]|7\d)[-\s]?(\d{3})[-\s]?(\d{4})\b")
+EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+PRICE_RE = re.compile(
+    r"(?:₪\s*(\d{2,5}(?:\.\d+)?))|(?:(\d{2,5}(?:\.\d+)?)\s*(?:ש\"ח|ש״ח|שח\b|שקלים|שקל|₪))"
+)
+NAME_RE = re.compile(
+    r"(?<![א-ת])(?:קוראים לי|שמי|השם שלי)\s+([א-ת]{2,})(?![א-ת])(?:\s+([א-ת]{2,})(?![א-ת]))?"
+)
+STREET_RE = re.compile(r"(?:ברחוב|רחוב|ברח'|רח')\s+((?:[א-ת'\"]+\s){1,3}\d{1,4})")
+CLOCK_RE = re.compile(r"(?:ב-?|בשעה\s*)(\d{1,2})[:.](\d{2})")
+HOUR_RE = re.compile(r"בשעה\s+(\d{1,2})\b")
+NUMERIC_DATE_RE = re.compile(r"\b(\d{1,2})[/.](\d{1,2})(?:[/.](\d{2,4}))?\b")
+# Whole words, with an optional prefix ("למחר", "ומחר") - "המחרטה" is not tomorrow
+TOMORROW_RE = re.compile(r"(?<![א-ת])(?:ו|ל|ש|ול)?מחר(?![א-ת])")
+DAY_AFTER_TOMORROW_RE = re.compile(r"(?<![א-ת])(?:ו|ל|ש|ול)?מחרתיים(?![א-ת])")
+
+DEVICE_CATEGORIES = {
+    "מזגן": "מזגן",
+    "מקרר": "מקרר",
+    "מקפיא": "מקפיא",
+    "מכונת כביסה": "מכונת כביסה",
+    "מייבש": "מייבש כביסה",
+    "מדיח": "מדיח כלים",
+    "תנור": "תנור",
+    "כיריים": "כיריים",
+    "הדוד": "דוד מים",
+    "דוד שמש": "דוד מים",
+    "מיקרוגל": "מיקרוגל",
+}
+
+BRANDS = {
+    "תדיראן": "Tadiran",
+    "אלקטרה": "Electra",
+    "טורנדו": "Tornado",
+    "מיני מרכזי": "Mini Central",
+    "סמסונג": "Samsung",
+    "אל ג'י": "LG",
+    "אלג'י": "LG",
+    "LG": "LG",
+    "בוש": "Bosch",
+    "סימנס": "Siemens",
+    "אלקטרולוקס": "Electrolux",
+    "וירפול": "Whirlpool",
+    "בקו": "Beko",
+    "שארפ": "Sharp",
+    "היטאצ'י": "Hitachi",
+}
+
+URGENCY_KEYWORDS = {
+    "חירום": "urgent",
+    "דחוף": "urgent",
+    "דחופה": "urgent",
+    "אין חימום": "urgent",
+    "אין מים חמים": "urgent",
+    "נוזל": "high",
+    "בהקדם": "high",
+    # Not a bare "היום": any call that mentions today would be urgent
+    "עוד היום": "high",
+}
+
+CITIES = [
+    "תל אביב",
+    "ירושלים",
+    "חיפה",
+    "באר שבע",
+    "ראשון לציון",
+    "פתח תקווה",
+    "אשדוד",
+    "נתניה",
+    "חולון",
+    "בני ברק",
+    "רמת גן",
+    "רחובות",
+    "בת ים",
+    "אשקלון",
+    "הרצליה",
+    "כפר סבא",
+    "רעננה",
+    "מודיעין",
+    "גבעתיים",
+    "הוד השרון",
+]
+
+WEEKDAYS = {
+    "ראשון": 6,
+    "שני": 0,
+    "שלישי": 1,
+    "רביעי": 2,
+    "חמישי": 3,
+    "שישי": 4,
+}
+
+HOUR_WORDS = {
+    "אחת": 1,
+    "שתיים": 2,
+    "שלוש": 3,
+    "ארבע": 4,
+    "חמש": 5,
+    "שש": 6,
+    "שבע": 7,
+    "שמונה": 8,
+    "תשע": 9,
+    "עשר": 10,
+    "אחת עשרה": 11,
+    "שתים עשרה": 12,
+}
+
+NAME_STOPWORDS = {"אני", "רציתי", "מתקשר", "מתקשרת", "בקשר", "לגבי", "יש", "לי",
+                  "לא", "עם", "על", "את", "זה", "הוא", "היא", "גם", "רק", "כן", "אבל"}
+
+
+def extract_phone(text: str) -> dict:
+    matches = PHONE_RE.findall(text)
+    if not matches:
+        return {}
+    prefix, middle, last = matches[-1]
+    return {"customer": {"phone": f"0{prefix}{middle}{last}"}}
+
+
+def extract_email(text: str) -> dict:
+    matches = EMAIL_RE.findall(text)
+    if not matches:
+        return {}
+    return {"customer": {"email": matches[-1].rstrip(".").lower()}}
+
+
+def extract_price(text: str) -> dict:
+    matches = PRICE_RE.findall(text)
+    if not matches:
+        return {}
+    # The last price mentioned is the one agreed on
+    value = next(v for v in matches[-1] if v)
+    return {"quote": {"agreed_price": float(value), "currency": "ILS"}}
+
+
+def extract_name(text: str) -> dict:
+    match = NAME_RE.search(text)
+    if not match or match.group(1) in NAME_STOPWORDS:
+        return {}
+    name = match.group(1)
+    last = match.group(2)
+    if last and last not in NAME_STOPWORDS and not last.startswith("ו"):
+        name = f"{name} {last}"
+    return {"customer": {"name": name}}
+
+
+def extract_device(text: str) -> dict:
+    device = {}
+    for keyword, category in DEVICE_CATEGORIES.items():
+        if keyword in text:
+            device["category"] = category
+            break
+    for keyword, brand in BRANDS.items():
+        if keyword in text:
+            device["brand"] = brand
+            break
+    for keyword, urgency in URGENCY_KEYWORDS.items():
+        if keyword in text:
+            device["urgency"] = urgency
+            if urgency == "urgent":
+                break
+    return {"device": device} if device else {}
+
+
+def extract_address_parts(text: str) -> dict:
+    """Street and city - returned separately since either may come first"""
+    parts = {}
+    street = STREET_RE.search(text)
+    if street:
+        parts["line1"] = street.group(1).strip()
+    for city in CITIES:
+        if city in text:
+            parts["city"] = city
+            break
+    return parts
+
+
+def extract_appointment(text: str, reference_date: date = None) -> dict:
+    reference_date = reference_date or date.today()
+    appointment = {}
+
+    if DAY_AFTER_TOMORROW_RE.search(text):
+        appointment["date"] = (reference_date + timedelta(days=2)).isoformat()
+    elif TOMORROW_RE.search(text):
+        appointment["date"] = (reference_date + timedelta(days=1)).isoformat()
+    else:
+        for word, weekday in WEEKDAYS.items():
+            if f"יום {word}" in text:
+                days_ahead = (weekday - reference_date.weekday()) % 7 or 7
+                appointment["date"] = (
+                    reference_date + timedelta(days=days_ahead)
+                ).isoformat()
+                break
+        else:
+            numeric = NUMERIC_DATE_RE.search(text)
+            if numeric:
+                day, month, year = numeric.groups()
+                year = int(year) if year else reference_date.year
+                if year < 100:
+                    year += 2000
+                try:
+                    appointment["date"] = date(year, int(month), int(day)).isoformat()
+                except ValueError:
+                    pass
+
+    hour = minute = None
+    clock = CLOCK_RE.search(text)
+    if clock:
+        hour, minute = int(clock.group(1)), int(clock.group(2))
+    else:
+        numeric_hour = HOUR_RE.search(text)
+        if numeric_hour:
+            hour, minute = int(numeric_hour.group(1)), 0
+        else:
+            # Longest words first so "אחת עשרה" wins over "אחת"
+            for word in sorted(HOUR_WORDS, key=len, reverse=True):
+                if re.search(rf"(?:ב-?|בשעה\s+){word}(?:\s|$|[.,])", text):
+                    hour, minute = HOUR_WORDS[word], 0
+                    break
+    if hour is not None and hour < 24 and minute < 60:
+        # Technicians work days - "בשלוש" means 15:00, not 03:00
+        if hour < 8:
+            hour += 12
+        appointment["time"] = f"{hour:02d}:{minute:02d}"
+
+    return {"appointment": appointment} if appointment else {}
+
+
+FIELD_EXTRACTORS = [
+    extract_phone,
+    extract_email,
+    extract_price,
+    extract_name,
+    extract_device,
+]
+
+
+def extract_fields(text: str, reference_date: date = None) -> dict:
+    """Run every deterministic extractor over `text` and merge the results"""
+    result = {}
+    for extractor in FIELD_EXTRACTORS:
+        merge_fields(result, extractor(text))
+    merge_fields(result, extract_appointment(text, reference_date))
+    return result
+
+
+def merge_fields(base: dict, update: dict) -> list:
+    """Deep-merge non-null values from `update` into `base`
+
+    Returns the dotted paths of fields whose value changed.
+    """
+    changed = []
+    for key, value in update.items():
+        if value is None:
+            continue
+        if isinstance(value, dict):
+            target = base.get(key)
+            if not isinstance(target, dict):
+                target = base[key] = {}
+            changed.extend(f"{key}.{path}" for path in merge_fields(target, value))
+        elif base.get(key) != value:
+            base[key] = value
+            changed.append(key)
+    return changed
@@ -0,0 +1,107 @@
+"""
+Liveness and readiness checks
+בדיקות חיות ומוכנות של השרת ותלויותיו
+
+Readiness probes every dependency concurrently, each with its own timeout,
+and reports per-dependency latency. Results are cached for
+`health_cache_seconds` and concurrent requests share a single probe run,
+so a load balancer polling every instance cannot turn health checks into
+database load.
+"""
+
+import asyncio
+import time
+from typing import Callable, Dict
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import text
+
+from app.config import settings
+from app.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+def probe_postgres() -> None:
+    from app.deps import engine
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+
+def probe_redis() -> None:
+    from app.redis_client import get_redis
+
+    get_redis().ping()
+
+
+def probe_minio() -> None:
+    from app.services.storage import storage_service
+
+    storage_service.client.head_bucket(Bucket=storage_service.bucket)
+
+
+def probe_whisper() -> None:
+    # Loads the fast model on first use; until it is in memory the
+    # instance cannot serve live calls
+    from app.services.transcribe import transcription_service
+
+    transcription_service.warm_up()
+
+
+PROBES: Dict[str, Callable[[], None]] = {
+    "postgres": probe_postgres,
+    "redis": probe_redis,
+    "minio": probe_minio,
+    "whisper": probe_whisper,
+}
+
+
+class HealthChecker:
+    """Runs readiness probes concurrently and caches the outcome"""
+
+    def __init__(self, probes: Dict[str, Callable[[], None]], ttl: float, timeout: float):
+        self.probes = probes
+        self.ttl = ttl
+        self.timeout = timeout
+        self._result = None
+        self._checked_at = 0.0
+        self._lock = None
+
+    async def _probe(self, name: str, probe: Callable[[], None]) -> dict:
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(run_in_threadpool(probe), self.timeout)
+            check = {"ok": True}
+        except asyncio.TimeoutError:
+            check = {"ok": False, "error": f"timed out after {self.timeout}s"}
+        except Exception as e:
+            check = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        check["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        if not check["ok"]:
+            logger.warning("Readiness probe %s failed: %s", name, check["error"])
+        return check
+
+    async def check(self) -> dict:
+        """{"ready": bool, "checks": {name: {"ok", "latency_ms", "error"?}}}"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._result is None or time.monotonic() - self._checked_at >= self.ttl:
+                names = list(self.probes)
+                checks = await asyncio.gather(
+                    *(self._probe(name, self.probes[name]) for name in names)
+                )
+                self._result = {
+                    "ready": all(check["ok"] for check in checks),
+                    "checks": dict(zip(names, checks)),
+                }
+                self._checked_at = time.monotonic()
+        return self._result
+
+
+health_checker = HealthChecker(
+    {name: PROBES[name] for name in settings.health_ready_checks},
+    ttl=settings.health_cache_seconds,
+    timeout=settings.health_probe_timeout_seconds,
+)
@@ -0,0 +1,106 @@
+"""
+Incremental extraction for live calls
+חילוץ מידע מצטבר בזמן שיחה חיה
+
+Deterministic field extractors run on every committed transcript segment.
+The LLM is only asked for a full extraction when the rules found something
+new or enough new speech has accumulated, and never more often than the
+configured interval.
+
+A live call adds segments and runs LLM refreshes from different threadpool
+threads, so the extractor's state is guarded by a lock. The LLM call
+itself runs outside it.
+"""
+
+import threading
+import time
+from datetime import date
+
+from app.config import settings
+from app.schemas import ExtractionResult
+from app.services.errors import ServiceError
+from app.services.field_extractors import (
+    extract_address_parts,
+    extract_fields,
+    merge_fields,
+)
+
+
+class IncrementalExtractor:
+    """Builds an ExtractionResult from transcript segments as they arrive"""
+
+    def __init__(self, llm=None, reference_date: date = None):
+        if llm is None:
+            from app.services.extract import llm_service as llm
+        self.llm = llm
+        self.reference_date = reference_date
+        self.segments = []
+        self.data = {}
+        self._address = {}
+        self._words_since_llm = 0
+        self._rule_changes_since_llm = False
+        self._last_llm_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def transcript(self) -> str:
+        return " ".join(self.segments).strip()
+
+    @property
+    def result(self) -> ExtractionResult:
+        with self._lock:
+            return ExtractionResult.model_validate(self.data)
+
+    def add_segment(self, text: str) -> list:
+        """Run the cheap extractors on a new segment; returns changed fields"""
+        text = text.strip()
+        if not text:
+            return []
+
+        with self._lock:
+            # Include the previous segment so values split across a segment
+            # boundary (e.g. a phone number) are still matched
+            context = f"{self.segments[-1]} {text}" if self.segments else text
+            self.segments.append(text)
+            self._words_since_llm += len(text.split())
+
+            changed = merge_fields(self.data, extract_fields(context, self.reference_date))
+            changed.extend(self._merge_address(extract_address_parts(context)))
+            if changed:
+                self._rule_changes_since_llm = True
+            return changed
+
+    def needs_llm(self) -> bool:
+        """Whether there is enough new information to justify an LLM call"""
+        if time.monotonic() - self._last_llm_at < settings.incremental_llm_min_interval_seconds:
+            return False
+        return (
+            self._rule_changes_since_llm
+            or self._words_since_llm >= settings.incremental_llm_min_new_words
+        )
+
+    def refresh_with_llm(self) -> list:
+        """Run a full LLM extraction over the transcript so far"""
+        with self._lock:
+            self._last_llm_at = time.monotonic()
+            self._words_since_llm = 0
+            self._rule_changes_since_llm = False
+            transcript = self.transcript
+
+        try:
+            result = self.llm.extract_information(transcript)
+        except ServiceError:
+            # Live updates are best effort; the final extraction retries properly
+            return []
+        if result.confidence == 0.0:
+            # LLMService reports unparseable output as a zero-confidence result
+            return []
+        with self._lock:
+            return merge_fields(self.data, result.model_dump(exclude_none=True))
+
+    def _merge_address(self, parts: dict) -> list:
+        # Called with the lock held
+        self._address.update(parts)
+        if "line1" in self._address and "city" in self._address:
+            return merge_fields(self.data, {"customer": {"address": dict(self._address)}})
+        return []
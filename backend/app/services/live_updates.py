@@ -0,0 +1,88 @@
+"""
+Fan-out of live call updates over Redis pub/sub
+הפצת עדכונים חיים של שיחה למנויים דרך Redis
+
+The API instance that holds a call's media stream publishes transcript and
+extraction updates; dashboard clients subscribed to that call receive
+them over a WebSocket, on whichever API instance they are connected to.
+The latest update of each kind is kept in a Redis hash so clients joining
+mid-call get the current state immediately.
+"""
+
+import asyncio
+import json
+from typing import Optional
+
+import redis
+
+from app.logging import get_logger
+from app.redis_client import get_async_redis
+from app.services.events import RedisBroadcaster
+
+logger = get_logger(__name__)
+
+CHANNEL_PREFIX = "live-call:"
+SNAPSHOT_PREFIX = "live-call-state:"
+# Outlives any call; a stream that dies without closing is forgotten after it
+SNAPSHOT_TTL_SECONDS = 6 * 3600
+
+
+def live_channel(call_id: int) -> str:
+    return f"{CHANNEL_PREFIX}{call_id}"
+
+
+def _snapshot_key(call_id: int) -> str:
+    return f"{SNAPSHOT_PREFIX}{call_id}"
+
+
+class LiveUpdateHub:
+    """Publish/subscribe for updates about calls in progress"""
+
+    def __init__(self, max_queue_size: int = 100, client_factory=None, redis_factory=None):
+        self._broadcaster = RedisBroadcaster(
+            f"{CHANNEL_PREFIX}*", "call_id", max_queue_size, client_factory
+        )
+        self._redis = redis_factory or get_async_redis
+
+    def subscribe(self, call_id: int) -> asyncio.Queue:
+        return self._broadcaster.subscribe(call_id)
+
+    def unsubscribe(self, call_id: int, queue: asyncio.Queue):
+        self._broadcaster.unsubscribe(call_id, queue)
+
+    async def publish(self, call_id: int, org_id: int, kind: str, payload: dict):
+        """Record the latest `kind` update for a call and push it to subscribers
+
+        Never raises - a missed update must not end the call's stream.
+        """
+        message = {"type": kind, "call_id": call_id, **payload}
+        key = _snapshot_key(call_id)
+        try:
+            pipe = self._redis().pipeline()
+            pipe.hset(key, mapping={"org_id": org_id, kind: json.dumps(payload)})
+            pipe.expire(key, SNAPSHOT_TTL_SECONDS)
+            pipe.publish(live_channel(call_id), json.dumps(message))
+            await pipe.execute()
+        except redis.RedisError as e:
+            logger.warning("Failed to publish %s update of call %s: %s", kind, call_id, e)
+
+    async def latest(self, call_id: int) -> Optional[dict]:
+        fields = await self._redis().hgetall(_snapshot_key(call_id))
+        if not fields:
+            return None
+        snapshot = {}
+        for field, value in fields.items():
+            field = field.decode() if isinstance(field, bytes) else field
+            snapshot[field] = int(value) if field == "org_id" else json.loads(value)
+        return snapshot
+
+    async def close(self, call_id: int, org_id: int, payload: dict = None):
+        """Send a final message and forget the call"""
+        await self.publish(call_id, org_id, "closed", payload or {})
+        try:
+            await self._redis().delete(_snapshot_key(call_id))
+        except redis.RedisError as e:
+            logger.warning("Failed to drop the live state of call %s: %s", call_id, e)
+
+
+live_updates = LiveUpdateHub()
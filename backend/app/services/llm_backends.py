@@ -0,0 +1,215 @@
+"""
+Chat-completion clients behind LLMService
+לקוחות מודל שפה עבור שירות החילוץ
+
+LLMService talks to anything shaped like `openai.OpenAI().chat.completions`.
+Besides the real client (llm_backend="openai") there are two offline ones,
+for benchmarks, load tests and local runs:
+
+- "stub": answers extraction prompts with the deterministic field
+  extractors, and takes as long as the latency model says a real model
+  would.
+- "replay": answers from replies recorded earlier against the real API
+  (see RecordingChatClient), and fails on a prompt it has not seen. A
+  changed prompt therefore needs a new recording.
+
+Every response carries `simulated_seconds`, the model time it stands for,
+whether or not it was slept.
+"""
+
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date
+from types import SimpleNamespace
+from typing import Optional
+
+from app.config import settings
+from app.services.errors import PermanentServiceError
+from app.services.field_extractors import extract_fields
+from app.services.llm_prompt import (
+    REASK_SYSTEM_PROMPT,
+    SUMMARY_PROMPT,
+    count_message_tokens,
+    count_tokens,
+    split_sentences,
+)
+
+TRANSCRIPT_RE = re.compile(r"```(.*?)```", re.DOTALL)
+
+
+class RecordingMissing(PermanentServiceError):
+    """The replay client has no recorded reply for a prompt"""
+
+
+@dataclass
+class LatencyModel:
+    """Time to first token plus generation, with log-normal jitter"""
+
+    base_seconds: float = 0.35
+    seconds_per_prompt_token: float = 0.0002
+    seconds_per_completion_token: float = 0.012
+    jitter: float = 0.25
+
+    def sample(self, rng: random.Random, prompt_tokens: int, completion_tokens: int) -> float:
+        seconds = (
+            self.base_seconds
+            + prompt_tokens * self.seconds_per_prompt_token
+            + completion_tokens * self.seconds_per_completion_token
+        )
+        return seconds * rng.lognormvariate(0, self.jitter) if self.jitter else seconds
+
+
+def _response(content: str, prompt_tokens: int, completion_tokens: int, seconds: float):
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+        usage=SimpleNamespace(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            total_tokens=prompt_tokens + completion_tokens,
+        ),
+        simulated_seconds=seconds,
+    )
+
+
+class _Completions:
+    def __init__(self, create):
+        self.create = create
+
+
+class ChatClient:
+    """OpenAI-shaped client: `client.chat.completions.create(**kwargs)`"""
+
+    name = "base"
+
+    def __init__(self):
+        self.chat = SimpleNamespace(completions=_Completions(self.create))
+
+    def create(self, model: str, messages: list, max_tokens: int = None, **kwargs):
+        raise NotImplementedError
+
+
+class StubChatClient(ChatClient):
+    """Answers with the rule-based extractors, timed by a latency model
+
+    `sleep=False` returns at once (benchmarks add `simulated_seconds`
+    themselves); load tests sleep so workers are held as long as a real
+    call would hold them.
+    """
+
+    name = "stub"
+
+    def __init__(
+        self,
+        latency: LatencyModel = None,
+        sleep: bool = None,
+        reference_date: date = None,
+        seed: int = 0,
+    ):
+        super().__init__()
+        self.latency = latency or LatencyModel()
+        self.sleep = settings.llm_stub_sleep if sleep is None else sleep
+        self.reference_date = reference_date
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _reply(self, messages: list) -> str:
+        if messages[0]["content"].startswith(SUMMARY_PROMPT):
+            summaries = messages[0]["content"][len(SUMMARY_PROMPT):].splitlines()
+            return " ".join(line.split(". ", 1)[-1] for line in summaries)
+
+        match = TRANSCRIPT_RE.search(messages[-1]["content"])
+        transcript = match.group(1) if match else ""
+        reply = extract_fields(transcript, self.reference_date)
+        if messages[0]["content"] != REASK_SYSTEM_PROMPT:
+            reply["free_text_summary_he"] = " ".join(split_sentences(transcript)[:2])[:200]
+            reply["confidence"] = 0.5 if reply else 0.1
+        return json.dumps(reply, ensure_ascii=False, separators=(",", ":"))
+
+    def create(self, model: str, messages: list, max_tokens: int = None, **kwargs):
+        content = self._reply(messages)
+        prompt_tokens = count_message_tokens(messages)
+        completion_tokens = count_tokens(content)
+        if max_tokens is not None and completion_tokens > max_tokens:
+            # Cut off like a real model, mid-JSON
+            content = content[: len(content) * max_tokens // completion_tokens]
+            completion_tokens = max_tokens
+        with self._lock:
+            seconds = self.latency.sample(self._rng, prompt_tokens, completion_tokens)
+        if self.sleep:
+            time.sleep(seconds)
+        return _response(content, prompt_tokens, completion_tokens, seconds)
+
+
+def prompt_key(model: str, messages: list, max_tokens: Optional[int]) -> str:
+    payload = json.dumps([model, messages, max_tokens], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+class RecordingChatClient(ChatClient):
+    """Replays recorded replies; records them when given a real client
+
+    Recordings are one JSON file mapping a hash of (model, messages,
+    max_tokens) to the reply, its token usage and how long it took.
+    """
+
+    name = "replay"
+
+    def __init__(self, path: str, client=None):
+        super().__init__()
+        self.path = path
+        self.client = client
+        self._lock = threading.Lock()
+        try:
+            with open(path, encoding="utf-8") as f:
+                self.recordings = json.load(f)
+        except FileNotFoundError:
+            self.recordings = {}
+
+    def create(self, model: str, messages: list, max_tokens: int = None, **kwargs):
+        key = prompt_key(model, messages, max_tokens)
+        recording = self.recordings.get(key)
+        if recording is None:
+            if self.client is None:
+                raise RecordingMissing(
+                    "llm_recording_missing", f"No recorded reply for prompt {key[:12]}"
+                )
+            recording = self._record(key, model, messages, max_tokens, **kwargs)
+        return _response(
+            recording["content"],
+            recording["prompt_tokens"],
+            recording["completion_tokens"],
+            recording["seconds"],
+        )
+
+    def _record(self, key: str, model: str, messages: list, max_tokens: int, **kwargs) -> dict:
+        started = time.perf_counter()
+        response = self.client.chat.completions.create(
+            model=model, messages=messages, max_tokens=max_tokens, **kwargs
+        )
+        recording = {
+            "content": response.choices[0].message.content or "",
+            "prompt_tokens": response.usage.prompt_tokens,
+            "completion_tokens": response.usage.completion_tokens,
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+        with self._lock:
+            self.recordings[key] = recording
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(self.recordings, f, ensure_ascii=False, indent=1, sort_keys=True)
+        return recording
+
+
+def get_chat_client(name: str = None):
+    """The configured offline client ("stub" or "replay")"""
+    name = name or settings.llm_backend
+    if name == StubChatClient.name:
+        return StubChatClient()
+    if name == RecordingChatClient.name:
+        return RecordingChatClient(settings.llm_recordings_path)
+    raise ValueError(f"Unknown LLM backend: {name}")
+
@@ -0,0 +1,237 @@
+"""
+Tolerant parsing of LLM JSON output
+פענוח סלחני של פלט JSON ממודל השפה
+
+The model is asked for JSON only, but regularly wraps it in a markdown
+fence, adds a sentence before or after it, or makes a small syntax error:
+
+- a trailing comma before a closing bracket;
+- Python literals (None, True, False) or single-quoted strings;
+- a line break inside a string, or a // comment;
+- output cut off by max_tokens, which leaves brackets and strings open.
+
+`parse_json_object` takes the first JSON object out of the text and
+repairs these in a single string-aware pass. Strict `json.loads` is tried
+first, so well-formed output pays for nothing else.
+
+`parse_extraction` then validates the object against ExtractionResult one
+top-level section at a time. A section that fails validation is dropped
+and reported in `invalid`, instead of failing the whole extraction, so the
+caller can re-ask the model for those sections only.
+"""
+
+import json
+import re
+import typing
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Optional
+
+from pydantic import BaseModel, ValidationError
+
+from app.schemas import ExtractionResult, extraction_result_adapter
+
+FENCE_RE = re.compile(r"```[a-zA-Z]*\s*\n?(.*?)(?:```|$)", re.DOTALL)
+
+_LITERALS = {
+    "None": "null", "True": "true", "False": "false",
+    "null": "null", "true": "true", "false": "false",
+}
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+def _strip_fences(text: str) -> str:
+    match = FENCE_RE.search(text)
+    return match.group(1) if match else text
+
+
+def _repair(text: str) -> str:
+    """Rewrite near-JSON starting at the first "{" as JSON
+
+    Copies the first object (ignoring anything after it), normalizing
+    quotes, literals and comments, dropping trailing commas and closing
+    whatever truncation left open.
+    """
+    out = []
+    stack = []
+    quote = None  # the quote character of the string we are in
+    i = text.index("{")
+    n = len(text)
+
+    while i < n:
+        ch = text[i]
+
+        if quote is not None:
+            if ch == "\\" and i + 1 < n:
+                nxt = text[i + 1]
+                # \' is not a JSON escape
+                out.append("'" if nxt == "'" else ch + nxt)
+                i += 2
+                continue
+            if ch == quote:
+                out.append('"')
+                quote = None
+            elif ch == '"':
+                out.append('\\"')  # inside a single-quoted string
+            elif ch == "\n":
+                out.append("\\n")
+            elif ch in "\r\t":
+                out.append("\\r" if ch == "\r" else "\\t")
+            else:
+                out.append(ch)
+            i += 1
+            continue
+
+        if ch in "\"'“”":
+            quote = {'"': '"', "'": "'", "“": "”", "”": "”"}[ch]
+            out.append('"')
+        elif ch in "{[":
+            stack.append(ch)
+            out.append(ch)
+        elif ch in "}]":
+            _drop_trailing_comma(out)
+            if stack:
+                stack.pop()
+            out.append(ch)
+            if not stack:
+                break
+        elif ch == "/" and text.startswith("//", i):
+            end = text.find("\n", i)
+            i = n if end == -1 else end
+            continue
+        elif ch == "/" and text.startswith("/*", i):
+            end = text.find("*/", i + 2)
+            i = n if end == -1 else end + 2
+            continue
+        elif ch.isalpha() and out and out[-1][-1:] in "0123456789.":
+            out.append(ch)  # exponent of a number
+        elif ch.isalpha():
+            j = i
+            while j < n and (text[j].isalnum() or text[j] == "_"):
+                j += 1
+            word = text[i:j]
+            out.append(_LITERALS.get(word, f'"{word}"'))
+            i = j
+            continue
+        else:
+            out.append(ch)
+        i += 1
+
+    # Truncated output: close the open string and brackets
+    if quote is not None:
+        out.append('"')
+    while stack:
+        _drop_dangling(out)
+        out.append(_CLOSERS[stack.pop()])
+    return "".join(out)
+
+
+def _drop_trailing_comma(out: list) -> None:
+    j = len(out) - 1
+    while j >= 0 and out[j].isspace():
+        j -= 1
+    if j >= 0 and out[j] == ",":
+        del out[j]
+
+
+def _drop_dangling(out: list) -> None:
+    """Remove a trailing comma, or a key left without its value"""
+    text = "".join(out).rstrip()
+    text = re.sub(r',?\s*"(?:[^"\\]|\\.)*"\s*:\s*$', "", text)
+    text = text.rstrip().rstrip(",")
+    out[:] = [text]
+
+
+def parse_json_object(text: str) -> dict:
+    """The first JSON object in `text`, repaired if needed
+
+    Raises ValueError when there is no object to be found.
+    """
+    text = _strip_fences(text or "").strip().lstrip("\ufeff")
+    try:
+        value = json.loads(text)
+        if isinstance(value, dict):
+            return value
+    except ValueError:
+        pass
+    if "{" not in text:
+        raise ValueError("No JSON object in model output")
+    value = json.loads(_repair(text))
+    if not isinstance(value, dict):
+        raise ValueError("Model output is not a JSON object")
+    return value
+
+
+@dataclass
+class ParsedExtraction:
+    """What could be taken from one model reply"""
+
+    result: ExtractionResult
+    # Top-level sections that were present but invalid, with the reason
+    invalid: Dict[str, str] = field(default_factory=dict)
+    repaired: bool = False
+
+
+def _errors_by_section(error: ValidationError) -> Dict[str, str]:
+    sections = {}
+    for item in error.errors(include_url=False):
+        section = str(item["loc"][0]) if item["loc"] else "__root__"
+        location = ".".join(str(part) for part in item["loc"])
+        sections.setdefault(section, f"{location}: {item['msg']}")
+    return sections
+
+
+def validate_sections(data: dict) -> tuple:
+    """(valid sections as a dict, {section: reason} for the invalid ones)"""
+    known = {name: data[name] for name in ExtractionResult.model_fields if name in data}
+    try:
+        extraction_result_adapter.validate_python(known)
+        return known, {}
+    except ValidationError as e:
+        invalid = _errors_by_section(e)
+    valid = {name: value for name, value in known.items() if name not in invalid}
+    return valid, invalid
+
+
+def parse_extraction(text: Optional[str]) -> ParsedExtraction:
+    """Validate as much of a model reply as possible
+
+    Raises ValueError when the reply holds no JSON object at all.
+    """
+    try:
+        return ParsedExtraction(extraction_result_adapter.validate_json(text or ""))
+    except ValidationError:
+        pass
+    data = parse_json_object(text)
+    valid, invalid = validate_sections(data)
+    return ParsedExtraction(
+        result=extraction_result_adapter.validate_python(valid),
+        invalid=invalid,
+        repaired=True,
+    )
+
+
+def _model_of(annotation) -> Optional[type]:
+    for arg in typing.get_args(annotation) or (annotation,):
+        if isinstance(arg, type) and issubclass(arg, BaseModel):
+            return arg
+    return None
+
+
+def _template_of(model: type) -> dict:
+    template = {}
+    for name, model_field in model.model_fields.items():
+        nested = _model_of(model_field.annotation)
+        if nested is not None:
+            template[name] = _template_of(nested)
+        else:
+            template[name] = None if model_field.is_required() else model_field.default
+    return template
+
+
+def section_templates(sections: Iterable[str]) -> dict:
+    """An example value per section, with every field at its default
+
+    Shown to the model as a compact stand-in for the schema.
+    """
+    full = _template_of(ExtractionResult)
+    return {name: full[name] for name in sections}
@@ -0,0 +1,272 @@
+"""
+Token-budgeted prompts for transcript extraction
+בניית פרומפטים בתקציב טוקנים לחילוץ מידע מתמלילים
+
+Transcripts are compacted before they are sent: filler words, non-speech
+markers (hold music, ringing), IVR boilerplate, greetings the call already
+had and sentences the transcriber repeated are dropped. None of these
+carry anything the extraction needs.
+
+Tokens are counted locally with tiktoken. Where its encoding file cannot
+be loaded (no network and no TIKTOKEN_CACHE_DIR), a per-word estimate is
+used instead (about two Hebrew letters per token).
+
+A transcript longer than `llm_chunk_tokens` is split on sentence
+boundaries and extracted chunk by chunk (map); the partial results are
+merged in call order (reduce, see LLMService). `max_tokens` is set from
+the size of the JSON the model is expected to return rather than a fixed
+ceiling.
+"""
+
+import json
+import re
+import textwrap
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List
+
+from app.config import settings
+from app.logging import get_logger
+from app.schemas import ExtractionResult
+from app.services.llm_output import section_templates
+
+logger = get_logger(__name__)
+
+LLM_MODEL = "gpt-3.5-turbo"
+
+SYSTEM_PROMPT = textwrap.dedent(
+    """\
+    את/ה "סוכן הפקת מידע משיחות שירות".
+    קלט: תמליל שיחה בעברית. פלט: JSON תקין בלבד, בשורה אחת, במבנה הזה:
+    {template}
+    השמט/י שדות שלא מופיעים בשיחה. אל תנחש מחירים/כתובות אם אין רמזים.
+    free_text_summary_he: סיכום בעברית, 2-3 שורות, ברור לפעולה.
+    אם יש "ביום חמישי ב-שלוש" והמועד עבר – מלא follow_up שדורש תיאום מחדש.
+    confidence: 0-1, עד כמה המידע ודאי."""
+)
+
+PART_NOTE = "זהו חלק {part} מתוך {parts} של השיחה; מלא רק מה שמופיע בחלק זה.\n"
+
+REASK_SYSTEM_PROMPT = "את/ה מחזיר/ה JSON תקין בלבד, ללא טקסט נוסף. אם שדה לא מופיע – החזר null."
+
+SUMMARY_PROMPT = (
+    "אלה סיכומים של חלקי שיחת שירות אחת, לפי הסדר. "
+    "כתוב/י סיכום אחד בעברית, 2-3 שורות, ברור לפעולה. החזר/י את הסיכום בלבד.\n\n"
+)
+
+# Tokens
+
+@lru_cache(maxsize=None)
+def _encoding():
+    try:
+        import tiktoken
+
+        return tiktoken.encoding_for_model(LLM_MODEL)
+    except Exception as e:
+        logger.warning("tiktoken unavailable, estimating token counts: %s", e)
+        return None
+
+
+WORD_RE = re.compile(r"[\u0590-\u05ff]+|[A-Za-z]+|\d+|[^\w\s]+|\n\s*| {2,}")
+
+
+def _estimate_tokens(text: str) -> int:
+    count = 0
+    for word in WORD_RE.findall(text):
+        if "\u0590" <= word[0] <= "\u05ff":
+            count += (len(word) + 1) // 2
+        elif word[0].isalnum():
+            count += (len(word) + 3) // 4
+        elif word[0].isspace():
+            count += 1  # line breaks and indentation
+        else:
+            count += (len(word) + 1) // 2  # runs of punctuation merge
+    return count
+
+
+def count_tokens(text: str) -> int:
+    encoding = _encoding()
+    if encoding is None:
+        return _estimate_tokens(text)
+    return len(encoding.encode(text))
+
+
+def count_message_tokens(messages: List[dict]) -> int:
+    # Chat formatting adds a few tokens per message and for the reply
+    return sum(count_tokens(message["content"]) + 4 for message in messages) + 3
+
+
+# Compaction
+
+FILLER_WORDS = {"אה", "אהה", "אההה", "אמ", "אממ", "אמממ", "הממ", "מממ", "אום",
+                "uh", "um", "umm", "uhh", "hmm", "erm"}
+
+# Opening and closing greetings; a repeat of one carries nothing new
+GREETING_WORDS = {"שלום", "היי", "הי", "הלו", "בוקר", "ערב", "צהריים", "ביי", "להתראות"}
+
+# Words that may go with a greeting ("בוקר טוב", "תודה ולהתראות") but are not
+# one: alone, "טוב" or "תודה" can be the customer accepting an offer
+COURTESY_WORDS = {"טוב", "טובים", "תודה", "רבה", "ו", "ותודה", "ולהתראות", "וביי"}
+
+NON_SPEECH_RE = re.compile(
+    r"[\[(][^\])]*(?:מוזיקה|מנגינה|צלצול|שקט|רעש|music|ringing|silence|noise)[^\])]*[\])]"
+    r"|♪[^♪]*♪?",
+    re.IGNORECASE,
+)
+
+# Recorded menu phrasing. Only the run of these at the start or the end of a
+# call is dropped, so a customer using the same words mid-call is kept
+IVR_RE = re.compile(
+    r"\b(?:שיחה זו|השיחה) (?:מוקלטת|עשויה להיות מוקלטת)\b"
+    r"|\b(?:הקישו|הקישי|הקש) (?:על )?(?:ה?מקש |ה?ספרה )?\d"
+    r"|\bלח(?:צו|צי) על (?:ה?מקש|ה?ספרה)\b"
+    r"|\b(?:נא|אנא) (?:להמתין|המתינו|המתן)\b"
+    r"|\bשיחת(?:כם|ך) חשובה לנו\b"
+    r"|\bכל (?:הנציגים|נציגינו) (?:עסוקים|תפוסים)\b"
+    r"|\b(?:נציגנו|אחד מנציגינו|הנציג הבא) (?:יענה|יענו) (?:לך|לכם)\b"
+    r"|\bזמן ההמתנה (?:המשוער|הצפוי)\b"
+)
+
+SENTENCE_SPLIT_RE = re.compile(r"(?<=[.?!])\s+|\s*\n+\s*")
+WORD_SPLIT_RE = re.compile(r"\s+")
+
+
+def _words(sentence: str) -> List[str]:
+    return [word.strip(",.?!:;\"'-") for word in WORD_SPLIT_RE.split(sentence) if word]
+
+
+def _without_fillers(sentence: str) -> str:
+    kept = [word for word in WORD_SPLIT_RE.split(sentence)
+            if word and word.strip(",.?!:;-").lower() not in FILLER_WORDS]
+    return " ".join(kept).strip(" ,")
+
+
+def split_sentences(text: str) -> List[str]:
+    return [sentence for sentence in SENTENCE_SPLIT_RE.split(text) if sentence.strip()]
+
+
+def compact_transcript(text: str) -> str:
+    """The transcript without what cannot matter to extraction"""
+    kept = []
+    seen_greetings = set()
+    previous = None
+    sentences = split_sentences(NON_SPEECH_RE.sub(" ", text))
+    start, end = 0, len(sentences)
+    while start < end and IVR_RE.search(sentences[start]):
+        start += 1
+    while end > start and IVR_RE.search(sentences[end - 1]):
+        end -= 1
+    for sentence in sentences[start:end]:
+        sentence = _without_fillers(sentence)
+        words = [word for word in _words(sentence) if word]
+        if not words:
+            continue
+        normalized = " ".join(words)
+        if normalized == previous:
+            continue  # the transcriber repeating itself
+        previous = normalized
+        if (any(word in GREETING_WORDS for word in words)
+                and all(word in GREETING_WORDS or word in COURTESY_WORDS for word in words)):
+            if normalized in seen_greetings:
+                continue
+            seen_greetings.add(normalized)
+        kept.append(sentence)
+    return " ".join(kept)
+
+
+def split_transcript(text: str, max_tokens: int) -> List[str]:
+    """Sentence-aligned chunks of at most `max_tokens` (longer sentences alone)"""
+    chunks, current, size = [], [], 0
+    for sentence in split_sentences(text):
+        tokens = count_tokens(sentence) + 1
+        if current and size + tokens > max_tokens:
+            chunks.append(" ".join(current))
+            current, size = [], 0
+        current.append(sentence)
+        size += tokens
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+# Prompts
+
+@dataclass
+class Prompt:
+    messages: List[dict]
+    max_tokens: int
+    transcript: str  # the (compacted) part of the transcript it covers
+
+    @property
+    def prompt_tokens(self) -> int:
+        return count_message_tokens(self.messages)
+
+
+def _template(sections) -> str:
+    return json.dumps(section_templates(sections), ensure_ascii=False, separators=(",", ":"))
+
+
+def _output_tokens(template: str, slack: int) -> int:
+    # Replies are usually pretty-printed, which costs about half again
+    return count_tokens(template) * 3 // 2 + slack
+
+
+@lru_cache(maxsize=None)
+def _system_prompt() -> str:
+    return SYSTEM_PROMPT.format(template=_template(ExtractionResult.model_fields))
+
+
+def extraction_prompts(transcript_text: str) -> List[Prompt]:
+    """One prompt per chunk of the compacted transcript"""
+    transcript = compact_transcript(transcript_text)
+    chunks = split_transcript(transcript, settings.llm_chunk_tokens) or [transcript]
+    max_tokens = _output_tokens(
+        _template(ExtractionResult.model_fields), settings.llm_output_slack_tokens
+    )
+    prompts = []
+    for part, chunk in enumerate(chunks, start=1):
+        note = PART_NOTE.format(part=part, parts=len(chunks)) if len(chunks) > 1 else ""
+        prompts.append(
+            Prompt(
+                messages=[
+                    {"role": "system", "content": _system_prompt()},
+                    {"role": "user", "content": f"{note}טקסט:\n```{chunk}```"},
+                ],
+                max_tokens=max_tokens,
+                transcript=chunk,
+            )
+        )
+    return prompts
+
+
+def reask_prompt(transcript: str, invalid: Dict[str, str]) -> Prompt:
+    """Ask for the invalid sections only, showing what was wrong with them"""
+    problems = "\n".join(f"- {name}: {reason}" for name, reason in invalid.items())
+    template = _template(invalid)
+    return Prompt(
+        messages=[
+            {"role": "system", "content": REASK_SYSTEM_PROMPT},
+            {
+                "role": "user",
+                "content": (
+                    "בתשובה הקודמת החלקים הבאים לא היו תקינים:\n"
+                    f"{problems}\n"
+                    "החזר/י אובייקט JSON עם המפתחות האלה בלבד, באותו מבנה כמו הדוגמה:\n"
+                    f"{template}\n\n"
+                    f"טקסט:\n```{transcript}```"
+                ),
+            },
+        ],
+        max_tokens=_output_tokens(template, settings.llm_output_slack_tokens // 2),
+        transcript=transcript,
+    )
+
+
+def summary_prompt(summaries: List[str]) -> Prompt:
+    """Merge the summaries of a chunked transcript into one"""
+    parts = "\n".join(f"{i}. {summary}" for i, summary in enumerate(summaries, start=1))
+    return Prompt(
+        messages=[{"role": "user", "content": SUMMARY_PROMPT + parts}],
+        max_tokens=settings.llm_summary_tokens,
+        transcript="",
+    )
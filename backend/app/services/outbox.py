@@ -0,0 +1,97 @@
+"""
+Transactional outbox for Celery tasks
+תור יוצא טרנזקציוני למשימות Celery
+
+Instead of calling `.delay()` after a commit - and losing the task if the
+process dies in between - callers add an OutboxMessage in the same
+transaction as their own writes. A relay process (worker/outbox_relay.py)
+publishes pending rows to the broker in batches and marks them published.
+
+Delivery is at-least-once: a relay crash between publishing and committing
+re-sends the batch, so tasks must tolerate duplicates.
+"""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import Session
+
+from app.logging import get_correlation_id
+from app.tracing import inject_trace_context
+from app.models import OutboxMessage
+
+# Celery task names, as registered by the worker
+TASK_TRANSCRIBE_CALL = "tasks.transcribe_call"
+TASK_EXTRACT_INFO = "tasks.extract_info"
+TASK_CREATE_APPOINTMENT = "tasks.create_appointment_from_extraction"
+TASK_SEND_CONFIRMATION = "tasks.send_confirmation_message"
+
+
+def enqueue_task(db: Session, task_name: str, *args, **options) -> OutboxMessage:
+    """Stage a task for publishing; it is sent only if the caller commits
+
+    The current correlation ID and trace context travel in the message
+    headers, so the worker logs and traces the task as part of the request
+    that caused it.
+    """
+    headers = dict(options.get("headers") or {})
+    correlation_id = get_correlation_id()
+    if correlation_id:
+        headers.setdefault("correlation_id", correlation_id)
+    inject_trace_context(headers)
+    if headers:
+        options["headers"] = headers
+    message = OutboxMessage(task_name=task_name, args=list(args), options=options)
+    db.add(message)
+    return message
+
+
+def relay_batch(db: Session, celery_app, batch_size: int = 100) -> int:
+    """Publish up to `batch_size` pending messages; returns how many were sent
+
+    Rows are locked with SKIP LOCKED so several relays can run side by side.
+    All messages in the batch share one broker connection.
+    """
+    messages = (
+        db.query(OutboxMessage)
+        .filter(OutboxMessage.published_at.is_(None))
+        .order_by(OutboxMessage.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    if not messages:
+        db.rollback()
+        return 0
+
+    published = 0
+    now = datetime.utcnow()
+    with celery_app.producer_or_acquire() as producer:
+        for message in messages:
+            message.attempts = (message.attempts or 0) + 1
+            try:
+                celery_app.send_task(
+                    message.task_name,
+                    args=message.args or [],
+                    producer=producer,
+                    **(message.options or {}),
+                )
+            except Exception as e:
+                # Leave unpublished; the next pass retries it
+                message.last_error = str(e)
+                continue
+            message.published_at = now
+            published += 1
+
+    db.commit()
+    return published
+
+
+def purge_published(db: Session, older_than: timedelta) -> int:
+    """Delete messages published more than `older_than` ago"""
+    deleted = (
+        db.query(OutboxMessage)
+        .filter(OutboxMessage.published_at < datetime.utcnow() - older_than)
+        .delete(synchronize_session=False)
+    )
+    db.commit()
+    return deleted
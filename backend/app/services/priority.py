@@ -0,0 +1,244 @@
+"""
+Priority scheduling for call processing
+תעדוף עיבוד שיחות לפי דחיפות וסוג לקוח
+
+Priorities are Celery/Redis priorities: 0 is served first. A call's
+priority is computed at webhook time from cached customer data (VIP flag,
+open urgent jobs) and raised for extraction when the transcript itself
+sounds like an emergency. Calls waiting longer than
+`priority_aging_seconds` are promoted one level at a time so routine calls
+cannot starve behind a stream of urgent ones.
+
+The cached flags are dropped by SQLAlchemy session hooks
+(`install_flag_invalidation_hooks`) whenever a committed transaction wrote
+a customer or one of their jobs, in the API and the workers alike.
+"""
+
+import json
+import re
+from datetime import datetime, timedelta
+
+import redis
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.logging import get_logger
+from app.metrics import CACHE_REQUESTS
+from app.models import (
+    Call,
+    CallStatusEnum,
+    Customer,
+    Job,
+    JobStatusEnum,
+    Organization,
+    Transcript,
+)
+from app.redis_client import get_redis
+from app.services.field_extractors import extract_device
+from app.services.outbox import enqueue_task, TASK_EXTRACT_INFO, TASK_TRANSCRIBE_CALL
+
+logger = get_logger(__name__)
+
+PRIORITY_EMERGENCY = 0
+PRIORITY_HIGH = 3
+PRIORITY_NORMAL = 6
+
+# Matches the Redis transport priority_steps in worker/celeryconfig.py
+PRIORITY_LEVELS = [PRIORITY_EMERGENCY, PRIORITY_HIGH, PRIORITY_NORMAL]
+
+CACHE_PREFIX = "customer-priority:"
+
+OPEN_JOB_STATUSES = [
+    JobStatusEnum.DRAFT,
+    JobStatusEnum.SCHEDULED,
+    JobStatusEnum.IN_PROGRESS,
+]
+
+
+def normalize_phone(phone: str) -> str:
+    """+972-50-123-4567 / 050 1234567 -> 0501234567"""
+    digits = re.sub(r"\D", "", phone or "")
+    if digits.startswith("972"):
+        digits = "0" + digits[3:]
+    return digits
+
+
+def _cache_key(org_id: int, phone: str) -> str:
+    return f"{CACHE_PREFIX}{org_id}:{normalize_phone(phone)}"
+
+
+def _load_customer_flags(db: Session, org_id: int, phone: str) -> dict:
+    # Uses the (org_id, phone) index on customers
+    customer = (
+        db.query(Customer.id, Customer.vip_status)
+        .filter(
+            Customer.org_id == org_id,
+            Customer.phone.in_({phone, normalize_phone(phone)}),
+        )
+        .first()
+    )
+    if customer is None:
+        return {"vip": False, "open_urgent_job": False}
+
+    open_urgent_job = (
+        db.query(Job.id)
+        .filter(
+            Job.org_id == org_id,
+            Job.customer_id == customer.id,
+            Job.priority == "urgent",
+            Job.status.in_(OPEN_JOB_STATUSES),
+        )
+        .first()
+        is not None
+    )
+    return {"vip": bool(customer.vip_status), "open_urgent_job": open_urgent_job}
+
+
+def customer_flags(db: Session, org_id: int, phone: str) -> dict:
+    """VIP / open-urgent-job flags for a caller, cached in Redis"""
+    key = _cache_key(org_id, phone)
+    try:
+        cached = get_redis().get(key)
+        if cached:
+            CACHE_REQUESTS.labels("customer_priority", "hit").inc()
+            return json.loads(cached)
+        CACHE_REQUESTS.labels("customer_priority", "miss").inc()
+    except redis.RedisError as e:
+        CACHE_REQUESTS.labels("customer_priority", "error").inc()
+        logger.warning("Priority cache unavailable: %s", e)
+
+    flags = _load_customer_flags(db, org_id, phone)
+    try:
+        get_redis().set(key, json.dumps(flags), ex=settings.priority_cache_ttl_seconds)
+    except redis.RedisError:
+        pass
+    return flags
+
+
+def invalidate_customer_flags(org_id: int, phone: str) -> None:
+    """Drop cached flags after a customer's VIP status or jobs change"""
+    try:
+        get_redis().delete(_cache_key(org_id, phone))
+    except redis.RedisError as e:
+        logger.warning("Failed to invalidate priority cache: %s", e)
+
+
+_CHANGED = "customer_flags_changed"
+
+
+def _collect_flag_changes(session: Session, flush_context) -> None:
+    changed = session.info.setdefault(_CHANGED, set())
+    job_customers = set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, Customer):
+            # A changed phone leaves flags cached under the old number too
+            phones = {obj.phone, *inspect(obj).attrs.phone.history.deleted}
+            changed.update((obj.org_id, phone) for phone in phones if phone)
+        elif isinstance(obj, Job) and obj.customer_id is not None:
+            job_customers.add(obj.customer_id)
+    if job_customers:
+        changed.update(
+            session.query(Customer.org_id, Customer.phone)
+            .filter(Customer.id.in_(job_customers), Customer.phone.isnot(None))
+            .all()
+        )
+
+
+def _invalidate_changed_flags(session: Session) -> None:
+    for org_id, phone in session.info.pop(_CHANGED, ()):
+        invalidate_customer_flags(org_id, phone)
+
+
+def _discard_flag_changes(session: Session) -> None:
+    session.info.pop(_CHANGED, None)
+
+
+def install_flag_invalidation_hooks() -> None:
+    """Drop cached customer flags on every commit that changed them (idempotent)"""
+    if event.contains(Session, "after_flush", _collect_flag_changes):
+        return
+    event.listen(Session, "after_flush", _collect_flag_changes)
+    event.listen(Session, "after_commit", _invalidate_changed_flags)
+    event.listen(Session, "after_rollback", _discard_flag_changes)
+
+
+def call_priority(db: Session, org_id: int, phone: str) -> int:
+    """Transcription priority for an incoming call"""
+    if not phone:
+        return PRIORITY_NORMAL
+    flags = customer_flags(db, org_id, phone)
+    if flags["open_urgent_job"]:
+        return PRIORITY_EMERGENCY
+    if flags["vip"]:
+        return PRIORITY_HIGH
+    return PRIORITY_NORMAL
+
+
+def extraction_priority(priority: int, transcript_text: str) -> int:
+    """Extraction priority - an emergency in the transcript jumps the queue"""
+    urgency = extract_device(transcript_text or "").get("device", {}).get("urgency")
+    if urgency == "urgent":
+        return PRIORITY_EMERGENCY
+    if urgency == "high":
+        return min(priority, PRIORITY_HIGH)
+    return priority
+
+
+def _promote(priority: int) -> int:
+    higher = [level for level in PRIORITY_LEVELS if level < priority]
+    return higher[-1] if higher else priority
+
+
+def promote_waiting_calls(db: Session, now: datetime = None) -> list:
+    """Re-enqueue calls that waited too long one priority level higher
+
+    The original message stays in the broker. transcribe_call claims a call
+    with a conditional status update and extract_info skips calls that
+    already have an extraction, so whichever copy runs second is a no-op.
+    Returns (call_id, new_priority) pairs.
+    """
+    now = now or datetime.utcnow()
+    waited_since = now - timedelta(seconds=settings.priority_aging_seconds)
+    lookback = now - timedelta(hours=settings.call_reaper_lookback_hours)
+    promoted = []
+
+    for (org_id,) in db.query(Organization.id).all():
+        waiting = (
+            db.query(Call)
+            .filter(
+                Call.org_id == org_id,
+                Call.created_at >= lookback,
+                Call.status.in_(
+                    [CallStatusEnum.PENDING_TRANSCRIPTION, CallStatusEnum.EXTRACTING]
+                ),
+                Call.priority > PRIORITY_EMERGENCY,
+                Call.claimed_at.is_(None),  # not already being worked on
+                Call.updated_at < waited_since,
+            )
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        for call in waiting:
+            call.priority = _promote(call.priority)
+            if call.deferred_at is not None:
+                # Parked by fair share; the higher priority orders its dispatch
+                promoted.append((call.id, call.priority))
+                continue
+            call.queued_at = now
+            if call.status == CallStatusEnum.PENDING_TRANSCRIPTION:
+                enqueue_task(db, TASK_TRANSCRIBE_CALL, call.id, priority=call.priority)
+            else:
+                transcript = (
+                    db.query(Transcript.id)
+                    .filter(Transcript.call_id == call.id)
+                    .order_by(Transcript.id.desc())
+                    .first()
+                )
+                if transcript is None:
+                    continue
+                enqueue_task(db, TASK_EXTRACT_INFO, transcript.id, priority=call.priority)
+            promoted.append((call.id, call.priority))
+        db.commit()
+
+    return promoted
@@ -0,0 +1,215 @@
+"""
+Queue depth, throughput and autoscaling signals
+מדדי תורים, תפוקה והמלצת מספר עובדים
+
+Each pipeline stage has its own Celery queue. For every stage we report:
+
+- broker depth (messages in the queue, over all priority levels)
+- calls waiting for the stage and the age of the oldest one
+- arrival and completion rates and mean service time, from per-minute
+  counters the API and the workers increment in Redis
+- a recommended worker count from Little's law: the stage keeps
+  arrival_rate * service_time tasks in service on average, plus whatever
+  is needed to drain the current backlog within `autoscale_drain_seconds`
+"""
+
+import math
+import time
+from datetime import datetime, timedelta
+
+import redis
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.logging import get_logger
+from app.models import Call, CallStatusEnum
+from app.redis_client import get_redis
+from app.services.fair_share import STAGE_EXTRACT, STAGE_TRANSCRIBE
+
+logger = get_logger(__name__)
+
+KEY_PREFIX = "stage-stats:"
+RETENTION_SECONDS = 2 * 3600
+
+# Matches task_routes / broker_transport_options in worker/celeryconfig.py
+PRIORITY_STEPS = [0, 3, 6]
+PRIORITY_SEP = ":"
+
+STAGES = {
+    STAGE_TRANSCRIBE: {
+        "queue": "transcription",
+        "waiting_status": CallStatusEnum.PENDING_TRANSCRIPTION,
+        "concurrency": lambda: settings.autoscale_transcribe_concurrency,
+    },
+    STAGE_EXTRACT: {
+        "queue": "extraction",
+        "waiting_status": CallStatusEnum.EXTRACTING,
+        "concurrency": lambda: settings.autoscale_extract_concurrency,
+    },
+}
+
+
+def _minute_key(stage: str, minute: int) -> str:
+    return f"{KEY_PREFIX}{stage}:{minute}"
+
+
+def _record(stage: str, field: str, amount: float) -> None:
+    key = _minute_key(stage, int(time.time() // 60))
+    try:
+        pipe = get_redis().pipeline()
+        pipe.hincrbyfloat(key, field, amount)
+        pipe.expire(key, RETENTION_SECONDS)
+        pipe.execute()
+    except redis.RedisError as e:
+        logger.warning("Failed to record %s %s: %s", stage, field, e)
+
+
+def record_arrival(stage: str) -> None:
+    """Count one task entering a stage; never raises"""
+    _record(stage, "arrivals", 1)
+
+
+def record_service_time(stage: str, seconds: float) -> None:
+    """Count one completed task and its processing time; never raises"""
+    _record(stage, "completions", 1)
+    _record(stage, "service_seconds", seconds)
+
+
+def stage_rates(stage: str, client=None, now: float = None) -> dict:
+    """Arrival/completion rates (per second) and mean service time
+
+    Averaged over the last `autoscale_window_minutes` complete minutes.
+    """
+    client = client or get_redis()
+    current = int((now or time.time()) // 60)
+    window = settings.autoscale_window_minutes
+    pipe = client.pipeline()
+    for minute in range(current - window, current):
+        pipe.hgetall(_minute_key(stage, minute))
+
+    totals = {"arrivals": 0.0, "completions": 0.0, "service_seconds": 0.0}
+    for bucket in pipe.execute():
+        for field, value in bucket.items():
+            field = field.decode() if isinstance(field, bytes) else field
+            if field in totals:
+                totals[field] += float(value)
+
+    seconds = window * 60.0
+    completions = totals["completions"]
+    return {
+        "arrival_rate": totals["arrivals"] / seconds,
+        "throughput": completions / seconds,
+        "service_time": totals["service_seconds"] / completions if completions else 0.0,
+    }
+
+
+def broker_depth(queue: str, client=None) -> int:
+    """Messages waiting in a Celery queue on the Redis broker"""
+    client = client or get_redis()
+    pipe = client.pipeline()
+    for step in PRIORITY_STEPS:
+        # The Redis transport keeps one list per priority step
+        pipe.llen(queue if step == 0 else f"{queue}{PRIORITY_SEP}{step}")
+    return sum(pipe.execute())
+
+
+def recommended_workers(
+    arrival_rate: float,
+    service_time: float,
+    backlog: int,
+    concurrency: int,
+) -> int:
+    """Workers needed to keep up with arrivals and drain the backlog
+
+    Little's law gives the average number of tasks in service, L = λW.
+    Dividing by the target utilization leaves headroom for bursts.
+    """
+    if service_time <= 0:
+        # No completions in the window yet - keep the floor until we know
+        return settings.autoscale_min_workers if backlog else 0
+
+    in_service = arrival_rate * service_time / settings.autoscale_target_utilization
+    draining = backlog * service_time / settings.autoscale_drain_seconds
+    workers = math.ceil((in_service + draining) / max(1, concurrency))
+    return max(settings.autoscale_min_workers, min(settings.autoscale_max_workers, workers))
+
+
+def autoscaling_snapshot(db: Session, client=None, now: datetime = None) -> list:
+    """Current signals for every stage
+
+    Only unclaimed calls in a waiting status within the reaper's lookback
+    count, which the partial ix_calls_waiting index serves directly; a
+    call older than that is the reaper's business, not the autoscaler's.
+    """
+    client = client or get_redis()
+    now = now or datetime.utcnow()
+    rows = (
+        db.query(
+            Call.status,
+            func.count(Call.id),
+            func.min(func.coalesce(Call.queued_at, Call.created_at)),
+        )
+        .filter(
+            Call.status.in_([stage["waiting_status"] for stage in STAGES.values()]),
+            Call.claimed_at.is_(None),
+            Call.created_at >= now - timedelta(hours=settings.call_reaper_lookback_hours),
+        )
+        .group_by(Call.status)
+        .all()
+    )
+    waiting = {status: count for status, count, _ in rows}
+    oldest = {status: oldest_at for status, _, oldest_at in rows}
+
+    snapshot = []
+    for name, stage in STAGES.items():
+        rates = stage_rates(name, client=client)
+        depth = broker_depth(stage["queue"], client=client)
+        calls_waiting = waiting.get(stage["waiting_status"], 0)
+        oldest_at = oldest.get(stage["waiting_status"])
+        snapshot.append(
+            {
+                "stage": name,
+                "queue": stage["queue"],
+                "queue_depth": depth,
+                "calls_waiting": calls_waiting,
+                "oldest_waiting_seconds": (
+                    max(0.0, (now - oldest_at).total_seconds()) if oldest_at else 0.0
+                ),
+                **rates,
+                "recommended_workers": recommended_workers(
+                    rates["arrival_rate"],
+                    rates["service_time"],
+                    max(depth, calls_waiting),
+                    stage["concurrency"](),
+                ),
+            }
+        )
+    return snapshot
+
+
+class SnapshotCollector:
+    """Prometheus collector exposing one autoscaling snapshot"""
+
+    METRICS = {
+        "queue_depth": "Messages waiting in the stage's Celery queue",
+        "calls_waiting": "Calls waiting for the stage",
+        "oldest_waiting_seconds": "Age of the oldest call waiting for the stage",
+        "arrival_rate": "Tasks entering the stage per second",
+        "throughput": "Tasks completed by the stage per second",
+        "service_time": "Mean task processing time in seconds",
+        "recommended_workers": "Worker count recommended by Little's law",
+    }
+
+    def __init__(self, snapshot: list):
+        self.snapshot = snapshot
+
+    def collect(self):
+        for key, documentation in self.METRICS.items():
+            family = GaugeMetricFamily(
+                f"smartagent_stage_{key}", documentation, labels=["stage", "queue"]
+            )
+            for stage in self.snapshot:
+                family.add_metric([stage["stage"], stage["queue"]], stage[key])
+            yield family
@@ -0,0 +1,130 @@
+"""
+Stuck-call reaper
+איתור שיחות תקועות וחידוש העיבוד שלהן
+
+A call whose worker died mid-task stays in an in-progress status forever.
+The reaper runs periodically (Celery beat) and resumes such calls from the
+last completed stage. In-progress calls are timed from `claimed_at`, set
+when a worker starts the stage, so time spent waiting in a queue never
+counts against the stage's SLA. After `call_max_recovery_attempts` a call
+is moved to DEAD_LETTER for manual handling.
+
+A call waiting for a worker (pending, or transcribed and not yet picked up
+by extraction) is only re-enqueued when its message looks lost: it was
+queued more than `call_sla_queued_seconds` ago and the outbox relay has
+published it. These re-enqueues do not count as recovery attempts -
+nothing has failed, and a long backlog must not dead-letter calls.
+"""
+
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import Call, CallStatusEnum, Organization, OutboxMessage, Transcript
+from app.services.outbox import enqueue_task, TASK_EXTRACT_INFO, TASK_TRANSCRIBE_CALL
+
+# Statuses a call waits in between stages
+WAITING_STATUSES = [CallStatusEnum.PENDING_TRANSCRIPTION, CallStatusEnum.EXTRACTING]
+
+
+def status_slas() -> dict:
+    """Seconds a worker may hold a call in each in-progress status"""
+    return {
+        CallStatusEnum.TRANSCRIBING: settings.call_sla_transcribing_seconds,
+        CallStatusEnum.EXTRACTING: settings.call_sla_extracting_seconds,
+    }
+
+
+def _oldest_unpublished(db: Session) -> Optional[datetime]:
+    return (
+        db.query(func.min(OutboxMessage.created_at))
+        .filter(OutboxMessage.published_at.is_(None))
+        .scalar()
+    )
+
+
+def find_stuck_calls(db: Session, org_id: int, now: datetime) -> list:
+    """Calls of one org that overstayed their SLA, or whose message was lost
+
+    Filtering on org_id and a created_at lookback lets Postgres use the
+    (org_id, created_at) index instead of scanning every call.
+    """
+    slas = status_slas()
+    claimed = or_(
+        # Calls claimed before claimed_at existed fall back to updated_at
+        and_(
+            Call.status == CallStatusEnum.TRANSCRIBING,
+            func.coalesce(Call.claimed_at, Call.updated_at)
+            < now - timedelta(seconds=slas[CallStatusEnum.TRANSCRIBING]),
+        ),
+        and_(
+            Call.status == CallStatusEnum.EXTRACTING,
+            Call.claimed_at < now - timedelta(seconds=slas[CallStatusEnum.EXTRACTING]),
+        ),
+    )
+    # Rows are published in id order, so anything queued before the oldest
+    # unpublished row has reached the broker
+    queued_before = now - timedelta(seconds=settings.call_sla_queued_seconds)
+    oldest_unpublished = _oldest_unpublished(db)
+    if oldest_unpublished is not None:
+        queued_before = min(queued_before, oldest_unpublished)
+    lost = and_(
+        Call.status.in_(WAITING_STATUSES),
+        Call.claimed_at.is_(None),
+        Call.deferred_at.is_(None),  # parked by fair share, not lost
+        func.coalesce(Call.queued_at, Call.created_at) < queued_before,
+    )
+    return (
+        db.query(Call)
+        .filter(
+            Call.org_id == org_id,
+            Call.created_at >= now - timedelta(hours=settings.call_reaper_lookback_hours),
+            or_(claimed, lost),
+        )
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+
+
+def resume_call(db: Session, call: Call, now: datetime = None) -> CallStatusEnum:
+    """Re-enqueue a stuck call from its last completed stage"""
+    if call.claimed_at is not None or call.status == CallStatusEnum.TRANSCRIBING:
+        # A worker took the call and never finished it
+        call.recovery_attempts = (call.recovery_attempts or 0) + 1
+        if call.recovery_attempts > settings.call_max_recovery_attempts:
+            call.status = CallStatusEnum.DEAD_LETTER
+            return call.status
+
+    call.claimed_at = None
+    call.queued_at = now or datetime.utcnow()
+    transcript = (
+        db.query(Transcript)
+        .filter(Transcript.call_id == call.id)
+        .order_by(Transcript.id.desc())
+        .first()
+    )
+    if transcript:
+        # Transcription finished - only extraction needs to run again
+        call.status = CallStatusEnum.EXTRACTING
+        enqueue_task(db, TASK_EXTRACT_INFO, transcript.id, priority=call.priority)
+    else:
+        call.status = CallStatusEnum.PENDING_TRANSCRIPTION
+        enqueue_task(db, TASK_TRANSCRIBE_CALL, call.id, priority=call.priority)
+    return call.status
+
+
+def reap_stuck_calls(db: Session, now: datetime = None) -> list:
+    """Resume every stuck call; returns (org_id, call_id, new_status) tuples
+
+    Commits per org so the row locks are held only briefly.
+    """
+    now = now or datetime.utcnow()
+    resumed = []
+    for (org_id,) in db.query(Organization.id).all():
+        for call in find_stuck_calls(db, org_id, now):
+            resumed.append((org_id, call.id, resume_call(db, call, now)))
+        db.commit()
+    return resumed
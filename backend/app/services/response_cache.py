@@ -0,0 +1,185 @@
+"""
+Response cache with ETag revalidation for read endpoints
+מטמון תגובות ו-ETag לנקודות קצה של קריאה
+
+Mobile and web clients poll the same few read endpoints. Every org has a
+version token per table, kept in Redis and replaced whenever a committed
+transaction touched a row of that table for the org. A cached response's
+ETag is derived from the route, its parameters and the version tokens of
+the tables it reads, so:
+
+- a poll whose If-None-Match still matches is answered 304 after one Redis
+  round trip, without opening a database connection;
+- otherwise a body cached for the current versions is served from Redis;
+- only when the data changed does the endpoint query and serialize again.
+
+Versions are random tokens rather than counters, so a Redis restart can
+never make an old ETag match again. They are invalidated by SQLAlchemy
+session hooks (`install_invalidation_hooks`) in the API and the workers.
+The hooks see ORM changes only: code that writes with a bulk
+`query.update()` must call `mark_changed` itself.
+"""
+
+import hashlib
+import uuid
+from typing import Callable, Iterable, Optional
+
+import redis
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.logging import get_logger
+from app.metrics import CACHE_REQUESTS
+from app.redis_client import get_async_redis, get_redis
+from app.serialization import ORJSONResponse
+
+logger = get_logger(__name__)
+
+KEY_PREFIX = "http-cache:"
+
+# Tables read by cached endpoints; writes to other tables are not tracked
+CACHED_TABLES = {"calls", "customers", "jobs", "integrations", "appointments", "followups"}
+
+_CHANGED = "response_cache_changed"
+
+_CACHE_HEADERS = {"Cache-Control": "private, no-cache", "Vary": "Authorization"}
+
+
+def _version_key(org_id: int, table: str) -> str:
+    return f"{KEY_PREFIX}version:{org_id}:{table}"
+
+
+def _body_key(org_id: int, etag: str) -> str:
+    return f"{KEY_PREFIX}body:{org_id}:{etag}"
+
+
+def _matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {tag.strip() for tag in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+# Invalidation
+
+def mark_changed(db: Session, org_id: int, table: str) -> None:
+    """Invalidate an org's cached responses over `table` when `db` commits"""
+    db.info.setdefault(_CHANGED, set()).add((org_id, table))
+
+
+def _collect_changes(session: Session, flush_context) -> None:
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        table = getattr(obj, "__tablename__", None)
+        org_id = getattr(obj, "org_id", None)
+        if table in CACHED_TABLES and org_id is not None:
+            mark_changed(session, org_id, table)
+
+
+def _publish_changes(session: Session) -> None:
+    changed = session.info.pop(_CHANGED, None)
+    if not changed:
+        return
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for org_id, table in changed:
+            pipe.set(_version_key(org_id, table), uuid.uuid4().hex)
+        pipe.execute()
+    except redis.RedisError as e:
+        # Cached bodies outlive this by at most response_cache_seconds; a
+        # client holding an ETag keeps getting 304 until the next write
+        logger.error("Failed to invalidate response cache: %s", e)
+
+
+def _discard_changes(session: Session) -> None:
+    session.info.pop(_CHANGED, None)
+
+
+def install_invalidation_hooks() -> None:
+    """Invalidate cached responses on every commit (idempotent)"""
+    if event.contains(Session, "after_flush", _collect_changes):
+        return
+    event.listen(Session, "after_flush", _collect_changes)
+    event.listen(Session, "after_commit", _publish_changes)
+    event.listen(Session, "after_rollback", _discard_changes)
+
+
+# Serving
+
+class ResponseCache:
+    """Serves read endpoints from Redis, revalidated by ETag"""
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+
+    async def _versions(self, client, org_id: int, tables: Iterable[str]) -> list:
+        keys = [_version_key(org_id, table) for table in tables]
+        versions = await client.mget(keys)
+        missing = [key for key, version in zip(keys, versions) if version is None]
+        if missing:
+            # First read since the data existed (or since Redis lost it):
+            # start from a fresh token that no client can hold
+            async with client.pipeline(transaction=False) as pipe:
+                for key in missing:
+                    pipe.set(key, uuid.uuid4().hex, nx=True)
+                await pipe.execute()
+            versions = await client.mget(keys)
+        return versions
+
+    async def respond(
+        self,
+        request,
+        org_id: int,
+        tables: Iterable[str],
+        build: Callable[[], object],
+    ) -> Response:
+        """Respond with 304, a cached body, or the output of `build()`
+
+        `build` runs in the threadpool and returns the response content,
+        ready for orjson (see app.serialization); it may raise
+        HTTPException, which is not cached.
+        """
+        client = get_async_redis()
+        try:
+            versions = await self._versions(client, org_id, tables)
+        except redis.RedisError as e:
+            logger.warning("Response cache unavailable: %s", e)
+            CACHE_REQUESTS.labels("response", "error").inc()
+            return ORJSONResponse(await run_in_threadpool(build))
+
+        digest = hashlib.sha1()
+        for part in (str(org_id), request.url.path, str(sorted(request.query_params.multi_items()))):
+            digest.update(part.encode())
+            digest.update(b"\0")
+        for version in versions:
+            digest.update(version)
+        etag = f'W/"{digest.hexdigest()[:20]}"'
+        headers = {"ETag": etag, **_CACHE_HEADERS}
+
+        if _matches(request.headers.get("if-none-match"), etag):
+            CACHE_REQUESTS.labels("response", "not_modified").inc()
+            return Response(status_code=304, headers=headers)
+
+        body_key = _body_key(org_id, etag)
+        try:
+            body = await client.get(body_key)
+        except redis.RedisError:
+            body = None
+        if body is not None:
+            CACHE_REQUESTS.labels("response", "hit").inc()
+            return Response(body, media_type="application/json", headers=headers)
+
+        CACHE_REQUESTS.labels("response", "miss").inc()
+        # The versions were read before the data, so the body is at least
+        # as new as the ETag says
+        response = ORJSONResponse(await run_in_threadpool(build), headers=headers)
+        try:
+            await client.set(body_key, response.body, ex=self.ttl)
+        except redis.RedisError as e:
+            logger.warning("Failed to cache response: %s", e)
+        return response
+
+
+response_cache = ResponseCache(ttl=settings.response_cache_seconds)
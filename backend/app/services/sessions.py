@@ -0,0 +1,281 @@
+"""
+Refresh-token sessions
+ניהול סשנים וטוקני רענון
+
+Every login opens a session for one user on one device. The session is a
+Redis hash holding the jti of the only refresh token that is currently
+valid for it. Refreshing rotates the token: the presented jti must match,
+a new one replaces it and the session's TTL starts again, so a technician
+who opens the app every shift stays logged in indefinitely while an idle
+device expires after `refresh_token_expire_days`.
+
+Presenting an older refresh token of the session means it was copied - the
+session is ended on the spot (reuse detection). The one exception is the token that
+was rotated within `refresh_reuse_grace_seconds`, which is what two
+concurrent refreshes from the same device look like; it is refused without
+ending the session.
+
+Each session key is also recorded in per-user and per-org sets, so all
+sessions of a user or an org are revoked by one script. Rotation is a
+single round trip, which matters at shift start when every device
+refreshes at once. Access tokens are not tracked here; they stay valid
+until they expire (`access_token_expire_minutes`) unless revoked by jti.
+"""
+
+import time
+import uuid
+from typing import List, Optional
+
+from app.config import settings
+from app.logging import get_logger
+from app.redis_client import get_async_redis
+from app.services import auth
+
+logger = get_logger(__name__)
+
+KEY_PREFIX = "refresh-session:"
+
+ROTATED = 1
+REUSED = -1
+CONFLICT = 2
+
+# KEYS: session hash, user set, org set
+# ARGV: jti, user id, org id, role, device id, created at, ttl, family
+OPEN_SCRIPT = """
+redis.call('DEL', KEYS[1])
+redis.call('HSET', KEYS[1], 'jti', ARGV[1], 'user_id', ARGV[2], 'org_id', ARGV[3],
+           'role', ARGV[4], 'device_id', ARGV[5], 'created_at', ARGV[6], 'rotated_at', ARGV[6],
+           'family', ARGV[8])
+redis.call('EXPIRE', KEYS[1], ARGV[7])
+for i = 2, 3 do
+    redis.call('SADD', KEYS[i], KEYS[1])
+    if redis.call('TTL', KEYS[i]) < tonumber(ARGV[7]) then
+        redis.call('EXPIRE', KEYS[i], ARGV[7])
+    end
+end
+return 1
+"""
+
+# KEYS: session hash, user set, org set
+# ARGV: presented jti, new jti, now, ttl, reuse grace, family
+# Returns {status, role}
+ROTATE_SCRIPT = """
+local session = redis.call('HMGET', KEYS[1], 'jti', 'prev_jti', 'rotated_at', 'role', 'family')
+if not session[1] or session[5] ~= ARGV[6] then
+    -- Ended, expired, or replaced by a later login on the device
+    return {0, false}
+end
+if session[1] ~= ARGV[1] then
+    if session[2] == ARGV[1] and tonumber(ARGV[3]) - tonumber(session[3]) < tonumber(ARGV[5]) then
+        return {2, false}
+    end
+    redis.call('DEL', KEYS[1])
+    redis.call('SREM', KEYS[2], KEYS[1])
+    redis.call('SREM', KEYS[3], KEYS[1])
+    return {-1, false}
+end
+redis.call('HSET', KEYS[1], 'jti', ARGV[2], 'prev_jti', ARGV[1], 'rotated_at', ARGV[3])
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+for i = 2, 3 do
+    if redis.call('TTL', KEYS[i]) < tonumber(ARGV[4]) then
+        redis.call('EXPIRE', KEYS[i], ARGV[4])
+    end
+end
+return {1, session[4]}
+"""
+
+# KEYS: set of session keys; returns the number of sessions ended
+REVOKE_ALL_SCRIPT = """
+local sessions = redis.call('SMEMBERS', KEYS[1])
+local ended = 0
+for _, key in ipairs(sessions) do
+    ended = ended + redis.call('DEL', key)
+end
+redis.call('DEL', KEYS[1])
+return ended
+"""
+
+
+class SessionError(Exception):
+    """Refresh token is invalid, reused or belongs to an ended session"""
+
+
+class RefreshConflict(SessionError):
+    """The token was rotated moments ago by a concurrent refresh"""
+
+
+def _session_key(user_id: int, device_id: str) -> str:
+    return f"{KEY_PREFIX}{user_id}:{device_id}"
+
+
+def _user_key(user_id: int) -> str:
+    return f"{KEY_PREFIX}user:{user_id}"
+
+
+def _org_key(org_id: int) -> str:
+    return f"{KEY_PREFIX}org:{org_id}"
+
+
+_fake_client = None
+
+
+def get_session_redis():
+    """The sessions' Redis client; an in-process fakeredis in "fake" mode"""
+    global _fake_client
+    if settings.session_store_backend != "fake":
+        return get_async_redis()
+    if _fake_client is None:
+        import fakeredis.aioredis
+
+        _fake_client = fakeredis.aioredis.FakeRedis()
+    return _fake_client
+
+
+class RefreshTokenStore:
+    """Issues, rotates and revokes refresh-token sessions"""
+
+    def __init__(self, client=None, ttl_seconds: int = None, reuse_grace_seconds: float = None):
+        self._client = client
+        self.ttl_seconds = ttl_seconds or settings.refresh_token_expire_days * 86400
+        self.reuse_grace_seconds = (
+            settings.refresh_reuse_grace_seconds
+            if reuse_grace_seconds is None
+            else reuse_grace_seconds
+        )
+
+    @property
+    def client(self):
+        return self._client or get_session_redis()
+
+    async def open(self, user_id: int, org_id: int, role: str, device_id: Optional[str] = None) -> dict:
+        """Start a session (replacing the device's previous one); returns a token pair"""
+        device_id = device_id or uuid.uuid4().hex
+        jti = uuid.uuid4().hex
+        # Tells this login's tokens apart from those of an earlier login
+        # on the same device
+        family = uuid.uuid4().hex
+        await self.client.eval(
+            OPEN_SCRIPT,
+            3,
+            _session_key(user_id, device_id),
+            _user_key(user_id),
+            _org_key(org_id),
+            jti,
+            user_id,
+            org_id,
+            role,
+            device_id,
+            int(time.time()),
+            self.ttl_seconds,
+            family,
+        )
+        return auth.create_token_pair(
+            user_id, org_id, role, refresh_jti=jti, extra_claims={"sid": device_id, "fam": family}
+        )
+
+    async def rotate(self, refresh_token: str, now: float = None, role: str = None) -> dict:
+        """Exchange a refresh token for a new pair; the old token stops working
+
+        `role` is the user's current role; without it the role the session
+        was opened with is used.
+        """
+        try:
+            claims = auth.decode_token(refresh_token, auth.REFRESH_TOKEN)
+        except auth.TokenError as e:
+            raise SessionError(str(e))
+        if "sid" not in claims or "fam" not in claims:
+            raise SessionError("token has no session")
+
+        user_id, org_id, device_id = int(claims["sub"]), int(claims["org"]), claims["sid"]
+        new_jti = uuid.uuid4().hex
+        outcome, role_in_session = await self.client.eval(
+            ROTATE_SCRIPT,
+            3,
+            _session_key(user_id, device_id),
+            _user_key(user_id),
+            _org_key(org_id),
+            claims["jti"],
+            new_jti,
+            now if now is not None else time.time(),
+            self.ttl_seconds,
+            self.reuse_grace_seconds,
+            claims["fam"],
+        )
+        if outcome == CONFLICT:
+            raise RefreshConflict("refresh token was already rotated")
+        if outcome == REUSED:
+            logger.warning(
+                "Refresh token reused, session ended",
+                extra={"user_id": user_id, "device_id": device_id},
+            )
+            raise SessionError("refresh token reuse detected")
+        if outcome != ROTATED:
+            raise SessionError("session has ended")
+
+        if role is None:
+            role = role_in_session
+            role = role.decode() if isinstance(role, bytes) else role
+        return auth.create_token_pair(
+            user_id,
+            org_id,
+            role,
+            refresh_jti=new_jti,
+            extra_claims={"sid": device_id, "fam": claims["fam"]},
+        )
+
+    async def end(self, user_id: int, device_id: str) -> bool:
+        """End one device's session (logout)"""
+        key = _session_key(user_id, device_id)
+        client = self.client
+        org_id = await client.hget(key, "org_id")
+        async with client.pipeline(transaction=True) as pipe:
+            pipe.delete(key)
+            pipe.srem(_user_key(user_id), key)
+            if org_id is not None:
+                pipe.srem(_org_key(int(org_id)), key)
+            ended, *_ = await pipe.execute()
+        return bool(ended)
+
+    @staticmethod
+    def user_id_of(refresh_token: str) -> int:
+        """The user a refresh token was issued to (signature and expiry checked)"""
+        try:
+            return int(auth.decode_token(refresh_token, auth.REFRESH_TOKEN)["sub"])
+        except auth.TokenError as e:
+            raise SessionError(str(e))
+
+    async def revoke_user(self, user_id: int) -> int:
+        """End every session of a user; returns how many were open"""
+        return await self.client.eval(REVOKE_ALL_SCRIPT, 1, _user_key(user_id))
+
+    async def revoke_org(self, org_id: int) -> int:
+        """End every session of every user of an org"""
+        return await self.client.eval(REVOKE_ALL_SCRIPT, 1, _org_key(org_id))
+
+    async def list_sessions(self, user_id: int) -> List[dict]:
+        """Open sessions of a user (device, created and last refreshed at)"""
+        client = self.client
+        keys = sorted(await client.smembers(_user_key(user_id)))
+        async with client.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.hmget(key, "device_id", "created_at", "rotated_at")
+            rows = await pipe.execute()
+
+        sessions, expired = [], []
+        for key, (device_id, created_at, rotated_at) in zip(keys, rows):
+            if device_id is None:
+                expired.append(key)
+                continue
+            sessions.append(
+                {
+                    "device_id": device_id.decode(),
+                    "created_at": int(created_at),
+                    "last_refreshed_at": int(float(rotated_at)),
+                }
+            )
+        if expired:
+            await client.srem(_user_key(user_id), *expired)
+        return sessions
+
+
+refresh_token_store = RefreshTokenStore()
@@ -1,5 +1,33 @@
 import boto3
+from botocore.exceptions import BotoCoreError, ClientError
 from app.config import settings
+from app.services.errors import PermanentServiceError, TransientServiceError
+from app.tracing import get_tracer
+
+tracer = get_tracer(__name__)
+
+# S3 error codes that will not succeed on retry
+PERMANENT_ERROR_CODES = {
+    "404",
+    "403",
+    "NoSuchKey",
+    "NoSuchBucket",
+    "AccessDenied",
+    "InvalidAccessKeyId",
+    "SignatureDoesNotMatch",
+}
+
+
+def storage_error(action: str, error: Exception) -> Exception:
+    """Classify a boto3 failure as transient or permanent"""
+    message = f"{action} failed: {str(error)}"
+    if isinstance(error, ClientError):
+        code = error.response.get("Error", {}).get("Code", "")
+        if code in PERMANENT_ERROR_CODES:
+            return PermanentServiceError("storage_not_found_or_denied", message)
+        return TransientServiceError("storage_error", message)
+    # Connection errors, timeouts, throttling at the transport level
+    return TransientServiceError("storage_unavailable", message)
 
 
 class StorageService:
@@ -16,18 +44,24 @@ class StorageService:
 
     def upload_file(self, file_path: str, object_name: str) -> str:
         """Upload file to storage"""
-        try:
-            self.client.upload_file(file_path, self.bucket, object_name)
-            return f"s3://{self.bucket}/{object_name}"
-        except Exception as e:
-            raise Exception(f"Upload failed: {str(e)}")
+        with tracer.start_as_current_span(
+            "storage.upload", attributes={"storage.bucket": self.bucket, "storage.key": object_name}
+        ):
+            try:
+                self.client.upload_file(file_path, self.bucket, object_name)
+                return f"s3://{self.bucket}/{object_name}"
+            except (BotoCoreError, ClientError) as e:
+                raise storage_error("Upload", e)
 
     def download_file(self, object_name: str, file_path: str):
         """Download file from storage"""
-        try:
-            self.client.download_file(self.bucket, object_name, file_path)
-        except Exception as e:
-            raise Exception(f"Download failed: {str(e)}")
+        with tracer.start_as_current_span(
+            "storage.download", attributes={"storage.bucket": self.bucket, "storage.key": object_name}
+        ):
+            try:
+                self.client.download_file(self.bucket, object_name, file_path)
+            except (BotoCoreError, ClientError) as e:
+                raise storage_error("Download", e)
 
     def get_presigned_url(self, object_name: str, expiration: int = 3600) -> str:
         """Generate presigned URL for file access"""
@@ -38,8 +72,8 @@ class StorageService:
                 ExpiresIn=expiration,
             )
             return url
-        except Exception as e:
-            raise Exception(f"URL generation failed: {str(e)}")
+        except (BotoCoreError, ClientError) as e:
+            raise storage_error("URL generation", e)
 
 
 storage_service = StorageService()
@@ -0,0 +1,273 @@
+"""
+Live call transcription from Twilio Media Streams
+תמלול שיחות חיות מ-Twilio Media Streams
+
+Twilio sends 8kHz mono mu-law frames (base64, ~20ms each). Frames are
+decoded to 16kHz float audio and fed to a sliding-window decoder that
+re-transcribes the uncommitted tail every few seconds. Segments that end
+well before the live edge are committed; the rest is reported as a
+partial hypothesis that may still change.
+"""
+
+import base64
+import json
+import wave
+from typing import Iterator, Optional
+
+import numpy as np
+
+from app.config import settings
+from app.services.incremental_extract import IncrementalExtractor
+from app.services.transcribe import (
+    TIER_STREAMING,
+    overall_confidence,
+    transcription_service,
+)
+from app.services.transcription_backends import SAMPLE_RATE
+
+TWILIO_SAMPLE_RATE = 8000
+
+_MULAW_BIAS = 0x84
+_MULAW_CLIP = 32635
+
+
+def _build_mulaw_table() -> np.ndarray:
+    table = np.zeros(256, dtype=np.int16)
+    for i in range(256):
+        value = ~i & 0xFF
+        sign = value & 0x80
+        exponent = (value >> 4) & 0x07
+        mantissa = value & 0x0F
+        magnitude = (((mantissa << 3) + _MULAW_BIAS) << exponent) - _MULAW_BIAS
+        table[i] = -magnitude if sign else magnitude
+    return table
+
+
+_MULAW_TABLE = _build_mulaw_table()
+
+
+def mulaw_decode(data: bytes) -> np.ndarray:
+    """Decode G.711 mu-law bytes into int16 PCM samples"""
+    return _MULAW_TABLE[np.frombuffer(data, dtype=np.uint8)]
+
+
+def mulaw_encode(samples: np.ndarray) -> bytes:
+    """Encode int16 PCM samples as G.711 mu-law bytes"""
+    pcm = samples.astype(np.int32)
+    sign = np.where(pcm < 0, 0x80, 0)
+    magnitude = np.minimum(np.abs(pcm), _MULAW_CLIP) + _MULAW_BIAS
+    exponent = np.floor(np.log2(magnitude)).astype(np.int32) - 7
+    mantissa = (magnitude >> (exponent + 3)) & 0x0F
+    return (~(sign | (exponent << 4) | mantissa) & 0xFF).astype(np.uint8).tobytes()
+
+
+def upsample_to_model_rate(samples: np.ndarray) -> np.ndarray:
+    """Convert 8kHz int16 PCM to 16kHz float32 in [-1, 1]"""
+    audio = samples.astype(np.float32) / 32768.0
+    if len(audio) == 0:
+        return audio
+    target = np.arange(len(audio) * SAMPLE_RATE // TWILIO_SAMPLE_RATE)
+    source = target * TWILIO_SAMPLE_RATE / SAMPLE_RATE
+    return np.interp(source, np.arange(len(audio)), audio).astype(np.float32)
+
+
+class SlidingWindowTranscriber:
+    """Incremental transcription over a sliding audio window"""
+
+    def __init__(
+        self,
+        org_id: int = None,
+        service=None,
+        step_seconds: float = None,
+        max_window_seconds: float = None,
+        commit_margin_seconds: float = None,
+    ):
+        self.service = service or transcription_service
+        policy = settings.cascade_policy(org_id)
+        self.language = policy["language"]
+        self.model = self.service._get_model(policy["fast_model"])
+        self.step_seconds = step_seconds or settings.streaming_step_seconds
+        self.max_window_seconds = (
+            max_window_seconds or settings.streaming_max_window_seconds
+        )
+        self.commit_margin_seconds = (
+            commit_margin_seconds or settings.streaming_commit_margin_seconds
+        )
+
+        self.buffer = np.zeros(0, dtype=np.float32)  # audio after commit point
+        self.committed_segments = []
+        self.partial_text = ""
+        self._samples_since_decode = 0
+
+    @property
+    def committed_text(self) -> str:
+        return "".join(seg["text"] for seg in self.committed_segments).strip()
+
+    @property
+    def text(self) -> str:
+        return (self.committed_text + " " + self.partial_text).strip()
+
+    def feed(self, audio: np.ndarray) -> Optional[dict]:
+        """Add 16kHz audio; returns a partial update when a decode ran"""
+        self.buffer = np.concatenate([self.buffer, audio])
+        self._samples_since_decode += len(audio)
+        if self._samples_since_decode < self.step_seconds * SAMPLE_RATE:
+            return None
+        return self._decode(final=False)
+
+    def finish(self) -> tuple[str, float]:
+        """Decode whatever audio is left and return the final transcript"""
+        if len(self.buffer):
+            self._decode(final=True)
+        return self.committed_text, overall_confidence(self.committed_segments)
+
+    def _decode(self, final: bool) -> dict:
+        self._samples_since_decode = 0
+        result = self.service.backend.transcribe(
+            self.model, self.buffer, language=self.language
+        )
+        segments = result.get("segments", [])
+        window = len(self.buffer) / SAMPLE_RATE
+        horizon = window if final else window - self.commit_margin_seconds
+
+        commit = [seg for seg in segments if seg.get("end", window) <= horizon]
+        if not commit and window >= self.max_window_seconds:
+            # Nothing stable yet but the window is full - force progress so
+            # latency and memory stay bounded
+            commit = segments
+
+        if commit:
+            self.committed_segments.extend(commit)
+            if len(commit) == len(segments):
+                cut = len(self.buffer)
+            else:
+                cut = int(commit[-1].get("end", window) * SAMPLE_RATE)
+            self.buffer = self.buffer[cut:]
+        elif not segments and window >= self.max_window_seconds:
+            # Silence - keep only the margin in case speech is starting
+            self.buffer = self.buffer[-int(self.commit_margin_seconds * SAMPLE_RATE) :]
+
+        self.partial_text = "".join(seg["text"] for seg in segments[len(commit) :]).strip()
+        return {
+            "committed": self.committed_text,
+            "partial": self.partial_text,
+            "text": self.text,
+            "is_final": final,
+        }
+
+
+class MediaStreamSession:
+    """State for one Twilio Media Streams connection"""
+
+    def __init__(
+        self,
+        org_id: int,
+        call_sid: str,
+        stream_sid: str,
+        service=None,
+        extractor: IncrementalExtractor = None,
+    ):
+        self.org_id = org_id
+        self.call_sid = call_sid
+        self.stream_sid = stream_sid
+        self.call_id = None
+        self.transcriber = SlidingWindowTranscriber(org_id=org_id, service=service)
+        self.extractor = extractor or IncrementalExtractor()
+        self.llm_task = None
+        self._extracted_segments = 0
+
+    def handle_media(self, payload: str) -> Optional[dict]:
+        """Decode one base64 mu-law frame and feed it to the decoder
+
+        When a decode ran, newly committed segments also go through the
+        incremental extractor; `extraction_changed` lists the fields it
+        updated.
+        """
+        pcm = mulaw_decode(base64.b64decode(payload))
+        update = self.transcriber.feed(upsample_to_model_rate(pcm))
+        if update is None:
+            return None
+
+        changed = []
+        for seg in self.transcriber.committed_segments[self._extracted_segments :]:
+            changed.extend(self.extractor.add_segment(seg["text"]))
+        self._extracted_segments = len(self.transcriber.committed_segments)
+        update["extraction_changed"] = changed
+        return update
+
+
+def media_stream_messages(
+    pcm_8k: np.ndarray,
+    call_sid: str = "CA_REPLAY",
+    stream_sid: str = "MZ_REPLAY",
+    custom_parameters: dict = None,
+    frame_ms: int = 20,
+) -> Iterator[str]:
+    """Replay 8kHz int16 audio as Twilio Media Streams JSON messages
+
+    Stands in for Twilio in tests and local development.
+    """
+    yield json.dumps({"event": "connected", "protocol": "Call", "version": "1.0.0"})
+    yield json.dumps(
+        {
+            "event": "start",
+            "sequenceNumber": "1",
+            "streamSid": stream_sid,
+            "start": {
+                "streamSid": stream_sid,
+                "callSid": call_sid,
+                "tracks": ["inbound"],
+                "customParameters": custom_parameters or {},
+                "mediaFormat": {
+                    "encoding": "audio/x-mulaw",
+                    "sampleRate": TWILIO_SAMPLE_RATE,
+                    "channels": 1,
+                },
+            },
+        }
+    )
+
+    frame = TWILIO_SAMPLE_RATE * frame_ms // 1000
+    sequence = 2
+    for chunk, offset in enumerate(range(0, len(pcm_8k), frame), start=1):
+        payload = base64.b64encode(mulaw_encode(pcm_8k[offset : offset + frame]))
+        yield json.dumps(
+            {
+                "event": "media",
+                "sequenceNumber": str(sequence),
+                "streamSid": stream_sid,
+                "media": {
+                    "track": "inbound",
+                    "chunk": str(chunk),
+                    "timestamp": str(offset * 1000 // TWILIO_SAMPLE_RATE),
+                    "payload": payload.decode("ascii"),
+                },
+            }
+        )
+        sequence += 1
+
+    yield json.dumps(
+        {
+            "event": "stop",
+            "sequenceNumber": str(sequence),
+            "streamSid": stream_sid,
+            "stop": {"callSid": call_sid},
+        }
+    )
+
+
+def replay_wav(path: str, **kwargs) -> Iterator[str]:
+    """Replay a local WAV file (16-bit PCM) as Twilio Media Streams messages"""
+    with wave.open(path, "rb") as wav:
+        rate = wav.getframerate()
+        channels = wav.getnchannels()
+        pcm = np.frombuffer(wav.readframes(wav.getnframes()), dtype=np.int16)
+
+    if channels > 1:
+        pcm = pcm.reshape(-1, channels).mean(axis=1).astype(np.int16)
+    if rate != TWILIO_SAMPLE_RATE:
+        target = np.arange(len(pcm) * TWILIO_SAMPLE_RATE // rate)
+        pcm = np.interp(target * rate / TWILIO_SAMPLE_RATE, np.arange(len(pcm)), pcm)
+        pcm = pcm.astype(np.int16)
+
+    return media_stream_messages(pcm, **kwargs)
@@ -1,64 +1,200 @@
-import whisper
 import requests
 import tempfile
+import math
 import os
+import threading
+import time
+from app.config import settings
+from app.metrics import WHISPER_RTF
+from app.services.errors import PermanentServiceError, TransientServiceError
 from app.services.storage import storage_service
+from app.tracing import get_tracer
+from app.services.transcription_backends import (
+    SAMPLE_RATE,
+    TranscriptionBackend,
+    get_backend,
+)
+
+tracer = get_tracer(__name__)
+
+# Model tiers recorded on each transcript
+TIER_FAST = "fast"
+TIER_ESCALATED = "escalated"
+TIER_ACCURATE = "accurate"
+TIER_STREAMING = "streaming"
+
+
+def segment_confidence(segment: dict) -> float:
+    """Confidence of a single Whisper segment (0.0-1.0)"""
+    speech_prob = 1.0 - segment.get("no_speech_prob", 0)
+    token_prob = math.exp(min(segment.get("avg_logprob", 0.0), 0.0))
+    return max(0.0, min(speech_prob * token_prob, 1.0))
+
+
+def overall_confidence(segments: list) -> float:
+    """Average segment confidence, or a default when there are no segments"""
+    if not segments:
+        return 0.8  # Default confidence
+    return min(sum(segment_confidence(seg) for seg in segments) / len(segments), 1.0)
 
 
 class TranscriptionService:
-    """Audio transcription service using Whisper"""
+    """Audio transcription service using Whisper-family models
+
+    Calls are transcribed with a small, fast model first. Segments whose
+    confidence falls below the org's cascade policy are re-transcribed with a
+    larger model; if the language is wrong or most segments are weak, the
+    whole recording is re-run on the larger model instead.
 
-    def __init__(self):
-        self.model = whisper.load_model("base")
+    The engine is pluggable (see transcription_backends) and selected by
+    `settings.transcription_backend`.
+    """
 
-    def transcribe_from_url(self, audio_url: str) -> tuple[str, float]:
+    def __init__(self, backend: TranscriptionBackend = None):
+        self.backend = backend or get_backend()
+        self._models = {}
+        self._models_lock = threading.Lock()
+
+    def _get_model(self, name: str):
+        """Load models lazily and keep them cached per process
+
+        Loading is serialized so a readiness probe and a live call arriving
+        together do not load the same model twice.
+        """
+        if name not in self._models:
+            with self._models_lock:
+                if name not in self._models:
+                    with tracer.start_as_current_span(
+                        "whisper.load_model", attributes={"whisper.model": name}
+                    ):
+                        self._models[name] = self.backend.load_model(name)
+        return self._models[name]
+
+    def warm_up(self, model_name: str = None):
+        """Load a model (the fast model by default) ahead of the first call"""
+        return self._get_model(model_name or settings.cascade_policy()["fast_model"])
+
+    def _infer(self, model_name: str, audio, **kwargs) -> dict:
+        """Run one model over `audio`, traced as a single inference span"""
+        model = self._get_model(model_name)
+        audio_seconds = len(audio) / SAMPLE_RATE
+        with tracer.start_as_current_span(
+            "whisper.inference",
+            attributes={
+                "whisper.model": model_name,
+                "whisper.backend": self.backend.name,
+                "audio.seconds": audio_seconds,
+            },
+        ):
+            started = time.perf_counter()
+            result = self.backend.transcribe(model, audio, **kwargs)
+        if audio_seconds > 0:
+            WHISPER_RTF.labels(self.backend.name, model_name).observe(
+                (time.perf_counter() - started) / audio_seconds
+            )
+        return result
+
+    def transcribe_from_url(
+        self, audio_url: str, org_id: int = None
+    ) -> tuple[str, float, str]:
         """Download and transcribe audio from URL"""
 
         # Download audio file
+        with tracer.start_as_current_span("audio.download"):
+            try:
+                response = requests.get(
+                    audio_url, timeout=settings.audio_download_timeout_seconds
+                )
+                response.raise_for_status()
+            except requests.HTTPError as e:
+                status = e.response.status_code
+                if status == 429 or status >= 500:
+                    raise TransientServiceError("audio_download", str(e))
+                raise PermanentServiceError("audio_not_found", str(e))
+            except requests.RequestException as e:
+                raise TransientServiceError("audio_download", str(e))
+
         with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as temp_file:
-            response = requests.get(audio_url)
             temp_file.write(response.content)
             temp_file_path = temp_file.name
 
         try:
-            # Transcribe using Whisper
-            result = self.model.transcribe(temp_file_path)
-            text = result["text"]
-
-            # Calculate average confidence if available
-            segments = result.get("segments", [])
-            if segments:
-                avg_confidence = sum(
-                    seg.get("no_speech_prob", 0) for seg in segments
-                ) / len(segments)
-                confidence = (
-                    1.0 - avg_confidence
-                )  # Convert no_speech_prob to confidence
-            else:
-                confidence = 0.8  # Default confidence
-
-            return text.strip(), min(confidence, 1.0)
-
+            return self.transcribe_from_file(temp_file_path, org_id=org_id)
         finally:
             # Clean up temp file
             os.unlink(temp_file_path)
 
-    def transcribe_from_file(self, file_path: str) -> tuple[str, float]:
-        """Transcribe audio from local file"""
-        result = self.model.transcribe(file_path)
-        text = result["text"]
+    def transcribe_from_file(
+        self, file_path: str, org_id: int = None
+    ) -> tuple[str, float, str]:
+        """Transcribe audio from local file
 
-        # Calculate confidence similar to URL method
+        Returns the text, its confidence and the model tier that served it.
+        """
+        policy = settings.cascade_policy(org_id)
+        try:
+            audio = self.backend.load_audio(file_path)
+        except Exception as e:
+            # Corrupt or unsupported recording - retrying will not help
+            raise PermanentServiceError("audio_decode", str(e))
+
+        with tracer.start_as_current_span(
+            "transcription", attributes={"org_id": org_id or 0}
+        ) as span:
+            text, confidence, tier = self._transcribe_audio(audio, policy)
+            span.set_attribute("transcription.tier", tier)
+            span.set_attribute("transcription.confidence", confidence)
+            return text, confidence, tier
+
+    def _transcribe_audio(self, audio, policy: dict) -> tuple[str, float, str]:
+        """Run the cascade over decoded audio"""
+        if not policy["enabled"]:
+            return self._transcribe_full(audio, policy, TIER_ACCURATE)
+
+        result = self._infer(policy["fast_model"], audio)
         segments = result.get("segments", [])
-        if segments:
-            avg_confidence = sum(
-                seg.get("no_speech_prob", 0) for seg in segments
-            ) / len(segments)
-            confidence = 1.0 - avg_confidence
-        else:
-            confidence = 0.8
-
-        return text.strip(), min(confidence, 1.0)
+
+        # Wrong language detected - the fast model is not usable for this call
+        if result.get("language") and result["language"] != policy["language"]:
+            return self._transcribe_full(audio, policy, TIER_ACCURATE)
+
+        weak = [
+            i
+            for i, seg in enumerate(segments)
+            if segment_confidence(seg) < policy["min_segment_confidence"]
+        ]
+        if not weak:
+            return result["text"].strip(), overall_confidence(segments), TIER_FAST
+
+        if len(weak) / len(segments) > policy["max_escalated_ratio"]:
+            return self._transcribe_full(audio, policy, TIER_ACCURATE)
+
+        for i in weak:
+            seg = segments[i]
+            clip = audio[int(seg["start"] * SAMPLE_RATE) : int(seg["end"] * SAMPLE_RATE)]
+            retry = self._infer(policy["accurate_model"], clip, language=policy["language"])
+            retry_segments = retry.get("segments", [])
+            segments[i] = {
+                **seg,
+                "text": retry["text"],
+                "no_speech_prob": _mean(retry_segments, "no_speech_prob", 0.0),
+                "avg_logprob": _mean(retry_segments, "avg_logprob", 0.0),
+            }
+
+        text = "".join(seg["text"] for seg in segments)
+        return text.strip(), overall_confidence(segments), TIER_ESCALATED
+
+    def _transcribe_full(self, audio, policy: dict, tier: str) -> tuple[str, float, str]:
+        """Transcribe the whole recording with the accurate model"""
+        result = self._infer(policy["accurate_model"], audio, language=policy["language"])
+        segments = result.get("segments", [])
+        return result["text"].strip(), overall_confidence(segments), tier
+
+
+def _mean(segments: list, key: str, default: float) -> float:
+    if not segments:
+        return default
+    return sum(seg.get(key, default) for seg in segments) / len(segments)
 
 
 transcription_service = TranscriptionService()
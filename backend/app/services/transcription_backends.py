@@ -0,0 +1,230 @@
+"""
+Speech-to-text engines behind TranscriptionService
+מנועי תמלול עבור שירות התמלול
+
+Every backend returns Whisper-shaped results:
+{"text": str, "language": str, "segments": [{"start", "end", "text",
+"avg_logprob", "no_speech_prob"}]}
+"""
+
+import json
+import random
+import re
+import time
+
+from app.config import settings
+
+SAMPLE_RATE = 16000
+
+
+class TranscriptionBackend:
+    """Interface for transcription engines"""
+
+    name = "base"
+
+    def load_model(self, model_name: str):
+        """Load a model by size name (tiny, base, small, ...)"""
+        raise NotImplementedError
+
+    def load_audio(self, file_path: str):
+        """Decode an audio file into 16kHz mono float32 samples"""
+        raise NotImplementedError
+
+    def transcribe(self, model, audio, language: str = None) -> dict:
+        """Transcribe decoded audio with a loaded model"""
+        raise NotImplementedError
+
+
+class WhisperBackend(TranscriptionBackend):
+    """Reference openai-whisper implementation (PyTorch)"""
+
+    name = "whisper"
+
+    def load_model(self, model_name: str):
+        import whisper
+
+        return whisper.load_model(model_name)
+
+    def load_audio(self, file_path: str):
+        import whisper
+
+        return whisper.load_audio(file_path)
+
+    def transcribe(self, model, audio, language: str = None) -> dict:
+        if language:
+            return model.transcribe(audio, language=language)
+        return model.transcribe(audio)
+
+
+class FasterWhisperBackend(TranscriptionBackend):
+    """CTranslate2 engine with int8 quantization, tuned for CPU-only nodes"""
+
+    name = "faster_whisper"
+
+    def load_model(self, model_name: str):
+        from faster_whisper import WhisperModel
+
+        return WhisperModel(
+            model_name,
+            device="cpu",
+            compute_type=settings.faster_whisper_compute_type,
+            cpu_threads=settings.faster_whisper_cpu_threads,
+        )
+
+    def load_audio(self, file_path: str):
+        from faster_whisper import decode_audio
+
+        return decode_audio(file_path, sampling_rate=SAMPLE_RATE)
+
+    def transcribe(self, model, audio, language: str = None) -> dict:
+        segments, info = model.transcribe(
+            audio, language=language, beam_size=settings.faster_whisper_beam_size
+        )
+        # faster-whisper decodes lazily - consuming the generator runs inference
+        result_segments = [
+            {
+                "start": seg.start,
+                "end": seg.end,
+                "text": seg.text,
+                "avg_logprob": seg.avg_logprob,
+                "no_speech_prob": seg.no_speech_prob,
+            }
+            for seg in segments
+        ]
+        return {
+            "text": "".join(seg["text"] for seg in result_segments),
+            "language": info.language,
+            "segments": result_segments,
+        }
+
+
+class FakeBackend(TranscriptionBackend):
+    """Deterministic backend for tests and benchmarks
+
+    `results` maps model name to the result returned for it. Each call is
+    recorded in `calls` as (model_name, number_of_samples, language).
+    """
+
+    name = "fake"
+
+    def __init__(self, results: dict = None, duration_seconds: float = 10.0):
+        self.results = results or {}
+        self.duration_seconds = duration_seconds
+        self.calls = []
+
+    def load_model(self, model_name: str):
+        return model_name
+
+    def load_audio(self, file_path: str):
+        return [0.0] * int(self.duration_seconds * SAMPLE_RATE)
+
+    def transcribe(self, model, audio, language: str = None) -> dict:
+        self.calls.append((model, len(audio), language))
+        return self.results.get(model, {"text": "", "language": language, "segments": []})
+
+
+class StubAudio:
+    """Stands in for decoded samples: a length and the sentences spoken
+
+    `sentences` are (start_sample, end_sample, text). Slicing keeps the
+    sentences that overlap the clip, so escalated segments get their text.
+    """
+
+    def __init__(self, samples: int, sentences: list):
+        self.samples = samples
+        self.sentences = sentences
+
+    def __len__(self) -> int:
+        return self.samples
+
+    def __getitem__(self, index: slice) -> "StubAudio":
+        start, stop, _ = index.indices(self.samples)
+        return StubAudio(
+            max(stop - start, 0),
+            [
+                (max(begin - start, 0), min(end, stop) - start, text)
+                for begin, end, text in self.sentences
+                if begin < stop and end > start
+            ],
+        )
+
+
+class StubBackend(TranscriptionBackend):
+    """Simulated Whisper for load tests
+
+    A "recording" is a small JSON file, {"seconds": 95, "text": "..."}, as
+    served by benchmarks/load_pipeline.py. Transcription sleeps for
+    seconds * the model's real-time factor (STUB_RTF, scaled by
+    `transcription_stub_rtf_scale`, with jitter) and returns the text in
+    one segment per sentence. A share of the segments
+    (`transcription_stub_weak_ratio`) comes back weak from every model but
+    the accurate one, which exercises the cascade.
+    """
+
+    name = "stub"
+
+    # Rough CPU real-time factors of openai-whisper per model size
+    STUB_RTF = {"tiny": 0.04, "base": 0.07, "small": 0.2, "medium": 0.5, "large": 1.0}
+
+    def __init__(self, seed: int = None):
+        self._rng = random.Random(seed)
+
+    def load_model(self, model_name: str):
+        return model_name
+
+    def load_audio(self, file_path: str):
+        with open(file_path, encoding="utf-8") as f:
+            recording = json.load(f)
+        samples = int(float(recording["seconds"]) * SAMPLE_RATE)
+        sentences = [
+            sentence
+            for sentence in re.split(r"(?<=[.?!])\s+|\n+", recording.get("text", ""))
+            if sentence.strip()
+        ]
+        total = sum(len(sentence) for sentence in sentences) or 1
+        timed, position = [], 0
+        for sentence in sentences:
+            length = samples * len(sentence) // total
+            timed.append((position, position + length, sentence))
+            position += length
+        return StubAudio(samples, timed)
+
+    def transcribe(self, model, audio, language: str = None) -> dict:
+        seconds = len(audio) / SAMPLE_RATE
+        rtf = self.STUB_RTF.get(model, 0.2) * settings.transcription_stub_rtf_scale
+        time.sleep(seconds * rtf * self._rng.lognormvariate(0, 0.2))
+
+        weak_ratio = settings.transcription_stub_weak_ratio
+        if model == settings.whisper_accurate_model:
+            weak_ratio = 0.0
+        segments = [
+            {
+                "start": begin / SAMPLE_RATE,
+                "end": end / SAMPLE_RATE,
+                "text": f" {text}",
+                "avg_logprob": -1.5 if self._rng.random() < weak_ratio else -0.15,
+                "no_speech_prob": 0.02,
+            }
+            for begin, end, text in audio.sentences
+        ]
+        return {
+            "text": "".join(segment["text"] for segment in segments),
+            "language": language or settings.transcription_language,
+            "segments": segments,
+        }
+
+
+BACKENDS = {
+    WhisperBackend.name: WhisperBackend,
+    FasterWhisperBackend.name: FasterWhisperBackend,
+    FakeBackend.name: FakeBackend,
+    StubBackend.name: StubBackend,
+}
+
+
+def get_backend(name: str = None) -> TranscriptionBackend:
+    """Instantiate the configured transcription backend"""
+    name = name or settings.transcription_backend
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown transcription backend: {name}")
+    return BACKENDS[name]()
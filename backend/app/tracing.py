@@ -0,0 +1,87 @@
+"""
+Distributed tracing (OpenTelemetry)
+מעקב מבוזר אחר בקשות ומשימות
+
+The API and the workers each install a tracer provider. FastAPI routes,
+SQLAlchemy queries, boto3 calls and Celery tasks are traced by the
+OpenTelemetry instrumentations; Whisper inference, storage transfers and
+LLM requests add their own spans. `enqueue_task` injects the current
+trace context into the outbox message headers, so a call's webhook,
+transcription and extraction end up in one trace even though the relay
+process publishes the message.
+
+Exporter (`otel_exporter`): "otlp" (HTTP to a collector), "console",
+"file" (one JSON span per line, for local runs and tests) or "none".
+"""
+
+from opentelemetry import propagate, trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor,
+    ConsoleSpanExporter,
+    SpanExporter,
+)
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+from app.config import settings
+
+_provider = None
+
+
+def _exporter() -> SpanExporter:
+    if settings.otel_exporter == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+        return OTLPSpanExporter(endpoint=settings.otel_exporter_otlp_endpoint)
+    if settings.otel_exporter == "file":
+        return ConsoleSpanExporter(
+            out=open(settings.otel_file_path, "a", encoding="utf-8"),
+            formatter=lambda span: span.to_json(indent=None) + "\n",
+        )
+    if settings.otel_exporter == "console":
+        return ConsoleSpanExporter()
+    return None
+
+
+def setup_tracing(service_name: str, exporter: SpanExporter = None) -> TracerProvider:
+    """Install the process-wide tracer provider (first call wins)
+
+    OpenTelemetry only lets the global provider be set once. A later call
+    that passes an `exporter` adds it to the installed provider instead.
+    """
+    global _provider
+    if _provider is not None:
+        if exporter is not None:
+            _provider.add_span_processor(BatchSpanProcessor(exporter))
+        return _provider
+
+    _provider = TracerProvider(
+        resource=Resource.create({"service.name": service_name}),
+        sampler=ParentBased(TraceIdRatioBased(settings.otel_sample_ratio)),
+    )
+    exporter = exporter or _exporter()
+    if exporter is not None:
+        _provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(_provider)
+    return _provider
+
+
+def instrument_libraries(engine=None) -> None:
+    """Trace SQLAlchemy queries on `engine` and every boto3 call"""
+    from opentelemetry.instrumentation.botocore import BotocoreInstrumentor
+    from opentelemetry.instrumentation.sqlalchemy import SQLAlchemyInstrumentor
+
+    if engine is not None:
+        SQLAlchemyInstrumentor().instrument(engine=engine)
+    BotocoreInstrumentor().instrument()
+
+
+def inject_trace_context(headers: dict) -> dict:
+    """Add the current trace context (traceparent) to message headers"""
+    propagate.inject(headers)
+    return headers
+
+
+def get_tracer(name: str) -> trace.Tracer:
+    return trace.get_tracer(name)
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Extraction quality and cost benchmark on golden transcripts
+מדידת איכות ועלות החילוץ מול תמלילים מתויגים
+
+Runs every transcript in the corpus (benchmarks/corpus/<name>.txt, with
+the expected fields in <name>.json) through each extraction strategy:
+
+- rules: the deterministic field extractors alone (the live-call fast path)
+- llm: LLMService.extract_information
+- hybrid: the rules, then one LLM pass merged over them, as a live call ends
+
+and reports field-level precision and recall, latency percentiles, LLM
+calls and tokens per transcript. The LLM is an offline backend (see
+app.services.llm_backends): the rule-based stub by default, or replies
+recorded against the real API (--backend replay / --backend record).
+Latency is wall time plus the model time the backend stands for.
+
+Only fields that are set in the golden file or predicted with a
+non-default value are scored. Free-text fields match when one contains
+the other.
+
+Usage (from backend/):
+    python -m benchmarks.extraction --repeat 5 --fields
+    OPENAI_API_KEY=... python -m benchmarks.extraction --backend record
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+import statistics
+import time
+from collections import Counter
+from datetime import date
+
+from app.config import settings
+from app.schemas import ExtractionResult
+from app.services.errors import ServiceError
+from app.services.extract import LLMService
+from app.services.field_extractors import BRANDS
+from app.services.incremental_extract import IncrementalExtractor
+from app.services.llm_backends import LatencyModel, RecordingChatClient, StubChatClient
+from app.services.llm_prompt import split_sentences
+
+CORPUS = os.path.join(os.path.dirname(__file__), "corpus")
+
+NOT_SCORED = {"free_text_summary_he", "confidence"}
+FREE_TEXT = {"device.issue", "device.model", "quote.notes", "follow_up.reason",
+             "customer.address.notes"}
+
+
+# Scoring
+
+def flatten(data: dict, prefix: str = "") -> dict:
+    fields = {}
+    for key, value in data.items():
+        path = f"{prefix}{key}"
+        if path in NOT_SCORED or value is None:
+            continue
+        if isinstance(value, dict):
+            fields.update(flatten(value, f"{path}."))
+        else:
+            fields[path] = value
+    return fields
+
+
+def normalize(path: str, value):
+    if isinstance(value, bool) or isinstance(value, (int, float)):
+        return float(value)
+    value = str(value).strip()
+    if path.endswith("phone"):
+        digits = re.sub(r"\D", "", value)
+        return "0" + digits[3:] if digits.startswith("972") else digits
+    if path == "device.brand":
+        value = BRANDS.get(value, value)
+    if path == "quote.agreed_price":
+        match = re.search(r"\d+(?:\.\d+)?", value)
+        return float(match.group()) if match else value
+    return re.sub(r"\s+", " ", value).casefold()
+
+
+def matches(path: str, expected, predicted) -> bool:
+    expected, predicted = normalize(path, expected), normalize(path, predicted)
+    if path in FREE_TEXT and isinstance(expected, str) and isinstance(predicted, str):
+        return expected in predicted or predicted in expected
+    return expected == predicted
+
+
+def score(expected: dict, result: ExtractionResult, counts: dict) -> None:
+    """Add per-field true/false positives and false negatives to `counts`"""
+    gold = flatten(expected)
+    predicted = flatten(result.model_dump(exclude_defaults=True))
+    for path in gold.keys() | predicted.keys():
+        counts.setdefault(path, Counter())
+        if path in predicted and path in gold and matches(path, gold[path], predicted[path]):
+            counts[path]["tp"] += 1
+            continue
+        if path in predicted:
+            counts[path]["fp"] += 1
+        if path in gold:
+            counts[path]["fn"] += 1
+
+
+def precision_recall(counter: Counter) -> tuple:
+    tp, fp, fn = counter["tp"], counter["fp"], counter["fn"]
+    precision = tp / (tp + fp) if tp + fp else 1.0
+    recall = tp / (tp + fn) if tp + fn else 1.0
+    return precision, recall
+
+
+# Strategies
+
+class MeteredClient:
+    """Wraps a chat client and counts calls, tokens and model time"""
+
+    def __init__(self, client):
+        self.client = client
+        self.chat = self
+        self.completions = self
+        self.reset()
+
+    def reset(self):
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.simulated_seconds = 0.0
+
+    def create(self, **kwargs):
+        response = self.client.chat.completions.create(**kwargs)
+        self.calls += 1
+        self.prompt_tokens += response.usage.prompt_tokens
+        self.completion_tokens += response.usage.completion_tokens
+        self.simulated_seconds += getattr(response, "simulated_seconds", 0.0)
+        return response
+
+
+def run_rules(llm, text: str, reference_date: date) -> ExtractionResult:
+    extractor = IncrementalExtractor(llm=llm, reference_date=reference_date)
+    for sentence in split_sentences(text):
+        extractor.add_segment(sentence)
+    return extractor.result
+
+
+def run_llm(llm, text: str, reference_date: date) -> ExtractionResult:
+    return llm.extract_information(text)
+
+
+def run_hybrid(llm, text: str, reference_date: date) -> ExtractionResult:
+    extractor = IncrementalExtractor(llm=llm, reference_date=reference_date)
+    for sentence in split_sentences(text):
+        extractor.add_segment(sentence)
+    extractor.refresh_with_llm()
+    return extractor.result
+
+
+STRATEGIES = {"rules": run_rules, "llm": run_llm, "hybrid": run_hybrid}
+
+
+def load_corpus(directory: str) -> list:
+    cases = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.txt"))):
+        name = os.path.splitext(os.path.basename(path))[0]
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+        with open(os.path.join(directory, f"{name}.json"), encoding="utf-8") as f:
+            golden = json.load(f)
+        cases.append((name, text, date.fromisoformat(golden["reference_date"]), golden["expected"]))
+    return cases
+
+
+def make_client(backend: str, recordings: str, seed: int):
+    if backend == "stub":
+        return StubChatClient(latency=LatencyModel(), sleep=False, seed=seed)
+    if backend == "replay":
+        return RecordingChatClient(recordings)
+    import openai
+
+    real = openai.OpenAI(api_key=settings.openai_api_key, timeout=settings.llm_timeout_seconds)
+    return RecordingChatClient(recordings, client=real)
+
+
+def run_strategy(run, client, cases: list, repeat: int) -> dict:
+    metered = MeteredClient(client)
+    llm = LLMService()
+    llm._client = metered
+    counts, latencies, failures = {}, [], 0
+    calls = prompt_tokens = completion_tokens = 0
+
+    for iteration in range(repeat):
+        for name, text, reference_date, expected in cases:
+            if isinstance(client, StubChatClient):
+                client.reference_date = reference_date
+            metered.reset()
+            started = time.perf_counter()
+            try:
+                result = run(llm, text, reference_date)
+            except ServiceError as e:
+                failures += 1
+                print(f"   ⚠️ {name}: {e}")
+                continue
+            latencies.append(time.perf_counter() - started + metered.simulated_seconds)
+            calls += metered.calls
+            prompt_tokens += metered.prompt_tokens
+            completion_tokens += metered.completion_tokens
+            if iteration == 0:
+                score(expected, result, counts)
+
+    runs = max(len(latencies), 1)
+    return {
+        "counts": counts,
+        "latencies": latencies,
+        "failures": failures,
+        "calls": calls / runs,
+        "prompt_tokens": prompt_tokens / runs,
+        "completion_tokens": completion_tokens / runs,
+    }
+
+
+def percentile(values: list, q: float) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[int(q) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--corpus", default=CORPUS)
+    parser.add_argument("--strategies", nargs="+", default=list(STRATEGIES), choices=list(STRATEGIES))
+    parser.add_argument("--backend", default="stub", choices=["stub", "replay", "record"])
+    parser.add_argument("--recordings", default=os.path.join(CORPUS, "llm_recordings.json"))
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per transcript, for latency")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--fields", action="store_true", help="Also show per-field results")
+    args = parser.parse_args()
+
+    cases = load_corpus(args.corpus)
+    print(f"🧪 {len(cases)} transcripts x {args.repeat} runs, LLM backend: {args.backend}")
+    print(
+        f"{'strategy':<10}{'precision':>10}{'recall':>8}{'p50 ms':>9}{'p95 ms':>9}"
+        f"{'max ms':>9}{'calls':>7}{'prompt tok':>12}{'reply tok':>11}{'failed':>8}"
+    )
+
+    results = {}
+    for name in args.strategies:
+        client = make_client(args.backend, args.recordings, args.seed)
+        stats = results[name] = run_strategy(STRATEGIES[name], client, cases, args.repeat)
+        precision, recall = precision_recall(sum(stats["counts"].values(), Counter()))
+        ms = [seconds * 1000 for seconds in stats["latencies"]]
+        print(
+            f"{name:<10}{precision:>10.2f}{recall:>8.2f}{percentile(ms, 50):>9.1f}"
+            f"{percentile(ms, 95):>9.1f}{max(ms, default=0):>9.1f}{stats['calls']:>7.1f}"
+            f"{stats['prompt_tokens']:>12.0f}{stats['completion_tokens']:>11.0f}{stats['failures']:>8}"
+        )
+
+    if args.fields:
+        paths = sorted({path for stats in results.values() for path in stats["counts"]})
+        print()
+        print(f"{'field':<38}" + "".join(f"{name + ' P/R':>16}" for name in results))
+        for path in paths:
+            cells = []
+            for stats in results.values():
+                precision, recall = precision_recall(stats["counts"].get(path, Counter()))
+                cells.append(f"{precision:>10.2f}/{recall:.2f}")
+            print(f"{path:<38}" + "".join(f"{cell:>16}" for cell in cells))
+
+
+if __name__ == "__main__":
+    main()
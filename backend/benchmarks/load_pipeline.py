@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+"""
+End-to-end pipeline load generator
+מחולל עומס לצינור העיבוד המלא (webhook ← תמלול ← חילוץ)
+
+Replays synthetic Twilio webhooks against a running API and its Celery
+workers and follows every call to the end through the org's status event
+stream (/calls/events). The stack should run with the simulated engines,
+so that capacity depends on the latency models rather than on hardware:
+
+    TRANSCRIPTION_BACKEND=stub LLM_BACKEND=stub LLM_STUB_SLEEP=true
+    (see infra/docker-compose.loadtest.yml and `make loadtest`)
+
+Recordings are served by this tool: a recording URL points at a small
+JSON file ({"seconds", "text"}) with a transcript from the benchmark
+corpus, which the stub transcription backend "decodes". Workers in Docker
+reach it through --recordings-url.
+
+Arrivals follow --pattern:
+- constant: evenly spaced
+- poisson: exponential gaps
+- burst: groups of --burst-size
+- ramp: rising linearly to twice --rate
+
+Recording lengths are log-normal around --median-seconds. A share of
+webhooks (--duplicate-rate) is sent again with the same CallSid a few
+seconds later, as Twilio does on retries.
+
+The report covers webhook latency, throughput, and per-stage latency
+percentiles. Stages are timed by the status events, stamped by the
+workers:
+- transcription queue wait (accepted -> transcribing)
+- transcription (transcribing -> extracting)
+- extraction (extracting -> completed; queue wait and run together)
+The mean service time and queue depths per stage come from /ops/autoscaling,
+which needs the platform's --ops-token (OPS_SERVICE_TOKEN).
+
+Usage (from backend/):
+    python -m benchmarks.load_pipeline --api http://localhost:8000 \\
+        --email owner@example.com --password ... --calls 2000 --rate 5 \\
+        --pattern poisson --duplicate-rate 0.05 \\
+        --recordings-url http://host.docker.internal:8765
+"""
+
+import argparse
+import glob
+import json
+import math
+import os
+import random
+import statistics
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+CORPUS = os.path.join(os.path.dirname(__file__), "corpus")
+TERMINAL = {"completed", "failed", "dead_letter"}
+
+
+# Recordings
+
+def load_transcripts(directory: str) -> dict:
+    transcripts = {}
+    for path in sorted(glob.glob(os.path.join(directory, "*.txt"))):
+        with open(path, encoding="utf-8") as f:
+            transcripts[os.path.splitext(os.path.basename(path))[0]] = f.read()
+    return transcripts
+
+
+def serve_recordings(port: int, transcripts: dict) -> ThreadingHTTPServer:
+    """Serve /recordings/<transcript>.json?seconds=N in a background thread"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            name = os.path.splitext(os.path.basename(url.path))[0]
+            if name not in transcripts:
+                self.send_error(404)
+                return
+            seconds = float(parse_qs(url.query).get("seconds", ["60"])[0])
+            body = json.dumps({"seconds": seconds, "text": transcripts[name]}, ensure_ascii=False)
+            body = body.encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# Workload
+
+def arrival_offsets(pattern: str, count: int, rate: float, burst_size: int, rng) -> list:
+    """Seconds from the start at which each webhook is sent"""
+    if pattern == "constant":
+        return [i / rate for i in range(count)]
+    if pattern == "poisson":
+        offsets, at = [], 0.0
+        for _ in range(count):
+            offsets.append(at)
+            at += rng.expovariate(rate)
+        return offsets
+    if pattern == "burst":
+        return [(i // burst_size) * burst_size / rate for i in range(count)]
+    # ramp: the rate grows linearly from 0 to 2*rate, so the i-th arrival
+    # comes at sqrt(i / count) of the run
+    duration = count / rate
+    return [duration * math.sqrt(i / count) for i in range(count)]
+
+
+def recording_seconds(median: float, sigma: float, rng) -> float:
+    return round(min(max(rng.lognormvariate(math.log(median), sigma), 5.0), 1800.0), 1)
+
+
+def build_workload(args, transcripts: dict, rng) -> list:
+    """(offset, callSid, webhook body) for every send, duplicates included"""
+    names = sorted(transcripts)
+    sends = []
+    offsets = arrival_offsets(args.pattern, args.calls, args.rate, args.burst_size, rng)
+    for offset in offsets:
+        seconds = recording_seconds(args.median_seconds, args.sigma, rng)
+        call_sid = f"CA{uuid.uuid4().hex}"
+        body = {
+            "recordingUrl": f"{args.recordings_url}/recordings/{rng.choice(names)}.json?seconds={seconds}",
+            "callSid": call_sid,
+            "from": f"+97250{rng.randrange(10**7):07d}",
+            "to": "+97235551234",
+            "startTime": datetime.utcnow().isoformat() + "Z",
+            "duration": int(seconds),
+        }
+        sends.append((offset, call_sid, body))
+        if rng.random() < args.duplicate_rate:
+            sends.append((offset + rng.uniform(0.5, 5.0), call_sid, body))
+    return sorted(sends, key=lambda send: send[0])
+
+
+# Observation
+
+class Tracker:
+    """What happened to each call, from webhook responses and status events"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sends = []  # (callSid, sent_at, seconds, http status, call_id)
+        self.accepted_at = {}  # call_id -> client time the webhook was answered
+        self.events = defaultdict(dict)  # call_id -> status -> server time
+        self.late = {}  # call_id -> final status polled after the run
+        self.done = threading.Event()
+        self.expected = 0
+
+    def record_send(self, call_sid, sent_at, elapsed, status, call_id):
+        with self.lock:
+            self.sends.append((call_sid, sent_at, elapsed, status, call_id))
+            if call_id is not None:
+                self.accepted_at[call_id] = sent_at + elapsed
+
+    def record_event(self, message: dict):
+        at = datetime.fromisoformat(message["at"]).timestamp()
+        with self.lock:
+            self.events[message["call_id"]].setdefault(message["status"], at)
+            finished = sum(1 for statuses in self.events.values() if TERMINAL & statuses.keys())
+        if self.expected and finished >= self.expected:
+            self.done.set()
+
+    def finished(self) -> int:
+        with self.lock:
+            return sum(1 for call_id in self.accepted_at if TERMINAL & self.events[call_id].keys())
+
+
+def follow_events(api: str, headers: dict, tracker: Tracker, stop: threading.Event):
+    """Read the org's status stream until `stop` (reconnecting on errors)"""
+    while not stop.is_set():
+        try:
+            with requests.get(f"{api}/calls/events", headers=headers, stream=True, timeout=30) as response:
+                response.raise_for_status()
+                for line in response.iter_lines(decode_unicode=True):
+                    if stop.is_set():
+                        return
+                    if line and line.startswith("data: "):
+                        tracker.record_event(json.loads(line[6:]))
+        except requests.RequestException as e:
+            print(f"   ⚠️ event stream: {e}; reconnecting")
+            time.sleep(1)
+
+
+def sample_queues(api: str, headers: dict, samples: list, stop: threading.Event, every: float):
+    while not stop.wait(every):
+        try:
+            response = requests.get(f"{api}/ops/autoscaling", headers=headers, timeout=10)
+            response.raise_for_status()
+            samples.append((time.time(), response.json()["stages"]))
+        except requests.RequestException:
+            pass
+
+
+# Driving
+
+def send_webhook(session, api, headers, tracker, call_sid, body):
+    sent_at = time.time()
+    try:
+        response = session.post(f"{api}/calls/webhook/twilio", json=body, headers=headers, timeout=30)
+        call_id = response.json().get("call_id") if response.ok else None
+        tracker.record_send(call_sid, sent_at, time.time() - sent_at, response.status_code, call_id)
+    except requests.RequestException as e:
+        tracker.record_send(call_sid, sent_at, time.time() - sent_at, type(e).__name__, None)
+
+
+def login(api: str, email: str, password: str) -> str:
+    response = requests.post(
+        f"{api}/auth/login", json={"email": email, "password": password, "device_id": "load-test"}
+    )
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+def reconcile(api: str, headers: dict, tracker: Tracker):
+    """Ask for the status of calls the event stream left unfinished"""
+    with tracker.lock:
+        pending = [call_id for call_id in tracker.accepted_at if not TERMINAL & tracker.events[call_id].keys()]
+    for call_id in pending:
+        try:
+            response = requests.get(f"{api}/calls/{call_id}", headers=headers, timeout=10)
+            response.raise_for_status()
+        except requests.RequestException:
+            continue
+        status = response.json()["status"]
+        if status in TERMINAL:
+            # Missed while reconnecting: counts as an outcome, not timed
+            with tracker.lock:
+                tracker.late[call_id] = status
+
+
+def percentiles(values: list) -> str:
+    if not values:
+        return f"{'-':>8}{'-':>8}{'-':>8}{'-':>8}"
+    ordered = sorted(values)
+
+    def at(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    return f"{at(0.5):>8.2f}{at(0.95):>8.2f}{at(0.99):>8.2f}{ordered[-1]:>8.2f}"
+
+
+def report(tracker: Tracker, samples: list, started: float, sends: int):
+    with tracker.lock:
+        results = list(tracker.sends)
+        accepted_at = dict(tracker.accepted_at)
+        events = {call_id: dict(statuses) for call_id, statuses in tracker.events.items()}
+        late = dict(tracker.late)
+
+    statuses = Counter(str(status) for _, _, _, status, _ in results)
+    calls_per_sid = Counter(call_sid for call_sid, _, _, _, call_id in results if call_id is not None)
+    webhook_latency = [elapsed for _, _, elapsed, status, _ in results if status == 200]
+
+    stages = {
+        "transcription wait": [],
+        "transcription": [],
+        "extraction (wait+run)": [],
+        "end to end": [],
+    }
+    outcomes = Counter()
+    completed_at = []
+    for call_id, accepted in accepted_at.items():
+        seen = events.get(call_id, {})
+        outcome = next(
+            (status for status in ("completed", "failed", "dead_letter") if status in seen),
+            late.get(call_id, "unfinished"),
+        )
+        outcomes[outcome] += 1
+        if "transcribing" in seen:
+            stages["transcription wait"].append(seen["transcribing"] - accepted)
+        if "transcribing" in seen and "extracting" in seen:
+            stages["transcription"].append(seen["extracting"] - seen["transcribing"])
+        if "extracting" in seen and "completed" in seen:
+            stages["extraction (wait+run)"].append(seen["completed"] - seen["extracting"])
+        if "completed" in seen:
+            stages["end to end"].append(seen["completed"] - accepted)
+            completed_at.append(seen["completed"])
+
+    elapsed = (max(completed_at) if completed_at else time.time()) - started
+    print()
+    print(f"📨 webhooks sent: {sends}, responses: {dict(statuses)}")
+    print(
+        f"   calls created: {len(accepted_at)} for {len(calls_per_sid)} CallSids"
+        f" ({sum(n - 1 for n in calls_per_sid.values())} duplicates processed again)"
+    )
+    print(f"   outcomes: {dict(outcomes)}")
+    sending = max((sent_at for _, sent_at, _, _, _ in results), default=started) - started
+    print(
+        f"⚡ throughput: {outcomes['completed'] / max(elapsed, 1e-9):.2f} calls/s completed"
+        f" over {elapsed:.0f}s (offered {sends / max(sending, 1e-9):.2f} webhooks/s)"
+    )
+    print()
+    print(f"{'stage (seconds)':<24}{'p50':>8}{'p95':>8}{'p99':>8}{'max':>8}{'calls':>8}")
+    print(f"{'webhook':<24}{percentiles(webhook_latency)}{len(webhook_latency):>8}")
+    for name, values in stages.items():
+        print(f"{name:<24}{percentiles(values)}{len(values):>8}")
+
+    if samples:
+        print()
+        print(f"{'stage':<14}{'max depth':>10}{'max waiting':>13}{'service s':>11}{'workers':>9}")
+        last = {stage["stage"]: stage for stage in samples[-1][1]}
+        for name, stage in last.items():
+            seen = [s for _, snapshot in samples for s in snapshot if s["stage"] == name]
+            print(
+                f"{name:<14}{max(s['queue_depth'] for s in seen):>10}"
+                f"{max(s['calls_waiting'] for s in seen):>13}{stage['service_time']:>11.2f}"
+                f"{stage['recommended_workers']:>9}"
+            )
+        # Extraction has no "started" status; its wait is what the mean run leaves
+        service = last.get("extraction", {}).get("service_time", 0.0)
+        extraction = stages["extraction (wait+run)"]
+        if service and extraction:
+            print(
+                f"   extraction queue wait ≈ {max(0.0, statistics.median(extraction) - service):.2f}s"
+                f" (median wait+run - mean service time)"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--api", default="http://localhost:8000")
+    parser.add_argument("--token", help="Bearer token of a user in the test org")
+    parser.add_argument("--email")
+    parser.add_argument("--password")
+    parser.add_argument("--ops-token", help="OPS_SERVICE_TOKEN, to sample /ops/autoscaling")
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument("--rate", type=float, default=2.0, help="Mean webhooks per second")
+    parser.add_argument("--pattern", default="poisson", choices=["constant", "poisson", "burst", "ramp"])
+    parser.add_argument("--burst-size", type=int, default=50)
+    parser.add_argument("--median-seconds", type=float, default=120.0, help="Median recording length")
+    parser.add_argument("--sigma", type=float, default=0.6, help="Spread of recording lengths (log-normal)")
+    parser.add_argument("--duplicate-rate", type=float, default=0.0)
+    parser.add_argument("--recordings-port", type=int, default=8765)
+    parser.add_argument("--recordings-url", help="How workers reach this tool (default: localhost)")
+    parser.add_argument("--corpus", default=CORPUS)
+    parser.add_argument("--concurrency", type=int, default=32, help="Webhook senders")
+    parser.add_argument("--timeout", type=float, default=600, help="Wait after the last send")
+    parser.add_argument("--sample-seconds", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    args.recordings_url = (args.recordings_url or f"http://localhost:{args.recordings_port}").rstrip("/")
+
+    token = args.token or login(args.api, args.email, args.password)
+    headers = {"Authorization": f"Bearer {token}"}
+    rng = random.Random(args.seed)
+    transcripts = load_transcripts(args.corpus)
+    server = serve_recordings(args.recordings_port, transcripts)
+    workload = build_workload(args, transcripts, rng)
+
+    tracker = Tracker()
+    stop = threading.Event()
+    samples = []
+    threading.Thread(target=follow_events, args=(args.api, headers, tracker, stop), daemon=True).start()
+    if args.ops_token:
+        ops_headers = {"Authorization": f"Bearer {args.ops_token}"}
+        threading.Thread(
+            target=sample_queues,
+            args=(args.api, ops_headers, samples, stop, args.sample_seconds),
+            daemon=True,
+        ).start()
+    time.sleep(1)  # let the event stream subscribe
+
+    print(
+        f"🚦 {len(workload)} webhooks ({args.calls} calls, pattern={args.pattern},"
+        f" rate={args.rate}/s, median recording {args.median_seconds:.0f}s)"
+    )
+    started = time.time()
+    session = requests.Session()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for offset, call_sid, body in workload:
+            delay = started + offset - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(send_webhook, session, args.api, headers, tracker, call_sid, body)
+
+    with tracker.lock:
+        tracker.expected = len(tracker.accepted_at)
+    print(f"   all sent after {time.time() - started:.0f}s; waiting for the pipeline")
+    deadline = time.time() + args.timeout
+    while time.time() < deadline and not tracker.done.is_set():
+        tracker.done.wait(10)
+        print(f"   {tracker.finished()}/{tracker.expected} calls finished")
+
+    stop.set()
+    reconcile(args.api, headers, tracker)
+    server.shutdown()
+    report(tracker, samples, started, len(workload))
+
+
+if __name__ == "__main__":
+    main()
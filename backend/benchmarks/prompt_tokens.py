@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Token spend of extraction prompts
+מדידת צריכת הטוקנים של פרומפטי החילוץ
+
+Compares, per sample transcript, the prompt the LLM service used to send
+(whole transcript verbatim, indented prompt text, max_tokens=1000) with
+the budgeted one (compacted transcript, map-reduce chunks, max_tokens from
+the expected reply). Counts are local (tiktoken, or its estimate offline);
+no request is made.
+
+Usage (from backend/):
+    python -m benchmarks.prompt_tokens benchmarks/corpus/*.txt
+"""
+
+import argparse
+import glob
+import os
+
+from app.services.llm_prompt import count_message_tokens, count_tokens, extraction_prompts
+
+LEGACY_MAX_TOKENS = 1000
+
+
+def legacy_messages(transcript_text: str) -> list:
+    """The prompt as LLMService built it before token budgeting"""
+    system_prompt = """
+        את/ה ממלא/ת תפקיד של "סוכן הפקת מידע משיחות שירות".
+        קלט: תמליל שיחה בעברית.
+        פלט: JSON תקין בלבד לפי הסכמה המצורפת.
+        אם שדה לא מופיע – החזר null.
+        סיכום חופשי תמיד בעברית, קצר וברור לפעולה.
+        אל תנחש מחירים/כתובות אם אין רמזים.
+        אם יש "ביום חמישי ב-שלוש" והמועד עבר – הוסף שדה follow_up שדורש תיאום מחדש.
+        """
+
+    user_prompt = f"""
+        הפק/י את המידע הבא מתוך הטקסט:
+        - פרטי לקוח (שם, טלפון, אימייל, כתובת: רחוב/עיר/הערות)
+        - מכשיר/סוג טיפול (קטגוריה, מותג, דגם, תיאור בעיה, דחיפות)
+        - מחיר שסוכם (מספר, מטבע)
+        - תיאום פגישה (תאריך, שעה, משך, אישור הלקוח)
+        - Follow-up אם אין תיאום סופי
+        - סיכום חופשי בעברית (2-3 שורות)
+        החזר JSON בלבד לפי הסכמה.
+
+        טקסט:
+        ```{transcript_text}```
+        """
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt},
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument(
+        "files",
+        nargs="*",
+        default=sorted(glob.glob(os.path.join(os.path.dirname(__file__), "corpus", "*.txt"))),
+        help="Transcript text files (default: the sample corpus)",
+    )
+    args = parser.parse_args()
+
+    print(f"🧮 {len(args.files)} transcripts")
+    print(
+        f"{'transcript':<22}{'text':>7}{'compact':>9}{'calls':>7}"
+        f"{'old prompt':>12}{'new prompt':>12}{'old max':>9}{'new max':>9}"
+    )
+
+    totals = [0, 0]
+    for path in args.files:
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+        prompts = extraction_prompts(text)
+        old = count_message_tokens(legacy_messages(text))
+        new = sum(prompt.prompt_tokens for prompt in prompts)
+        totals[0] += old
+        totals[1] += new
+        print(
+            f"{os.path.basename(path):<22}{count_tokens(text):>7}"
+            f"{sum(count_tokens(prompt.transcript) for prompt in prompts):>9}{len(prompts):>7}"
+            f"{old:>12}{new:>12}{LEGACY_MAX_TOKENS:>9}{prompts[0].max_tokens:>9}"
+        )
+
+    print(f"{'total':<45}{totals[0]:>12}{totals[1]:>12}   ({1 - totals[1] / totals[0]:.0%} fewer)")
+
+
+if __name__ == "__main__":
+    main()
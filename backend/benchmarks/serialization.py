@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Serialization benchmark for list responses
+מדידת זמן סריאליזציה של רשימות בתגובות ה-API
+
+Compares, per response schema, the default FastAPI path (validate against
+the response_model, jsonable_encoder, json.dumps) with the fast path
+(pre-built ModelSerializer, orjson) on in-memory ORM rows. No database is
+needed; relationships are attached directly.
+
+Usage (from backend/):
+    python -m benchmarks.serialization --rows 1000 --repeat 50
+"""
+
+import argparse
+import json
+import statistics
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.models import (
+    Appointment,
+    Call,
+    CallStatusEnum,
+    Customer,
+    Job,
+    JobStatusEnum,
+    Message,
+)
+from app.schemas import AppointmentResponse, CallResponse, JobResponse, MessageResponse
+from app.serialization import (
+    appointment_serializer,
+    call_serializer,
+    dumps,
+    job_serializer,
+    message_serializer,
+)
+
+
+def make_rows(count: int) -> dict:
+    """`count` rows of each kind; calls and jobs share 50 customers"""
+    start = datetime(2025, 9, 1, 8, 0)
+    customers = [
+        Customer(id=i, name=f"לקוח {i}", phone=f"05012{i:05d}", email=None, created_at=start)
+        for i in range(50)
+    ]
+    return {
+        "calls": [
+            Call(
+                id=i,
+                call_sid=f"CA{i:032d}",
+                from_number=f"05012{i % 50:05d}",
+                to_number="035551234",
+                audio_url=f"https://api.twilio.com/recordings/RE{i}",
+                duration_seconds=60 + i % 300,
+                status=CallStatusEnum.COMPLETED,
+                created_at=start + timedelta(minutes=i),
+                customer=customers[i % 50],
+            )
+            for i in range(count)
+        ],
+        "jobs": [
+            Job(
+                id=i,
+                title="תיקון מזגן",
+                description="המזגן בסלון מטפטף ולא מקרר",
+                status=JobStatusEnum.SCHEDULED,
+                agreed_price=Decimal("450.00"),
+                currency="ILS",
+                priority="normal",
+                created_at=start + timedelta(minutes=i),
+                customer=customers[i % 50],
+            )
+            for i in range(count)
+        ],
+        "appointments": [
+            Appointment(
+                id=i,
+                start_at=start + timedelta(hours=i),
+                duration_minutes=60,
+                title="ביקור טכנאי",
+                notes=None,
+                is_confirmed=bool(i % 2),
+                created_at=start,
+            )
+            for i in range(count)
+        ],
+        "messages": [
+            Message(
+                id=i,
+                channel="sms",
+                to_number=f"05012{i % 50:05d}",
+                content="הטכנאי בדרך אליך, יגיע תוך 20 דקות",
+                status="sent",
+                created_at=start + timedelta(minutes=i),
+            )
+            for i in range(count)
+        ],
+    }
+
+
+def pydantic_path(adapter: TypeAdapter, rows: list) -> bytes:
+    """What FastAPI does with a response_model and the default JSONResponse"""
+    content = jsonable_encoder(adapter.dump_python(adapter.validate_python(rows), mode="json"))
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def timed(fn, repeat: int) -> list:
+    fn()  # warm-up
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        runs.append((time.perf_counter() - start) * 1000)
+    return runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    cases = [
+        ("calls", CallResponse, call_serializer),
+        ("jobs", JobResponse, job_serializer),
+        ("appointments", AppointmentResponse, appointment_serializer),
+        ("messages", MessageResponse, message_serializer),
+    ]
+
+    print(f"⏱️ {args.rows} rows per list, median of {args.repeat} runs")
+    print(f"{'schema':<14}{'pydantic (ms)':>15}{'fast (ms)':>12}{'speedup':>10}{'bytes':>10}")
+
+    for name, schema, serializer in cases:
+        adapter = TypeAdapter(List[schema])
+        data = rows[name]
+        assert json.loads(pydantic_path(adapter, data)) == json.loads(dumps(serializer.many(data)))
+
+        slow = statistics.median(timed(lambda: pydantic_path(adapter, data), args.repeat))
+        fast = statistics.median(timed(lambda: dumps(serializer.many(data)), args.repeat))
+        print(
+            f"{name:<14}{slow:>15.2f}{fast:>12.2f}{slow / fast:>9.1f}x"
+            f"{len(dumps(serializer.many(data))):>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
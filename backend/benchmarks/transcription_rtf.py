@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Real-time factor benchmark for transcription backends
+מדידת מהירות תמלול (RTF) לכל מנוע
+
+RTF = processing time / audio duration. Below 1.0 is faster than real time.
+
+Usage (from backend/):
+    python -m benchmarks.transcription_rtf samples/*.wav --model base \\
+        --backends whisper faster_whisper
+"""
+
+import argparse
+import statistics
+import time
+
+from app.services.transcription_backends import SAMPLE_RATE, get_backend
+
+
+def benchmark_backend(backend_name: str, model_name: str, files: list, language: str):
+    """Transcribe every file once and return per-file (duration, elapsed) pairs"""
+    backend = get_backend(backend_name)
+
+    load_start = time.perf_counter()
+    model = backend.load_model(model_name)
+    load_seconds = time.perf_counter() - load_start
+
+    # Warm-up run so one-time initialization does not skew the first file
+    backend.transcribe(model, backend.load_audio(files[0]), language=language)
+
+    runs = []
+    for path in files:
+        audio = backend.load_audio(path)
+        duration = len(audio) / SAMPLE_RATE
+        start = time.perf_counter()
+        backend.transcribe(model, audio, language=language)
+        runs.append((duration, time.perf_counter() - start))
+
+    return load_seconds, runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("files", nargs="+", help="Sample Hebrew audio files")
+    parser.add_argument("--model", default="base")
+    parser.add_argument("--language", default="he")
+    parser.add_argument(
+        "--backends", nargs="+", default=["whisper", "faster_whisper"]
+    )
+    args = parser.parse_args()
+
+    print(f"🎙️ {len(args.files)} files, model={args.model}, language={args.language}")
+    print(f"{'backend':<16}{'load (s)':>10}{'audio (s)':>12}{'total RTF':>12}{'p50 RTF':>10}{'max RTF':>10}")
+
+    for backend_name in args.backends:
+        load_seconds, runs = benchmark_backend(
+            backend_name, args.model, args.files, args.language
+        )
+        audio_total = sum(duration for duration, _ in runs)
+        elapsed_total = sum(elapsed for _, elapsed in runs)
+        rtfs = [elapsed / duration for duration, elapsed in runs if duration]
+        print(
+            f"{backend_name:<16}{load_seconds:>10.1f}{audio_total:>12.1f}"
+            f"{elapsed_total / audio_total:>12.3f}"
+            f"{statistics.median(rtfs):>10.3f}{max(rtfs):>10.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
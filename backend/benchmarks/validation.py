@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Validation throughput benchmark for hot payloads
+מדידת קצב אימות (ולידציה) של מטעני JSON נפוצים
+
+Validates a typical LLM extraction result and a Twilio webhook payload
+from raw JSON bytes in several ways:
+
+- loads+kwargs: json.loads, then Model(**data) (what the code used to do)
+- loads+validate: json.loads, then Model.model_validate (FastAPI's body path)
+- validate_json: Model.model_validate_json(bytes) - one pass in pydantic-core
+- adapter (once): a TypeAdapter built once, validate_json(bytes)
+- adapter (per call): a TypeAdapter built for every payload
+
+Usage (from backend/):
+    python -m benchmarks.validation --count 20000
+"""
+
+import argparse
+import json
+import time
+
+from pydantic import TypeAdapter
+
+from app.schemas import CallWebhook, ExtractionResult
+
+EXTRACTION = json.dumps(
+    {
+        "customer": {
+            "name": "דנה כהן",
+            "phone": "050-1234567",
+            "email": None,
+            "address": {"line1": "הרצל 12", "city": "תל אביב", "notes": "קומה 3"},
+        },
+        "device": {
+            "category": "מזגן",
+            "brand": "Tadiran",
+            "model": "Wind 140",
+            "issue_description": "המזגן מטפטף ולא מקרר",
+            "urgency": "high",
+        },
+        "quote": {"agreed_price": 450, "currency": "ILS", "notes": None},
+        "appointment": {"date": "2025-09-04", "time": "15:00", "duration_minutes": 60,
+                        "is_confirmed_by_customer": True},
+        "follow_up": {"required": False, "due_at": None, "reason": None},
+        "free_text_summary_he": "הלקוחה מדווחת על טפטוף מהמזגן בסלון. נקבע ביקור ביום חמישי ב-15:00.",
+        "confidence": 0.86,
+    },
+    ensure_ascii=False,
+).encode()
+
+WEBHOOK = json.dumps(
+    {
+        "recordingUrl": "https://api.twilio.com/2010-04-01/Accounts/AC1/Recordings/RE1",
+        "callSid": "CA0123456789abcdef0123456789abcdef",
+        "from": "+972501234567",
+        "to": "+97235551234",
+        "startTime": "2025-09-01T09:00:00Z",
+        "duration": 95,
+    }
+).encode()
+
+
+def strategies(model):
+    adapter = TypeAdapter(model)
+    return [
+        ("loads+kwargs", lambda raw: model(**json.loads(raw))),
+        ("loads+validate", lambda raw: model.model_validate(json.loads(raw))),
+        ("validate_json", model.model_validate_json),
+        ("adapter (once)", adapter.validate_json),
+        ("adapter (per call)", lambda raw: TypeAdapter(model).validate_json(raw)),
+    ]
+
+
+def throughput(fn, payload: bytes, count: int) -> float:
+    fn(payload)  # warm-up
+    start = time.perf_counter()
+    for _ in range(count):
+        fn(payload)
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--count", type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"⏱️ {args.count} validations per strategy (per-call adapters: count / 100)")
+    print(f"{'payload':<12}{'strategy':<22}{'per second':>14}{'µs each':>10}")
+
+    for name, model, payload in (
+        ("extraction", ExtractionResult, EXTRACTION),
+        ("webhook", CallWebhook, WEBHOOK),
+    ):
+        expected = model.model_validate_json(payload)
+        for label, fn in strategies(model):
+            assert fn(payload) == expected
+            count = args.count // 100 if "per call" in label else args.count
+            rate = throughput(fn, payload, max(count, 1))
+            print(f"{name:<12}{label:<22}{rate:>14,.0f}{1e6 / rate:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
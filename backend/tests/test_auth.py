@@ -0,0 +1,152 @@
+import asyncio
+
+import fakeredis.aioredis
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.orm import sessionmaker
+from starlette.requests import Request
+
+from app import deps
+from app.config import settings
+from app.models import Organization
+from app.services import auth
+
+
+def request_with(token):
+    return Request(
+        {
+            "type": "http",
+            "headers": [(b"authorization", f"Bearer {token}".encode())],
+            "query_string": b"",
+        }
+    )
+
+
+def test_tokens_carry_identity_and_are_type_checked():
+    pair = auth.create_token_pair(7, 3, "admin")
+
+    claims = auth.decode_token(pair["access_token"])
+    user = auth.current_user_from_claims(claims)
+    assert (user.id, user.org_id, user.role) == (7, 3, "admin")
+
+    assert auth.decode_token(pair["refresh_token"], auth.REFRESH_TOKEN)["jti"] != user.jti
+    with pytest.raises(auth.TokenError):
+        auth.decode_token(pair["refresh_token"])
+    with pytest.raises(auth.TokenError):
+        auth.decode_token(pair["access_token"] + "x")
+
+
+def test_revoked_token_is_rejected(monkeypatch):
+    client = fakeredis.aioredis.FakeRedis()
+    monkeypatch.setattr(deps, "get_async_redis", lambda: client)
+    token = auth.create_token(7, 3, "owner", auth.ACCESS_TOKEN)
+
+    async def scenario():
+        user = await deps.get_current_user(request_with(token))
+        await auth.revoke(client, user.jti, user.expires_at)
+        ttl = await client.ttl(f"{auth.REVOKED_PREFIX}{user.jti}")
+        with pytest.raises(HTTPException) as rejected:
+            await deps.get_current_user(request_with(token))
+        return user, ttl, rejected.value
+
+    user, ttl, rejected = asyncio.run(scenario())
+    assert user.id == 7 and 0 < ttl <= user.expires_at
+    assert rejected.status_code == 401
+
+
+def test_revocation_check_fails_closed(monkeypatch):
+    class BrokenRedis:
+        async def exists(self, key):
+            raise ConnectionError("refused")
+
+    monkeypatch.setattr(deps, "get_async_redis", lambda: BrokenRedis())
+    token = auth.create_token(7, 3, "owner", auth.ACCESS_TOKEN)
+
+    with pytest.raises(HTTPException) as rejected:
+        asyncio.run(deps.get_current_user(request_with(token)))
+    assert rejected.value.status_code == 503
+
+
+def test_org_settings_are_cached_until_ttl(db, monkeypatch):
+    # A cache miss opens its own session, not the request's
+    monkeypatch.setattr(deps, "SessionLocal", sessionmaker(bind=db.get_bind()))
+    db.add(Organization(id=3, name="Org", timezone="Asia/Jerusalem", plan="pro"))
+    db.commit()
+
+    clock = [1000.0]
+    monkeypatch.setattr(auth.time, "monotonic", lambda: clock[0])
+    cache = auth.OrgSettingsCache(ttl=60, max_size=10)
+    user = auth.CurrentUser(id=7, org_id=3, role="owner", jti="j", expires_at=0)
+    monkeypatch.setattr(deps, "org_settings_cache", cache)
+
+    first = asyncio.run(deps.get_current_org(user))
+    assert (first.id, first.name, first.plan) == (3, "Org", "pro")
+
+    db.query(Organization).update({"plan": "enterprise"})
+    db.commit()
+    assert cache.peek(3) is first
+
+    clock[0] += 61
+    assert cache.peek(3) is None
+    assert asyncio.run(deps.get_current_org(user)).plan == "enterprise"
+
+    missing = auth.CurrentUser(id=8, org_id=99, role="owner", jti="k", expires_at=0)
+    with pytest.raises(HTTPException):
+        asyncio.run(deps.get_current_org(missing))
+
+
+def test_password_hash_round_trip():
+    async def scenario():
+        password_hash = await auth.hash_password("s3cret")
+        return (
+            password_hash,
+            await auth.verify_password(password_hash, "s3cret"),
+            await auth.verify_password(password_hash, "wrong"),
+            await auth.verify_password(None, "s3cret"),
+        )
+
+    password_hash, correct, wrong, missing_user = asyncio.run(scenario())
+    assert password_hash.startswith("$argon2id$")
+    assert (correct, wrong, missing_user) == (True, False, False)
+    assert not auth.needs_rehash(password_hash)
+
+
+def test_media_stream_token_names_its_org():
+    token = auth.create_media_stream_token(3)
+
+    assert auth.verify_media_stream_token(token) == 3
+    with pytest.raises(auth.TokenError):
+        auth.verify_media_stream_token(auth.create_token(7, 3, "owner", auth.ACCESS_TOKEN))
+    with pytest.raises(auth.TokenError):
+        auth.verify_media_stream_token(token + "x")
+
+
+def test_ops_endpoints_are_for_owners_and_admins():
+    from app.api import ops
+
+    technician = auth.CurrentUser(id=7, org_id=3, role="technician", jti="j", expires_at=0)
+    admin = auth.CurrentUser(id=8, org_id=3, role="admin", jti="k", expires_at=0)
+
+    assert [d.dependency for d in ops.org_router.dependencies] == [ops.require_operator]
+    with pytest.raises(HTTPException) as rejected:
+        asyncio.run(ops.require_operator(current_user=technician))
+    assert rejected.value.status_code == 403
+    assert asyncio.run(ops.require_operator(current_user=admin)) is admin
+
+
+def test_fleet_ops_endpoints_need_the_service_token(monkeypatch):
+    from app.api import ops
+
+    assert [d.dependency for d in ops.platform_router.dependencies] == [deps.require_ops_token]
+    owner = auth.create_token(7, 3, "owner", auth.ACCESS_TOKEN)
+
+    # Unset: nothing gets in
+    with pytest.raises(HTTPException):
+        asyncio.run(deps.require_ops_token(request_with("")))
+
+    monkeypatch.setattr(settings, "ops_service_token", "s3cret")
+    for token in (owner, "s3cre"):
+        with pytest.raises(HTTPException) as rejected:
+            asyncio.run(deps.require_ops_token(request_with(token)))
+        assert rejected.value.status_code == 401
+    asyncio.run(deps.require_ops_token(request_with("s3cret")))
@@ -0,0 +1,107 @@
+import gzip
+import json
+import zlib
+
+import brotli
+from sqlalchemy import create_engine
+from sqlalchemy.orm import selectinload, sessionmaker
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.compression import CompressionMiddleware, choose_encoding
+from app.models import Call, CallStatusEnum, Customer, Organization
+from app.serialization import call_serializer, stream_query
+
+ROWS = [{"id": i, "title": "תיקון מזגן בסלון"} for i in range(200)]
+
+
+def make_client():
+    def stream(request):
+        return StreamingResponse(
+            (json.dumps(row).encode() + b"\n" for row in ROWS), media_type="application/x-ndjson"
+        )
+
+    app = Starlette(
+        routes=[
+            Route("/large", lambda request: JSONResponse(ROWS)),
+            Route("/small", lambda request: JSONResponse({"ok": True})),
+            Route("/stream", stream),
+            Route("/events", lambda request: PlainTextResponse("x" * 5000, media_type="text/event-stream")),
+        ]
+    )
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+    return TestClient(app)
+
+
+def test_encoding_follows_client_preference():
+    assert choose_encoding("gzip, deflate, br") == "br"
+    assert choose_encoding("br;q=0.5, gzip") == "gzip"
+    assert choose_encoding("gzip;q=0, br;q=0") is None
+    assert choose_encoding("*") == "br"
+    assert choose_encoding("identity") is None
+
+
+def test_large_bodies_are_compressed_small_ones_are_not():
+    client = make_client()
+
+    br = client.get("/large", headers={"Accept-Encoding": "br"})
+    assert br.headers["content-encoding"] == "br"
+    assert "Accept-Encoding" in br.headers["vary"]
+    raw = client.get("/large", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in raw.headers
+
+    # The test client decodes gzip itself; brotli is checked on the raw bytes
+    with client.stream("GET", "/large", headers={"Accept-Encoding": "br"}) as response:
+        body = b"".join(response.iter_raw())
+    assert json.loads(brotli.decompress(body)) == ROWS
+    assert int(response.headers["content-length"]) == len(body) < len(raw.content)
+
+    small = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+    events = client.get("/events", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in events.headers
+
+
+def test_streamed_responses_are_compressed_chunk_by_chunk():
+    client = make_client()
+    with client.stream("GET", "/stream", headers={"Accept-Encoding": "gzip"}) as response:
+        chunks = list(response.iter_raw())
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    # Every chunk was flushed, so each prefix decodes on its own
+    decoder = zlib.decompressobj(31)
+    assert decoder.decompress(chunks[0]).startswith(b'{"id": 0')
+    lines = gzip.decompress(b"".join(chunks)).splitlines()
+    assert [json.loads(line) for line in lines] == ROWS
+
+
+def test_stream_query_writes_one_json_array_in_batches(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'export.db'}")
+    for model in (Organization, Customer, Call):
+        model.__table__.create(engine)
+    session_factory = sessionmaker(bind=engine)
+    db = session_factory()
+    db.add(Organization(id=1, name="Org"))
+    db.add(Customer(id=1, org_id=1, name="דנה"))
+    db.add_all(
+        Call(id=i, org_id=1, customer_id=1 if i % 2 else None, status=CallStatusEnum.COMPLETED)
+        for i in range(1, 8)
+    )
+    db.commit()
+
+    def calls_query(db):
+        return db.query(Call).options(selectinload(Call.customer)).order_by(Call.id)
+
+    chunks = list(stream_query(session_factory, calls_query, call_serializer, batch_size=3))
+    rows = json.loads(b"".join(chunks))
+
+    # "[", three batches of at most 3 rows, "]"
+    assert len(chunks) == 5
+    assert [row["id"] for row in rows] == list(range(1, 8))
+    assert rows[0]["customer"]["name"] == "דנה" and rows[1]["customer"] is None
+
+    empty = list(stream_query(session_factory, lambda db: calls_query(db).filter(Call.id > 99), call_serializer))
+    assert json.loads(b"".join(empty)) == []
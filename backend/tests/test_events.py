@@ -0,0 +1,73 @@
+import asyncio
+import json
+
+import fakeredis.aioredis
+import redis
+
+from app.services import events
+from app.services.events import CallStatusBroadcaster
+
+
+def test_status_messages_only_reach_subscribers_of_the_same_org():
+    async def scenario():
+        broadcaster = CallStatusBroadcaster()
+        # Skip the Redis listener - messages are dispatched directly
+        broadcaster._listener = asyncio.get_running_loop().create_future()
+        org_1 = broadcaster.subscribe(1)
+        org_2 = broadcaster.subscribe(2)
+
+        broadcaster.dispatch({"org_id": 1, "call_id": 7, "status": "transcribing"})
+
+        assert org_1.get_nowait()["call_id"] == 7
+        assert org_2.empty()
+
+        broadcaster.unsubscribe(1, org_1)
+        broadcaster.unsubscribe(2, org_2)
+        assert broadcaster._listener is None
+
+    asyncio.run(scenario())
+
+
+def test_listener_resubscribes_after_redis_fails(monkeypatch):
+    monkeypatch.setattr(events, "RESUBSCRIBE_INITIAL_SECONDS", 0.01)
+    server = fakeredis.FakeServer()
+    clients = []
+    closed = []
+
+    class DroppedPubSub:
+        async def psubscribe(self, pattern):
+            raise redis.ConnectionError("connection reset")
+
+        async def aclose(self):
+            closed.append("pubsub")
+
+    class DroppedRedis:
+        def pubsub(self):
+            return DroppedPubSub()
+
+        async def aclose(self):
+            closed.append("client")
+
+    def connect():
+        client = DroppedRedis() if not clients else fakeredis.aioredis.FakeRedis(server=server)
+        clients.append(client)
+        return client
+
+    async def scenario():
+        broadcaster = CallStatusBroadcaster(client_factory=connect)
+        queue = broadcaster.subscribe(1)
+        publisher = fakeredis.aioredis.FakeRedis(server=server)
+        message = {"org_id": 1, "call_id": 7, "status": "completed"}
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            await publisher.publish(events.status_channel(1), json.dumps(message))
+            if not queue.empty():
+                break
+        received = queue.get_nowait()
+        broadcaster.unsubscribe(1, queue)
+        return received
+
+    assert asyncio.run(scenario())["call_id"] == 7
+    assert len(clients) == 2
+    # The failed subscription gave its connection back
+    assert closed == ["pubsub", "client"]
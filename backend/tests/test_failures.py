@@ -0,0 +1,58 @@
+import fakeredis
+import pytest
+from app.services import failures
+from app.services.errors import PermanentServiceError, TransientServiceError
+
+
+def test_failures_are_counted_by_task_cause_and_outcome(monkeypatch):
+    client = fakeredis.FakeRedis()
+    monkeypatch.setattr(failures, "get_redis", lambda: client)
+
+    timeout = TransientServiceError("llm_timeout")
+    failures.record_failure("tasks.extract_info", timeout, will_retry=True)
+    failures.record_failure("tasks.extract_info", timeout, will_retry=True)
+    failures.record_failure("tasks.extract_info", timeout, will_retry=False)
+    failures.record_failure(
+        "tasks.transcribe_call", PermanentServiceError("audio_decode"), will_retry=False
+    )
+    failures.record_failure("tasks.transcribe_call", KeyError("x"), will_retry=False)
+
+    counts = failures.failure_counts(days=1)
+
+    assert counts[0] == {
+        "task": "tasks.extract_info",
+        "cause": "llm_timeout",
+        "outcome": "retry",
+        "count": 2,
+    }
+    assert {(c["cause"], c["outcome"]) for c in counts[1:]} == {
+        ("llm_timeout", "exhausted"),
+        ("audio_decode", "permanent"),
+        ("KeyError", "permanent"),
+    }
+
+
+def test_an_org_sees_only_its_own_failures(monkeypatch):
+    client = fakeredis.FakeRedis()
+    monkeypatch.setattr(failures, "get_redis", lambda: client)
+
+    failures.record_failure("tasks.extract_info", TransientServiceError("llm_timeout"), True, org_id=1)
+    failures.record_failure("tasks.extract_info", TransientServiceError("llm_timeout"), True, org_id=2)
+    failures.record_failure("tasks.transcribe_call", PermanentServiceError("audio_decode"), False, org_id=2)
+
+    assert failures.failure_counts(org_id=1) == [
+        {"task": "tasks.extract_info", "cause": "llm_timeout", "outcome": "retry", "count": 1}
+    ]
+    assert [c["count"] for c in failures.failure_counts()] == [2, 1]
+
+
+@pytest.mark.parametrize("error, will_retry, outcome", [
+    (TransientServiceError("s3_timeout"), True, "retry"),
+    # Out of retries: the call is marked FAILED
+    (TransientServiceError("s3_timeout"), False, "exhausted"),
+    (PermanentServiceError("audio_decode"), False, "permanent"),
+    # Unclassified errors are never retried
+    (KeyError("x"), False, "permanent"),
+])
+def test_failure_outcome(error, will_retry, outcome):
+    assert failures.failure_outcome(error, will_retry) == outcome
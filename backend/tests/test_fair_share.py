@@ -0,0 +1,113 @@
+from datetime import datetime
+
+import fakeredis
+
+from app.config import settings
+from app.models import Call, CallStatusEnum, Organization, OutboxMessage
+from app.services import fair_share
+
+NOW = 1_700_000_000.0
+
+
+def test_token_bucket_refills_at_plan_rate(monkeypatch):
+    monkeypatch.setattr(settings, "fair_share_tokens_per_minute", 60.0)
+    monkeypatch.setattr(settings, "fair_share_burst", 2.0)
+    monkeypatch.setattr(settings, "fair_share_max_concurrency", 100)
+    client = fakeredis.FakeRedis()
+
+    admitted = [
+        fair_share.acquire("extract", 1, "basic", client=client, now=NOW).admitted
+        for _ in range(3)
+    ]
+    assert admitted == [True, True, False]
+
+    # Another org has its own bucket
+    assert fair_share.acquire("extract", 2, "basic", client=client, now=NOW).admitted
+
+    # One token per second at weight 1; the enterprise bucket is four times larger
+    assert fair_share.acquire("extract", 1, "basic", client=client, now=NOW + 1).admitted
+    enterprise = [
+        fair_share.acquire("extract", 3, "enterprise", client=client, now=NOW).admitted
+        for _ in range(9)
+    ]
+    assert enterprise.count(True) == 8
+
+
+def test_concurrency_cap_until_lease_released(monkeypatch):
+    monkeypatch.setattr(settings, "fair_share_burst", 100.0)
+    monkeypatch.setattr(settings, "fair_share_max_concurrency", 1)
+    monkeypatch.setattr(settings, "fair_share_retry_seconds", 5.0)
+    client = fakeredis.FakeRedis()
+
+    first = fair_share.acquire("transcribe", 1, "basic", client=client, now=NOW)
+    second = fair_share.acquire("transcribe", 1, "basic", client=client, now=NOW)
+    assert first.admitted and not second.admitted
+    assert second.wait_seconds == 5.0
+
+    first.release(client)
+    assert fair_share.acquire("transcribe", 1, "basic", client=client, now=NOW).admitted
+
+    # A lease left behind by a dead worker expires
+    later = NOW + settings.fair_share_lease_seconds + 1
+    assert fair_share.acquire("transcribe", 1, "basic", client=client, now=later).admitted
+
+
+def test_queue_depths_per_org_and_stage(db):
+    now = datetime.utcnow()
+    db.add_all([Organization(id=1, name="Big"), Organization(id=2, name="Small")])
+    for org_id, status in [
+        (1, CallStatusEnum.PENDING_TRANSCRIPTION),
+        (1, CallStatusEnum.PENDING_TRANSCRIPTION),
+        (1, CallStatusEnum.EXTRACTING),
+        (2, CallStatusEnum.TRANSCRIBING),
+        (2, CallStatusEnum.COMPLETED),
+    ]:
+        db.add(Call(org_id=org_id, status=status, created_at=now))
+    db.commit()
+    client = fakeredis.FakeRedis()
+    fair_share.acquire("transcribe", 2, "basic", client=client)
+
+    depths = {
+        (d["org_id"], d["stage"]): (d["calls"], d["running"])
+        for d in fair_share.queue_depths(db, client=client, now=now)
+    }
+
+    assert depths == {
+        (1, "transcribe"): (2, 0),
+        (1, "extract"): (1, 0),
+        (2, "transcribe"): (1, 1),
+        (2, "extract"): (0, 0),
+    }
+
+    # One org sees only its own queues
+    assert {
+        (d["org_id"], d["stage"])
+        for d in fair_share.queue_depths(db, client=client, now=now, org_id=2)
+    } == {(2, "transcribe"), (2, "extract")}
+
+
+def test_deferred_calls_wait_in_the_database_until_their_org_has_room(db, monkeypatch):
+    monkeypatch.setattr(settings, "fair_share_max_concurrency", 2)
+    now = datetime.utcnow()
+    db.add(Organization(id=1, name="Big", plan="basic"))
+    calls = [
+        Call(org_id=1, status=CallStatusEnum.PENDING_TRANSCRIPTION, priority=priority, created_at=now)
+        for priority in (6, 3, 6)
+    ]
+    db.add_all(calls)
+    db.flush()
+    for call in calls:
+        fair_share.defer(call, now=now)
+    db.commit()
+    client = fakeredis.FakeRedis()
+    running = fair_share.acquire("transcribe", 1, "basic", client=client)
+
+    dispatched = fair_share.dispatch_deferred_calls(db, client=client, now=now)
+
+    # One of the org's two slots is taken; the most urgent call goes first
+    assert dispatched == [(1, "transcribe", [calls[1].id])]
+    assert [m.args for m in db.query(OutboxMessage)] == [[calls[1].id]]
+    assert calls[1].deferred_at is None and calls[0].deferred_at is not None
+
+    running.release(client=client)
+    assert fair_share.dispatch_deferred(db, "transcribe", 1, 1, now=now) == [calls[0].id]
@@ -0,0 +1,43 @@
+import asyncio
+import time
+
+from app.services.health import HealthChecker
+
+
+def test_probes_run_concurrently_with_timeouts_and_cached_results():
+    calls = []
+
+    def ok():
+        calls.append("ok")
+        time.sleep(0.2)
+
+    def hangs():
+        time.sleep(1.0)
+
+    def broken():
+        raise ConnectionError("refused")
+
+    checker = HealthChecker({"db": ok, "redis": hangs, "minio": broken}, ttl=60, timeout=0.5)
+
+    async def scenario():
+        started = time.perf_counter()
+        first, second = await asyncio.gather(checker.check(), checker.check())
+        return first, second, time.perf_counter() - started
+
+    first, second, elapsed = asyncio.run(scenario())
+
+    assert elapsed < 0.9
+    assert first is second and calls == ["ok"]
+    assert first["ready"] is False
+    assert first["checks"]["db"]["ok"] is True
+    assert first["checks"]["db"]["latency_ms"] >= 200
+    assert "timed out" in first["checks"]["redis"]["error"]
+    assert first["checks"]["minio"]["error"] == "ConnectionError: refused"
+
+
+def test_ready_when_every_probe_passes():
+    checker = HealthChecker({"db": lambda: None}, ttl=0, timeout=1)
+
+    result = asyncio.run(checker.check())
+
+    assert result["ready"] is True
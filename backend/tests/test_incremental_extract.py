@@ -0,0 +1,107 @@
+from datetime import date
+from app.schemas import ExtractionResult
+from app.services.field_extractors import extract_fields
+from app.services.incremental_extract import IncrementalExtractor
+
+
+class FakeLLM:
+    def __init__(self, result):
+        self.result = result
+        self.calls = []
+
+    def extract_information(self, transcript_text):
+        self.calls.append(transcript_text)
+        return self.result
+
+
+def test_field_extractors_on_hebrew_call():
+    text = (
+        "שלום, קוראים לי דני כהן, המזגן תדיראן לא מקרר, זה דחוף. "
+        "הטלפון שלי 050-123-4567. נבוא ביום חמישי בשלוש, המחיר 350 ש\"ח"
+    )
+
+    # 2025-08-31 is a Sunday
+    fields = extract_fields(text, reference_date=date(2025, 8, 31))
+
+    assert fields["customer"] == {"name": "דני כהן", "phone": "0501234567"}
+    assert fields["device"] == {
+        "category": "מזגן",
+        "brand": "Tadiran",
+        "urgency": "urgent",
+    }
+    assert fields["quote"]["agreed_price"] == 350.0
+    assert fields["appointment"] == {"date": "2025-09-04", "time": "15:00"}
+
+
+def test_segments_update_fields_and_llm_runs_only_on_new_information(monkeypatch):
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "incremental_llm_min_interval_seconds", 0)
+    llm = FakeLLM(
+        ExtractionResult(
+            device={"issue": "המזגן לא מקרר"},
+            free_text_summary_he="תקלה במזגן",
+            confidence=0.9,
+        )
+    )
+    extractor = IncrementalExtractor(llm=llm)
+
+    # A phone number split across two segments is still found
+    assert extractor.add_segment("המספר שלי 052") == []
+    assert extractor.add_segment("7654321 תודה") == ["customer.phone"]
+    assert extractor.needs_llm()
+
+    assert extractor.refresh_with_llm() == [
+        "device.issue",
+        "free_text_summary_he",
+        "confidence",
+    ]
+    assert len(llm.calls) == 1
+
+    # Nothing new - no second LLM call
+    extractor.add_segment("כן")
+    assert not extractor.needs_llm()
+
+    result = extractor.result
+    assert result.customer.phone == "0527654321"
+    assert result.device.issue == "המזגן לא מקרר"
+
+
+def test_mentioning_today_is_not_urgent():
+    assert "urgency" not in extract_fields("המזגן לא מקרר, אפשר לבוא היום?").get("device", {})
+    assert extract_fields("המזגן לא מקרר, צריך טכנאי עוד היום")["device"]["urgency"] == "high"
+
+
+def test_names_need_a_name_marker():
+    assert "customer" not in extract_fields("המזגן כאן לא מקרר בכלל")
+    assert "customer" not in extract_fields("אני מדבר עם הטכנאי")
+    assert "customer" not in extract_fields("שמי לא חשוב, המזגן לא עובד")
+    assert extract_fields("שלום, השם שלי רונית לוי")["customer"]["name"] == "רונית לוי"
+
+
+def test_tomorrow_is_a_whole_word():
+    sunday = date(2025, 8, 31)
+    assert "appointment" not in extract_fields("יש לי בעיה עם המחרטה", reference_date=sunday)
+    assert extract_fields("אפשר למחר בבוקר?", reference_date=sunday)["appointment"]["date"] == "2025-09-01"
+    assert extract_fields("ומחרתיים בשעה 10", reference_date=sunday)["appointment"] == {
+        "date": "2025-09-02",
+        "time": "10:00",
+    }
+
+
+def test_segments_arriving_during_an_llm_refresh_are_kept():
+    class SlowLLM(FakeLLM):
+        def extract_information(self, transcript_text):
+            # The live stream keeps adding segments while the LLM runs
+            extractor.add_segment("הטלפון שלי 0527654321")
+            return super().extract_information(transcript_text)
+
+    llm = SlowLLM(ExtractionResult(device={"issue": "המזגן לא מקרר"}, confidence=0.9))
+    extractor = IncrementalExtractor(llm=llm)
+    extractor.add_segment("המזגן לא מקרר")
+
+    extractor.refresh_with_llm()
+
+    assert llm.calls == ["המזגן לא מקרר"]
+    assert extractor.result.customer.phone == "0527654321"
+    assert extractor.result.device.issue == "המזגן לא מקרר"
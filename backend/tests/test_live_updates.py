@@ -0,0 +1,40 @@
+import asyncio
+
+import fakeredis.aioredis
+
+from app.services.live_updates import LiveUpdateHub
+
+
+def test_updates_reach_subscribers_on_another_instance():
+    server = fakeredis.FakeServer()
+
+    def connect():
+        return fakeredis.aioredis.FakeRedis(server=server)
+
+    async def scenario():
+        # Two API instances: the stream is held by one, the dashboard by the other
+        streaming, dashboard = (
+            LiveUpdateHub(client_factory=connect, redis_factory=connect) for _ in range(2)
+        )
+        queue = dashboard.subscribe(7)
+        for _ in range(100):
+            await streaming.publish(7, 3, "transcript", {"text": "המזגן לא מקרר"})
+            if not queue.empty():
+                break
+            await asyncio.sleep(0.01)
+        received = queue.get_nowait()
+        joined_late = await dashboard.latest(7)
+
+        await streaming.close(7, 3, {"transcript_id": 11})
+        while True:
+            closed = await asyncio.wait_for(queue.get(), 1)
+            if closed["type"] == "closed":
+                break
+        dashboard.unsubscribe(7, queue)
+        return received, joined_late, closed, await dashboard.latest(7)
+
+    received, joined_late, closed, after_close = asyncio.run(scenario())
+    assert received == {"type": "transcript", "call_id": 7, "text": "המזגן לא מקרר"}
+    assert joined_late == {"org_id": 3, "transcript": {"text": "המזגן לא מקרר"}}
+    assert closed["transcript_id"] == 11
+    assert after_close is None
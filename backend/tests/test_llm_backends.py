@@ -0,0 +1,83 @@
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+
+from app.config import settings
+from app.services import llm_prompt
+from app.services.extract import LLMService
+from app.services.llm_backends import (
+    LatencyModel,
+    RecordingChatClient,
+    RecordingMissing,
+    StubChatClient,
+)
+
+TRANSCRIPT = (
+    "שלום, קוראים לי דני כהן, המזגן תדיראן לא מקרר, זה דחוף. "
+    "הטלפון שלי 050-123-4567. נבוא ביום חמישי בשלוש, המחיר 350 ש\"ח"
+)
+
+
+@pytest.fixture(autouse=True)
+def offline_token_counts(monkeypatch):
+    monkeypatch.setattr(llm_prompt, "_encoding", lambda: None)
+
+
+def test_stub_backend_answers_extraction(monkeypatch):
+    monkeypatch.setattr(settings, "llm_backend", "stub")
+    service = LLMService()
+    # 2025-08-31 is a Sunday
+    service.client.reference_date = date(2025, 8, 31)
+
+    result = service.extract_information(TRANSCRIPT)
+
+    assert isinstance(service.client, StubChatClient)
+    assert result.customer.phone == "0501234567"
+    assert result.device.brand == "Tadiran"
+    assert result.quote.agreed_price == 350
+    assert result.appointment.date == "2025-09-04"
+    assert result.free_text_summary_he
+
+
+def test_stub_latency_and_usage():
+    client = StubChatClient(latency=LatencyModel(jitter=0), sleep=False)
+    messages = [{"role": "user", "content": f"טקסט:\n```{TRANSCRIPT}```"}]
+
+    response = client.chat.completions.create(model="m", messages=messages, max_tokens=500)
+
+    usage = response.usage
+    assert usage.prompt_tokens > 0 and usage.completion_tokens > 0
+    assert response.simulated_seconds == pytest.approx(
+        0.35 + usage.prompt_tokens * 0.0002 + usage.completion_tokens * 0.012
+    )
+
+
+def test_stub_truncates_at_max_tokens():
+    client = StubChatClient(sleep=False)
+    messages = [{"role": "user", "content": f"טקסט:\n```{TRANSCRIPT}```"}]
+
+    response = client.chat.completions.create(model="m", messages=messages, max_tokens=10)
+
+    assert response.usage.completion_tokens == 10
+    assert not response.choices[0].message.content.endswith("}")
+
+
+def test_recordings_are_replayed(tmp_path):
+    path = str(tmp_path / "recordings.json")
+    real = StubChatClient(latency=LatencyModel(jitter=0), sleep=False)
+    messages = [{"role": "user", "content": f"טקסט:\n```{TRANSCRIPT}```"}]
+
+    recorded = RecordingChatClient(path, client=real).chat.completions.create(
+        model="m", messages=messages, max_tokens=500
+    )
+    replayed = RecordingChatClient(path).chat.completions.create(
+        model="m", messages=messages, max_tokens=500
+    )
+
+    assert replayed.choices[0].message.content == recorded.choices[0].message.content
+    assert replayed.usage.completion_tokens == recorded.usage.completion_tokens
+    with pytest.raises(RecordingMissing):
+        RecordingChatClient(path).chat.completions.create(
+            model="m", messages=messages, max_tokens=400
+        )
@@ -0,0 +1,97 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.extract import LLMService
+from app.services.llm_output import parse_extraction, parse_json_object
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ('בטח! ```json\n{"a": 1, "b": [1, 2,],}\n```\nבהצלחה', {"a": 1, "b": [1, 2]}),
+        ("{'a': None, 'b': True, 'c': 'it\\'s'} ועוד טקסט", {"a": None, "b": True, "c": "it's"}),
+        ('{"a": "שורה\nשנייה", // הערה\n "b": 1e3}', {"a": "שורה\nשנייה", "b": 1000.0}),
+        ('{"url": "http://x//y", "n": -1.5}', {"url": "http://x//y", "n": -1.5}),
+        # Cut off by max_tokens
+        ('{"a": {"b": [1, {"c": "חתוך', {"a": {"b": [1, {"c": "חתוך"}]}}),
+        ('{"a": 1, "b":', {"a": 1}),
+    ],
+)
+def test_parse_json_object_repairs_common_errors(text, expected):
+    assert parse_json_object(text) == expected
+
+
+def test_parse_json_object_without_object():
+    with pytest.raises(ValueError):
+        parse_json_object("מצטער, לא מצאתי מידע")
+
+
+def test_invalid_section_is_dropped_and_reported():
+    parsed = parse_extraction(
+        '```json\n{"customer": {"name": "דנה"}, "quote": {"agreed_price": "450 ש\\"ח"},'
+        ' "confidence": 0.8,}\n```'
+    )
+
+    assert parsed.repaired
+    assert parsed.result.customer.name == "דנה"
+    assert parsed.result.quote is None
+    assert parsed.result.confidence == 0.8
+    assert list(parsed.invalid) == ["quote"]
+
+
+class FakeCompletions:
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.requests = []
+
+    def create(self, **kwargs):
+        self.requests.append(kwargs)
+        message = SimpleNamespace(content=self.replies.pop(0))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+
+def service_with_replies(*replies):
+    service = LLMService()
+    completions = FakeCompletions(replies)
+    service._client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return service, completions
+
+
+def test_clean_reply_needs_one_call():
+    service, completions = service_with_replies(
+        json.dumps({"customer": {"name": "דנה"}, "confidence": 0.9})
+    )
+
+    result = service.extract_information("שלום, קוראים לי דנה")
+
+    assert result.customer.name == "דנה"
+    assert len(completions.requests) == 1
+
+
+def test_reask_covers_only_invalid_sections():
+    service, completions = service_with_replies(
+        '{"customer": {"name": "דנה"}, "quote": {"agreed_price": "ארבע מאות"}, "confidence": 0.8}',
+        '```json\n{"quote": {"agreed_price": 400, "currency": "ILS"}}\n```',
+    )
+
+    result = service.extract_information("המחיר ארבע מאות שקל")
+
+    assert result.customer.name == "דנה"
+    assert result.quote.agreed_price == 400
+    assert result.confidence == 0.8
+    reask = completions.requests[1]
+    assert reask["max_tokens"] < completions.requests[0]["max_tokens"]
+    assert '"quote"' in reask["messages"][1]["content"]
+    assert '"customer"' not in reask["messages"][1]["content"]
+
+
+def test_unusable_replies_fall_back_to_empty_result():
+    service, completions = service_with_replies("אין לי תשובה", "גם עכשיו לא")
+
+    result = service.extract_information("...")
+
+    assert result.confidence == 0.0
+    assert result.free_text_summary_he.startswith("שגיאה בעיבוד")
+    assert len(completions.requests) == 2
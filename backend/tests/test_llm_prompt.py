@@ -0,0 +1,109 @@
+import json
+
+import pytest
+
+from app.config import settings
+from app.services import llm_prompt
+from app.services.llm_prompt import compact_transcript, extraction_prompts, split_transcript
+from tests.test_llm_output import service_with_replies
+
+
+@pytest.fixture(autouse=True)
+def offline_token_counts(monkeypatch):
+    monkeypatch.setattr(llm_prompt, "_encoding", lambda: None)
+
+
+def test_compaction_keeps_only_the_conversation():
+    text = (
+        "[מוזיקה] שיחה זו מוקלטת לצורך שיפור השירות. לשירות טכני הקישו 1. נא להמתין.\n"
+        "שלום. אממ, שלום, קוראים לי דנה כהן. המזגן לא מקרר. המזגן לא מקרר.\n"
+        "שלום. המחיר 450 שקל. תודה רבה. תודה רבה."
+    )
+
+    assert compact_transcript(text) == (
+        "שלום. שלום, קוראים לי דנה כהן. המזגן לא מקרר. המחיר 450 שקל. תודה רבה."
+    )
+
+
+@pytest.mark.parametrize("sentence", [
+    "המד מראה לחץ 1 בר והדוד לא מחמם.",
+    "הלוח מראה לחצי 2 נוריות.",
+    "אני צריך נציג יענה לי מהר כי המזגן דולף.",
+])
+def test_compaction_keeps_customer_sentences_that_look_like_ivr(sentence):
+    assert compact_transcript(sentence) == sentence
+
+
+def test_compaction_drops_ivr_only_at_the_ends_of_the_call():
+    text = (
+        "שיחתכם חשובה לנו. לשירות הקישו 2. "
+        "שלום. במוקד אמרו לי נא להמתין ואף אחד לא חזר. "
+        "תודה. להתראות. השיחה מוקלטת."
+    )
+
+    assert compact_transcript(text) == (
+        "שלום. במוקד אמרו לי נא להמתין ואף אחד לא חזר. תודה. להתראות."
+    )
+
+
+def test_compaction_keeps_a_repeated_confirmation():
+    text = (
+        "שלום. המזגן לא מקרר. טוב. אפשר ביום חמישי בשלוש? טוב. "
+        "שלום. עוד משהו? לא. תודה. להתראות."
+    )
+
+    assert compact_transcript(text) == (
+        "שלום. המזגן לא מקרר. טוב. אפשר ביום חמישי בשלוש? טוב. "
+        "עוד משהו? לא. תודה. להתראות."
+    )
+
+
+def test_split_transcript_on_sentence_boundaries():
+    text = " ".join(f"משפט מספר {i} בשיחה." for i in range(40))
+
+    chunks = split_transcript(text, max_tokens=50)
+
+    assert len(chunks) > 1
+    assert " ".join(chunks) == text
+    assert all(chunk.endswith(".") for chunk in chunks)
+    assert all(llm_prompt.count_tokens(chunk) <= 50 for chunk in chunks)
+
+
+def test_short_transcript_is_one_prompt_with_budgeted_reply():
+    prompts = extraction_prompts("שלום, קוראים לי דנה. המזגן לא מקרר.")
+
+    assert len(prompts) == 1
+    assert "דנה" in prompts[0].messages[1]["content"]
+    assert prompts[0].max_tokens < 1000
+
+
+def test_long_transcript_is_extracted_in_chunks_and_merged(monkeypatch):
+    monkeypatch.setattr(settings, "llm_chunk_tokens", 40)
+    text = (
+        "שלום, קוראים לי דנה כהן, המזגן תדיראן לא מקרר. "
+        "הוא מטפטף כבר שבוע ואני לא יודעת מה לעשות. "
+        "נקבע ליום חמישי בשלוש, המחיר 450 שקל."
+    )
+    chunks = len(extraction_prompts(text))
+    assert chunks >= 2
+
+    first = {"customer": {"name": "דנה כהן"}, "free_text_summary_he": "לקוחה עם מזגן", "confidence": 0.6}
+    last = {
+        "quote": {"agreed_price": 450},
+        "appointment": {"time": "15:00"},
+        "free_text_summary_he": "נקבע ביקור",
+        "confidence": 0.9,
+    }
+    middle = [json.dumps({"confidence": 0.5})] * (chunks - 2)
+    service, completions = service_with_replies(
+        json.dumps(first), *middle, json.dumps(last), "לקוחה עם מזגן שמטפטף, נקבע ביקור"
+    )
+
+    result = service.extract_information(text)
+
+    assert len(completions.requests) == chunks + 1  # one summary call
+    assert result.customer.name == "דנה כהן"
+    assert result.quote.agreed_price == 450
+    assert result.appointment.time == "15:00"
+    assert result.free_text_summary_he == "לקוחה עם מזגן שמטפטף, נקבע ביקור"
+    assert result.confidence == 0.9
@@ -0,0 +1,71 @@
+import io
+import json
+import logging
+
+from app import logging as app_logging
+from app.services.outbox import enqueue_task, TASK_EXTRACT_INFO
+
+
+def make_logger(name, *filters):
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(app_logging.JsonFormatter())
+    for log_filter in filters:
+        handler.addFilter(log_filter)
+    logger = logging.getLogger(name)
+    logger.handlers[:] = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    return logger, stream
+
+
+def lines(stream):
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_json_lines_carry_correlation_id_and_redact_pii():
+    logger, stream = make_logger(
+        "test.pii", app_logging.CorrelationFilter(), app_logging.RedactionFilter()
+    )
+    token = app_logging.set_correlation_id("abc123")
+    try:
+        logger.info(
+            "Call from %s (%s)",
+            "+972-50-123-4567",
+            "dana@example.com",
+            extra={"customer_name": "דנה כהן", "call_id": 7},
+        )
+    finally:
+        app_logging.reset_correlation_id(token)
+
+    (entry,) = lines(stream)
+    assert entry["correlation_id"] == "abc123"
+    assert entry["message"] == "Call from [REDACTED] ([REDACTED])"
+    assert entry["customer_name"] == "[REDACTED]"
+    assert entry["call_id"] == 7
+
+
+def test_sampling_applies_to_child_loggers_below_warning():
+    sampling = app_logging.SamplingFilter({"test.hot": 0.0})
+    logger, stream = make_logger("test.hot.path", sampling)
+
+    logger.info("dropped")
+    logger.warning("kept")
+
+    assert [entry["message"] for entry in lines(stream)] == ["kept"]
+    assert sampling.rate_for("test.cold") == 1.0
+
+
+def test_outbox_messages_carry_the_correlation_id():
+    token = app_logging.set_correlation_id("req-1")
+    try:
+        message = enqueue_task(_NoSession(), TASK_EXTRACT_INFO, 5, priority=3)
+    finally:
+        app_logging.reset_correlation_id(token)
+
+    assert message.options == {"priority": 3, "headers": {"correlation_id": "req-1"}}
+
+
+class _NoSession:
+    def add(self, obj):
+        pass
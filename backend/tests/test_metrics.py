@@ -0,0 +1,52 @@
+from datetime import datetime
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.metrics import CallStatusCollector, DbPoolCollector, render_metrics
+from app.models import Call, CallStatusEnum, Organization
+from app.services.transcribe import TranscriptionService
+from app.services.transcription_backends import FakeBackend
+
+
+def sample(body: bytes, line_prefix: str) -> float:
+    for line in body.decode().splitlines():
+        if line.startswith(line_prefix):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"{line_prefix} not exposed")
+
+
+def test_whisper_rtf_is_observed_per_model():
+    service = TranscriptionService(backend=FakeBackend(duration_seconds=4.0))
+    service.transcribe_from_file("call.mp3")
+
+    count = sample(
+        render_metrics(),
+        'smartagent_whisper_real_time_factor_count{backend="fake",model="tiny"}',
+    )
+    assert count >= 1
+
+
+def test_scrape_time_collectors_report_pool_and_call_statuses(tmp_path):
+    # A file database gets a QueuePool, like Postgres
+    engine = create_engine(f"sqlite:///{tmp_path / 'metrics.db'}")
+    for model in (Organization, Call):
+        model.__table__.create(engine)
+    Session = sessionmaker(bind=engine)
+    db = Session()
+    db.add(Organization(id=1, name="Org"))
+    db.add_all(
+        [
+            Call(org_id=1, status=CallStatusEnum.COMPLETED, created_at=datetime.utcnow()),
+            Call(org_id=1, status=CallStatusEnum.COMPLETED, created_at=datetime.utcnow()),
+            Call(org_id=1, status=CallStatusEnum.FAILED, created_at=datetime.utcnow()),
+        ]
+    )
+    db.commit()
+    db.close()
+
+    body = render_metrics(DbPoolCollector(engine), CallStatusCollector(Session))
+
+    assert sample(body, 'smartagent_calls{status="completed"}') == 2
+    assert sample(body, 'smartagent_calls{status="failed"}') == 1
+    assert sample(body, 'smartagent_db_pool_connections{state="checked_out"}') == 0
@@ -0,0 +1,47 @@
+from contextlib import contextmanager
+from app.models import OutboxMessage
+from app.services.outbox import enqueue_task, relay_batch, TASK_TRANSCRIBE_CALL
+
+
+class FakeCelery:
+    def __init__(self, fail_on=()):
+        self.sent = []
+        self.fail_on = fail_on
+
+    @contextmanager
+    def producer_or_acquire(self):
+        yield "producer"
+
+    def send_task(self, name, args=None, producer=None, **options):
+        if args and args[0] in self.fail_on:
+            raise ConnectionError("broker down")
+        self.sent.append((name, args, options))
+
+
+def test_messages_are_only_relayed_after_commit(db):
+    celery = FakeCelery()
+
+    enqueue_task(db, TASK_TRANSCRIBE_CALL, 1)
+    db.rollback()
+    assert relay_batch(db, celery) == 0
+
+    enqueue_task(db, TASK_TRANSCRIBE_CALL, 2, priority=5)
+    db.commit()
+    assert relay_batch(db, celery) == 1
+    assert celery.sent == [(TASK_TRANSCRIBE_CALL, [2], {"priority": 5})]
+
+    # Already published - nothing left to send
+    assert relay_batch(db, celery) == 0
+
+
+def test_failed_publish_stays_pending(db):
+    enqueue_task(db, TASK_TRANSCRIBE_CALL, 1)
+    enqueue_task(db, TASK_TRANSCRIBE_CALL, 2)
+    db.commit()
+
+    assert relay_batch(db, FakeCelery(fail_on=(1,))) == 1
+
+    pending = db.query(OutboxMessage).filter(OutboxMessage.published_at.is_(None)).one()
+    assert pending.args == [1]
+    assert pending.attempts == 1
+    assert "broker down" in pending.last_error
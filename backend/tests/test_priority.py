@@ -0,0 +1,126 @@
+from datetime import datetime, timedelta
+
+import fakeredis
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.models import (
+    Call,
+    CallStatusEnum,
+    Customer,
+    Job,
+    JobStatusEnum,
+    Organization,
+    OutboxMessage,
+)
+from app.services import priority
+from app.services.outbox import TASK_TRANSCRIBE_CALL
+
+NOW = datetime(2025, 9, 1, 12, 0)
+
+
+@pytest.fixture
+def db(db):
+    db.add(Organization(id=1, name="Org"))
+    db.commit()
+    return db
+
+
+def test_call_priority_from_cached_customer_flags(db, monkeypatch):
+    client = fakeredis.FakeRedis()
+    monkeypatch.setattr(priority, "get_redis", lambda: client)
+    vip = Customer(org_id=1, name="VIP", phone="0501111111", vip_status=True)
+    regular = Customer(org_id=1, name="Regular", phone="0502222222")
+    db.add_all([vip, regular])
+    db.commit()
+    db.add(
+        Job(
+            org_id=1,
+            customer_id=regular.id,
+            priority="urgent",
+            status=JobStatusEnum.SCHEDULED,
+        )
+    )
+    db.commit()
+
+    assert priority.call_priority(db, 1, "+972-50-111-1111") == priority.PRIORITY_HIGH
+    assert priority.call_priority(db, 1, "0502222222") == priority.PRIORITY_EMERGENCY
+    assert priority.call_priority(db, 1, "0503333333") == priority.PRIORITY_NORMAL
+
+    # Served from the cache until invalidated
+    db.query(Customer).filter(Customer.id == vip.id).update({"vip_status": False})
+    db.commit()
+    assert priority.call_priority(db, 1, "0501111111") == priority.PRIORITY_HIGH
+    priority.invalidate_customer_flags(1, "0501111111")
+    assert priority.call_priority(db, 1, "0501111111") == priority.PRIORITY_NORMAL
+
+
+@pytest.fixture
+def flag_hooks():
+    priority.install_flag_invalidation_hooks()
+    yield
+    event.remove(Session, "after_flush", priority._collect_flag_changes)
+    event.remove(Session, "after_commit", priority._invalidate_changed_flags)
+    event.remove(Session, "after_rollback", priority._discard_flag_changes)
+
+
+def test_customer_and_job_writes_invalidate_cached_flags(db, flag_hooks, monkeypatch):
+    client = fakeredis.FakeRedis()
+    monkeypatch.setattr(priority, "get_redis", lambda: client)
+    customer = Customer(org_id=1, name="Dana", phone="0501111111")
+    db.add(customer)
+    db.commit()
+    assert priority.call_priority(db, 1, "0501111111") == priority.PRIORITY_NORMAL
+
+    customer.vip_status = True
+    db.commit()
+    assert priority.call_priority(db, 1, "0501111111") == priority.PRIORITY_HIGH
+
+    job = Job(org_id=1, customer_id=customer.id, priority="urgent", status=JobStatusEnum.SCHEDULED)
+    db.add(job)
+    db.commit()
+    assert priority.call_priority(db, 1, "0501111111") == priority.PRIORITY_EMERGENCY
+
+    job.status = JobStatusEnum.COMPLETED
+    db.commit()
+    assert priority.call_priority(db, 1, "0501111111") == priority.PRIORITY_HIGH
+
+    # A rolled-back change leaves the cache alone
+    customer.vip_status = False
+    db.flush()
+    db.rollback()
+    assert client.exists(priority._cache_key(1, "0501111111"))
+
+
+def test_emergency_in_transcript_raises_extraction_priority():
+    assert priority.extraction_priority(6, "דחוף, אין מים חמים בבית") == priority.PRIORITY_EMERGENCY
+    assert priority.extraction_priority(3, "רציתי לקבוע טכנאי למזגן") == 3
+
+
+def test_waiting_calls_are_promoted_one_level(db):
+    old = NOW - timedelta(minutes=10)
+    waiting = Call(
+        org_id=1,
+        status=CallStatusEnum.PENDING_TRANSCRIPTION,
+        priority=priority.PRIORITY_NORMAL,
+        created_at=old,
+        updated_at=old,
+    )
+    fresh = Call(
+        org_id=1,
+        status=CallStatusEnum.PENDING_TRANSCRIPTION,
+        priority=priority.PRIORITY_NORMAL,
+        created_at=NOW,
+        updated_at=NOW,
+    )
+    db.add_all([waiting, fresh])
+    db.commit()
+
+    promoted = priority.promote_waiting_calls(db, now=NOW)
+
+    assert promoted == [(waiting.id, priority.PRIORITY_HIGH)]
+    assert fresh.priority == priority.PRIORITY_NORMAL
+    message = db.query(OutboxMessage).one()
+    assert message.task_name == TASK_TRANSCRIBE_CALL
+    assert message.options == {"priority": priority.PRIORITY_HIGH}
@@ -0,0 +1,85 @@
+import time
+from datetime import datetime, timedelta
+
+import fakeredis
+from prometheus_client import CollectorRegistry, generate_latest
+
+from app.config import settings
+from app.models import Call, CallStatusEnum, Organization
+from app.services import queue_metrics
+
+
+def test_recommended_workers_follows_littles_law(monkeypatch):
+    monkeypatch.setattr(settings, "autoscale_target_utilization", 0.5)
+    monkeypatch.setattr(settings, "autoscale_drain_seconds", 600.0)
+    monkeypatch.setattr(settings, "autoscale_min_workers", 1)
+    monkeypatch.setattr(settings, "autoscale_max_workers", 20)
+
+    # 0.1 calls/s * 30 s = 3 in service, / 0.5 utilization = 6 workers
+    assert queue_metrics.recommended_workers(0.1, 30.0, 0, concurrency=1) == 6
+    # Draining 200 queued calls in 10 minutes needs 10 more
+    assert queue_metrics.recommended_workers(0.1, 30.0, 200, concurrency=1) == 16
+    assert queue_metrics.recommended_workers(0.1, 30.0, 200, concurrency=4) == 4
+    assert queue_metrics.recommended_workers(10.0, 30.0, 0, concurrency=1) == 20
+    # Nothing measured yet
+    assert queue_metrics.recommended_workers(0.0, 0.0, 5, concurrency=1) == 1
+
+
+def test_snapshot_combines_broker_counters_and_calls(db, monkeypatch):
+    monkeypatch.setattr(settings, "autoscale_window_minutes", 1)
+    client = fakeredis.FakeRedis()
+    monkeypatch.setattr(queue_metrics, "get_redis", lambda: client)
+
+    now = datetime.utcnow()
+    db.add(Organization(id=1, name="Org"))
+    waiting = dict(org_id=1, status=CallStatusEnum.PENDING_TRANSCRIPTION)
+    db.add_all(
+        [
+            # Requeued a minute and a half ago; updated_at moves on every touch
+            Call(
+                **waiting,
+                created_at=now - timedelta(minutes=10),
+                queued_at=now - timedelta(seconds=90),
+                updated_at=now,
+            ),
+            # Already picked up by a worker
+            Call(
+                **waiting,
+                created_at=now - timedelta(minutes=20),
+                queued_at=now - timedelta(minutes=20),
+                claimed_at=now - timedelta(minutes=1),
+            ),
+            # Beyond the lookback, left to the reaper
+            Call(
+                **waiting,
+                created_at=now - timedelta(hours=settings.call_reaper_lookback_hours + 1),
+                queued_at=now - timedelta(hours=settings.call_reaper_lookback_hours + 1),
+            ),
+        ]
+    )
+    db.commit()
+
+    client.rpush("transcription", "m1")
+    client.rpush("transcription:6", "m2", "m3")
+    for _ in range(6):
+        queue_metrics.record_arrival("transcribe")
+    queue_metrics.record_service_time("transcribe", 20.0)
+    queue_metrics.record_service_time("transcribe", 40.0)
+
+    # Read a minute later, when those counters form a complete minute
+    recorded_at = time.time()
+    monkeypatch.setattr(queue_metrics.time, "time", lambda: recorded_at + 60)
+    stages = {s["stage"]: s for s in queue_metrics.autoscaling_snapshot(db, client=client, now=now)}
+
+    transcribe = stages["transcribe"]
+    assert transcribe["queue_depth"] == 3
+    assert transcribe["calls_waiting"] == 1
+    assert 89 <= transcribe["oldest_waiting_seconds"] <= 91
+    assert transcribe["arrival_rate"] == 0.1
+    assert transcribe["service_time"] == 30.0
+    assert stages["extract"]["queue_depth"] == 0
+
+    registry = CollectorRegistry()
+    registry.register(queue_metrics.SnapshotCollector(list(stages.values())))
+    exposition = generate_latest(registry).decode()
+    assert 'smartagent_stage_queue_depth{queue="transcription",stage="transcribe"} 3.0' in exposition
@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta
+import pytest
+from app.models import Call, CallStatusEnum, Organization, OutboxMessage, Transcript
+from app.services.outbox import TASK_EXTRACT_INFO, TASK_TRANSCRIBE_CALL
+from app.services.reaper import reap_stuck_calls
+
+NOW = datetime(2025, 9, 1, 12, 0)
+
+
+@pytest.fixture
+def db(db):
+    db.add(Organization(id=1, name="Org"))
+    db.commit()
+    return db
+
+
+def add_call(db, status, minutes_ago, **fields):
+    at = NOW - timedelta(minutes=minutes_ago)
+    call = Call(org_id=1, status=status, created_at=at, updated_at=at, queued_at=at, **fields)
+    db.add(call)
+    db.commit()
+    return call
+
+
+def test_stuck_calls_resume_from_last_completed_stage(db):
+    hour_ago = NOW - timedelta(minutes=60)
+    stuck_transcribing = add_call(db, CallStatusEnum.TRANSCRIBING, 60, claimed_at=hour_ago)
+    stuck_extracting = add_call(db, CallStatusEnum.EXTRACTING, 60, claimed_at=hour_ago)
+    db.add(Transcript(org_id=1, call_id=stuck_extracting.id, text="שלום"))
+    fresh = add_call(db, CallStatusEnum.TRANSCRIBING, 5, claimed_at=NOW - timedelta(minutes=5))
+    db.commit()
+
+    resumed = reap_stuck_calls(db, now=NOW)
+
+    assert {call_id for _, call_id, _ in resumed} == {
+        stuck_transcribing.id,
+        stuck_extracting.id,
+    }
+    assert stuck_transcribing.status == CallStatusEnum.PENDING_TRANSCRIPTION
+    assert stuck_extracting.status == CallStatusEnum.EXTRACTING
+    assert fresh.recovery_attempts in (None, 0)
+    assert sorted(m.task_name for m in db.query(OutboxMessage)) == [
+        TASK_EXTRACT_INFO,
+        TASK_TRANSCRIBE_CALL,
+    ]
+
+
+def test_calls_go_to_dead_letter_after_max_attempts(db):
+    call = add_call(
+        db, CallStatusEnum.TRANSCRIBING, 60, recovery_attempts=3, claimed_at=NOW - timedelta(hours=1)
+    )
+
+    reap_stuck_calls(db, now=NOW)
+
+    assert call.status == CallStatusEnum.DEAD_LETTER
+    assert db.query(OutboxMessage).count() == 0
+
+
+def test_calls_waiting_in_a_backlog_are_left_alone(db):
+    # Queued two hours ago, or parked by fair share for a day
+    backlogged = add_call(db, CallStatusEnum.PENDING_TRANSCRIPTION, 120, recovery_attempts=3)
+    add_call(db, CallStatusEnum.PENDING_TRANSCRIPTION, 24 * 60, deferred_at=NOW - timedelta(days=1))
+    # Transcribed long ago, extraction not started yet
+    waiting_extraction = add_call(db, CallStatusEnum.EXTRACTING, 120)
+    db.commit()
+
+    assert reap_stuck_calls(db, now=NOW) == []
+    assert backlogged.status == CallStatusEnum.PENDING_TRANSCRIPTION
+    assert waiting_extraction.status == CallStatusEnum.EXTRACTING
+
+
+def test_lost_messages_are_requeued_without_counting_an_attempt(db):
+    lost = add_call(db, CallStatusEnum.PENDING_TRANSCRIPTION, 7 * 60, recovery_attempts=3)
+
+    resumed = reap_stuck_calls(db, now=NOW)
+
+    assert resumed == [(1, lost.id, CallStatusEnum.PENDING_TRANSCRIPTION)]
+    assert lost.recovery_attempts == 3
+    assert lost.queued_at == NOW
+    assert [m.task_name for m in db.query(OutboxMessage)] == [TASK_TRANSCRIBE_CALL]
+
+
+def test_calls_whose_message_is_not_published_yet_are_not_lost(db):
+    call = add_call(db, CallStatusEnum.PENDING_TRANSCRIPTION, 7 * 60)
+    # The relay has been down since before the call was queued
+    db.add(OutboxMessage(task_name=TASK_TRANSCRIBE_CALL, args=[call.id],
+                         created_at=NOW - timedelta(hours=8)))
+    db.commit()
+
+    assert reap_stuck_calls(db, now=NOW) == []
@@ -0,0 +1,109 @@
+import asyncio
+
+import fakeredis
+import fakeredis.aioredis
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from starlette.requests import Request
+
+from app.models import Call, CallStatusEnum, Organization
+from app.serialization import call_serializer
+from app.services import response_cache
+from app.services.response_cache import ResponseCache
+
+
+@pytest.fixture
+def hooks(monkeypatch):
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(response_cache, "get_redis", lambda: fakeredis.FakeRedis(server=server))
+    client = fakeredis.aioredis.FakeRedis(server=server)
+    monkeypatch.setattr(response_cache, "get_async_redis", lambda: client)
+    response_cache.install_invalidation_hooks()
+    yield
+    event.remove(Session, "after_flush", response_cache._collect_changes)
+    event.remove(Session, "after_commit", response_cache._publish_changes)
+    event.remove(Session, "after_rollback", response_cache._discard_changes)
+
+
+@pytest.fixture
+def db(hooks, db):
+    db.add(Organization(id=1, name="Org"))
+    db.add(Call(id=5, org_id=1, status=CallStatusEnum.PENDING_TRANSCRIPTION))
+    db.commit()
+    return db
+
+
+def get(path, etag=None):
+    headers = [(b"if-none-match", etag.encode())] if etag else []
+    return Request({"type": "http", "path": path, "query_string": b"", "headers": headers})
+
+
+def test_polling_is_answered_from_redis_until_the_row_changes(db):
+    cache = ResponseCache(ttl=60)
+    queries = []
+
+    def load_call():
+        queries.append(1)
+        call = db.query(Call).filter(Call.id == 5).first()
+        if not call:
+            raise HTTPException(status_code=404)
+        return call_serializer.one(call)
+
+    def respond(etag=None):
+        return asyncio.run(cache.respond(get("/calls/5", etag), 1, ("calls", "customers"), load_call))
+
+    first = respond()
+    etag = first.headers["etag"]
+    assert first.status_code == 200 and b"pending_transcription" in first.body
+
+    assert respond(etag).status_code == 304
+    cached = respond()
+    assert cached.body == first.body and cached.headers["etag"] == etag
+    assert len(queries) == 1
+
+    db.query(Call).filter(Call.id == 5).first().status = CallStatusEnum.COMPLETED
+    db.commit()
+
+    changed = respond(etag)
+    assert changed.status_code == 200 and b"completed" in changed.body
+    assert changed.headers["etag"] != etag
+    assert len(queries) == 2
+
+
+def test_other_orgs_and_rolled_back_writes_keep_the_etag(db):
+    cache = ResponseCache(ttl=60)
+
+    def respond(etag=None):
+        return asyncio.run(
+            cache.respond(get("/calls/5", etag), 1, ("calls",), lambda: {"id": 5})
+        )
+
+    etag = respond().headers["etag"]
+
+    db.add(Organization(id=2, name="Other"))
+    db.add(Call(org_id=2, status=CallStatusEnum.PENDING_TRANSCRIPTION))
+    db.commit()
+    db.add(Call(org_id=1, status=CallStatusEnum.PENDING_TRANSCRIPTION))
+    db.flush()
+    db.rollback()
+
+    assert respond(etag).status_code == 304
+
+    response_cache.mark_changed(db, 1, "calls")
+    db.commit()
+    assert respond(etag).status_code == 200
+
+
+def test_errors_are_not_cached(hooks):
+    cache = ResponseCache(ttl=60)
+
+    def missing():
+        raise HTTPException(status_code=404, detail="Call not found")
+
+    with pytest.raises(HTTPException):
+        asyncio.run(cache.respond(get("/calls/6"), 1, ("calls",), missing))
+
+    response = asyncio.run(cache.respond(get("/calls/6"), 1, ("calls",), lambda: {"id": 6}))
+    assert response.status_code == 200
@@ -0,0 +1,44 @@
+import json
+
+import pytest
+from pydantic import ValidationError
+
+from app.config import Settings
+from app.schemas import CallWebhook, call_webhook_adapter, extraction_result_adapter
+
+WEBHOOK = {
+    "recordingUrl": "https://api.twilio.com/recordings/RE1",
+    "callSid": "CA1",
+    "from": "+972501234567",
+    "to": "+97235551234",
+    "startTime": "2025-09-01T09:00:00Z",
+    "duration": 95,
+}
+
+
+def test_webhook_reads_from_alias():
+    webhook = call_webhook_adapter.validate_json(json.dumps(WEBHOOK).encode())
+    assert webhook.from_ == "+972501234567"
+    # Code that builds the model by hand can use the field name
+    by_name = {key: value for key, value in WEBHOOK.items() if key != "from"}
+    assert CallWebhook(**by_name, from_="+972500000000").from_ == "+972500000000"
+    assert CallWebhook.model_json_schema(by_alias=True)["properties"].keys() >= {"from"}
+
+
+def test_webhook_rejects_bad_payload():
+    with pytest.raises(ValidationError):
+        call_webhook_adapter.validate_json(b'{"callSid": "CA1", "duration": "long"}')
+
+
+def test_extraction_result_from_json_bytes():
+    result = extraction_result_adapter.validate_json(
+        json.dumps({"free_text_summary_he": "ביקור ביום חמישי", "confidence": 0.8}, ensure_ascii=False).encode()
+    )
+    assert result.free_text_summary_he == "ביקור ביום חמישי"
+    assert result.customer is None
+
+
+def test_settings_ignore_unknown_env(monkeypatch):
+    monkeypatch.setenv("SOME_UNRELATED_SETTING", "x")
+    monkeypatch.setenv("RESPONSE_CACHE_SECONDS", "42")
+    assert Settings().response_cache_seconds == 42
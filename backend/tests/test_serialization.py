@@ -0,0 +1,47 @@
+import json
+from datetime import datetime
+from decimal import Decimal
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.models import Call, CallStatusEnum, Customer, Job, JobStatusEnum
+from app.schemas import CallResponse, JobResponse
+from app.serialization import call_serializer, dumps, job_serializer
+
+
+def pydantic_path(schema, rows):
+    """What FastAPI returns for a response_model"""
+    adapter = TypeAdapter(List[schema])
+    return jsonable_encoder(adapter.dump_python(adapter.validate_python(rows), mode="json"))
+
+
+def test_fast_path_matches_pydantic_output():
+    customer = Customer(id=3, name="דנה", phone="0501234567", created_at=datetime(2025, 9, 1, 8, 30))
+    calls = [
+        Call(
+            id=1,
+            call_sid="CA1",
+            from_number="0501234567",
+            status=CallStatusEnum.COMPLETED,
+            duration_seconds=95,
+            created_at=datetime(2025, 9, 1, 9, 0, 0, 123456),
+            customer=customer,
+        ),
+        Call(id=2, status=CallStatusEnum.PENDING_TRANSCRIPTION, created_at=datetime(2025, 9, 1, 9, 5)),
+    ]
+    jobs = [
+        Job(
+            id=4,
+            title="תיקון מזגן",
+            status=JobStatusEnum.SCHEDULED,
+            agreed_price=Decimal("450.50"),
+            currency="ILS",
+            created_at=datetime(2025, 9, 1, 10, 0),
+            customer=customer,
+        )
+    ]
+
+    assert json.loads(dumps(call_serializer.many(calls))) == pydantic_path(CallResponse, calls)
+    assert json.loads(dumps(job_serializer.many(jobs))) == pydantic_path(JobResponse, jobs)
@@ -0,0 +1,151 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.api import auth as auth_api
+from app.config import settings
+from app.models import Organization, RoleEnum, User
+from app.services import auth, sessions
+from app.services.sessions import RefreshConflict, RefreshTokenStore, SessionError
+
+
+@pytest.fixture
+def store(monkeypatch):
+    monkeypatch.setattr(settings, "session_store_backend", "fake")
+    monkeypatch.setattr(sessions, "_fake_client", None)
+    return RefreshTokenStore(ttl_seconds=3600, reuse_grace_seconds=10)
+
+
+def test_rotation_issues_new_pair_and_extends_the_session(store):
+    async def scenario():
+        first = await store.open(7, 3, "technician", "tablet")
+        second = await store.rotate(first["refresh_token"])
+        ttl = await store.client.ttl("refresh-session:7:tablet")
+        return first, second, ttl
+
+    first, second, ttl = asyncio.run(scenario())
+    claims = auth.decode_token(second["access_token"])
+    assert (claims["sub"], claims["org"], claims["role"], claims["sid"]) == ("7", 3, "technician", "tablet")
+    assert second["refresh_token"] != first["refresh_token"]
+    assert ttl == 3600
+
+
+def test_reuse_of_an_old_refresh_token_ends_the_session(store):
+    async def scenario(now):
+        first = await store.open(7, 3, "technician", "tablet")
+        second = await store.rotate(first["refresh_token"], now=now)
+        with pytest.raises(SessionError):
+            await store.rotate(first["refresh_token"], now=now + 60)
+        # The legitimate holder is logged out too
+        with pytest.raises(SessionError):
+            await store.rotate(second["refresh_token"], now=now + 61)
+
+    asyncio.run(scenario(1_700_000_000.0))
+
+
+def test_concurrent_refresh_within_grace_keeps_the_session(store):
+    async def scenario(now):
+        first = await store.open(7, 3, "technician", "tablet")
+        second = await store.rotate(first["refresh_token"], now=now)
+        with pytest.raises(RefreshConflict):
+            await store.rotate(first["refresh_token"], now=now + 2)
+        return await store.rotate(second["refresh_token"], now=now + 3)
+
+    assert asyncio.run(scenario(1_700_000_000.0))["refresh_token"]
+
+
+def test_bulk_revocation_by_user_and_org(store):
+    async def scenario():
+        tablet = await store.open(7, 3, "technician", "tablet")
+        phone = await store.open(7, 3, "technician", "phone")
+        other = await store.open(8, 3, "admin", "laptop")
+        elsewhere = await store.open(9, 4, "owner", "laptop")
+
+        listed = {session["device_id"] for session in await store.list_sessions(7)}
+        revoked_user = await store.revoke_user(7)
+        for pair in (tablet, phone):
+            with pytest.raises(SessionError):
+                await store.rotate(pair["refresh_token"])
+        other = await store.rotate(other["refresh_token"])
+
+        revoked_org = await store.revoke_org(3)
+        with pytest.raises(SessionError):
+            await store.rotate(other["refresh_token"])
+        await store.rotate(elsewhere["refresh_token"])
+        return listed, revoked_user, revoked_org
+
+    listed, revoked_user, revoked_org = asyncio.run(scenario())
+    assert listed == {"tablet", "phone"}
+    assert revoked_user == 2
+    # Org 3's set still lists user 7's sessions, which are already gone
+    assert revoked_org == 1
+
+
+def test_logging_in_again_on_a_device_replaces_its_session(store):
+    async def scenario():
+        old = await store.open(7, 3, "technician", "tablet")
+        await store.open(7, 3, "technician", "tablet")
+        with pytest.raises(SessionError):
+            await store.rotate(old["refresh_token"])
+        ended = await store.end(7, "tablet")
+        return ended, await store.list_sessions(7)
+
+    assert asyncio.run(scenario()) == (True, [])
+
+
+def test_refresh_rereads_the_user(store, db, monkeypatch):
+    monkeypatch.setattr(auth_api, "refresh_token_store", store)
+    db.add(Organization(id=3, name="Org"))
+    user = User(id=7, org_id=3, email="a@b.c", password_hash="x", role=RoleEnum.ADMIN)
+    db.add(user)
+    db.commit()
+
+    async def scenario():
+        first = await store.open(7, 3, "admin", "tablet")
+        # Demoted: the next access token carries the new role
+        user.role = RoleEnum.TECHNICIAN
+        db.commit()
+        second = await auth_api.refresh_token(
+            auth_api.RefreshRequest(refresh_token=first["refresh_token"]), db=db
+        )
+        # Deactivated: refreshing fails and every session ends
+        user.is_active = False
+        db.commit()
+        with pytest.raises(HTTPException) as rejected:
+            await auth_api.refresh_token(
+                auth_api.RefreshRequest(refresh_token=second["refresh_token"]), db=db
+            )
+        return second, rejected.value, await store.list_sessions(7)
+
+    second, rejected, open_sessions = asyncio.run(scenario())
+    assert auth.decode_token(second["access_token"])["role"] == "technician"
+    assert rejected.status_code == 401
+    assert open_sessions == []
+
+
+def test_register_then_log_in(store, db, monkeypatch):
+    monkeypatch.setattr(auth_api, "refresh_token_store", store)
+
+    async def scenario():
+        registered = await auth_api.register(
+            auth_api.UserRegister(
+                email="dana@example.com", password="pw-1234", full_name="Dana", org_name="Cool Air"
+            ),
+            db=db,
+        )
+        logged_in = await auth_api.login(
+            auth_api.UserLogin(email="dana@example.com", password="pw-1234", device_id="phone"),
+            db=db,
+        )
+        with pytest.raises(HTTPException) as rejected:
+            await auth_api.login(
+                auth_api.UserLogin(email="dana@example.com", password="wrong"), db=db
+            )
+        return registered, logged_in, rejected.value
+
+    registered, logged_in, rejected = asyncio.run(scenario())
+    claims = auth.decode_token(logged_in["access_token"])
+    assert claims["role"] == "owner"
+    assert claims["org"] == auth.decode_token(registered["access_token"])["org"]
+    assert rejected.status_code == 401
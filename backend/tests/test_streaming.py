@@ -0,0 +1,153 @@
+import asyncio
+import json
+import math
+import numpy as np
+import pytest
+from sqlalchemy.orm import sessionmaker
+from app import deps
+from app.api import calls
+from app.models import Call, CallStatusEnum, Organization
+from app.services import auth
+from app.services import streaming
+from app.services.incremental_extract import IncrementalExtractor
+from app.services.transcribe import TranscriptionService
+from app.services.transcription_backends import SAMPLE_RATE, FakeBackend
+
+
+class OneWordPerSecondBackend(FakeBackend):
+    """Returns one segment per second of audio it is given"""
+
+    def transcribe(self, model, audio, language=None):
+        self.calls.append((model, len(audio), language))
+        seconds = math.ceil(len(audio) / SAMPLE_RATE)
+        segments = [
+            {"start": i, "end": i + 1, "text": " מילה"} for i in range(seconds)
+        ]
+        return {"text": " מילה" * seconds, "language": language, "segments": segments}
+
+
+def test_mulaw_round_trip():
+    pcm = np.array([0, 100, -100, 1000, -1000, 30000, -30000], dtype=np.int16)
+    decoded = streaming.mulaw_decode(streaming.mulaw_encode(pcm))
+
+    # mu-law is lossy but keeps relative error small
+    assert np.all(np.abs(decoded - pcm) <= np.abs(pcm) * 0.05 + 8)
+
+
+def test_replayed_stream_produces_partials_and_final_transcript():
+    tone = (np.sin(np.arange(5 * 8000) / 10) * 8000).astype(np.int16)
+    messages = [json.loads(m) for m in streaming.media_stream_messages(tone)]
+    assert [m["event"] for m in messages[:2]] == ["connected", "start"]
+    assert messages[-1]["event"] == "stop"
+
+    backend = OneWordPerSecondBackend()
+    session = streaming.MediaStreamSession(
+        org_id=1,
+        call_sid=messages[1]["start"]["callSid"],
+        stream_sid=messages[1]["streamSid"],
+        service=TranscriptionService(backend=backend),
+        extractor=IncrementalExtractor(llm=object()),
+    )
+
+    updates = []
+    for message in messages:
+        if message["event"] == "media":
+            update = session.handle_media(message["media"]["payload"])
+            if update:
+                updates.append(update)
+
+    text, confidence = session.transcriber.finish()
+
+    assert len(updates) == 2
+    assert updates[0]["partial"] == "מילה"
+    assert text.split() == ["מילה"] * 5
+    # Each decode only sees the uncommitted tail, never the whole call
+    assert max(samples for _, samples, _ in backend.calls) <= 3 * SAMPLE_RATE
+
+
+class ScriptedWebSocket:
+    """Feeds Media Streams messages to the route and records how it closed"""
+
+    def __init__(self, messages):
+        self.messages = list(messages)
+        self.headers = {}
+        self.closed = None
+
+    async def accept(self):
+        pass
+
+    async def receive_text(self):
+        return self.messages.pop(0)
+
+    async def close(self, code=1000, reason=None):
+        self.closed = code
+
+
+def start_message(custom_parameters):
+    return next(
+        m for m in streaming.media_stream_messages(
+            np.zeros(160, dtype=np.int16), custom_parameters=custom_parameters
+        )
+        if json.loads(m)["event"] == "start"
+    )
+
+
+def test_media_stream_requires_a_signed_org_token():
+    forged = ScriptedWebSocket([start_message({"orgId": "3"})])
+    asyncio.run(calls.twilio_media_stream(forged))
+    assert forged.closed == calls.WS_BAD_REQUEST
+
+    wrong = ScriptedWebSocket([start_message({"token": auth.create_token(7, 3, "owner", auth.ACCESS_TOKEN)})])
+    asyncio.run(calls.twilio_media_stream(wrong))
+    assert wrong.closed == calls.WS_UNAUTHORIZED
+
+
+
+class RecordingHub:
+    def __init__(self):
+        self.published = []
+        self.closed = []
+
+    async def publish(self, call_id, org_id, kind, payload):
+        self.published.append((call_id, kind))
+
+    async def close(self, call_id, org_id, payload=None):
+        self.closed.append((call_id, payload))
+
+
+def test_media_stream_closes_the_live_state_when_it_fails(db, monkeypatch):
+    db.add(Organization(id=3, name="Org"))
+    db.commit()
+    monkeypatch.setattr(deps, "SessionLocal", sessionmaker(bind=db.get_bind()))
+    hub = RecordingHub()
+    monkeypatch.setattr(calls, "live_updates", hub)
+
+    async def no_publish(*args):
+        pass
+
+    monkeypatch.setattr(calls, "publish_call_status_async", no_publish)
+
+    class DecoderCrashed(Exception):
+        pass
+
+    class BrokenSession(streaming.MediaStreamSession):
+        def __init__(self, *args):
+            super().__init__(*args, service=TranscriptionService(backend=FakeBackend()))
+
+        def handle_media(self, payload):
+            raise DecoderCrashed()
+
+    monkeypatch.setattr(streaming, "MediaStreamSession", BrokenSession)
+    token = auth.create_media_stream_token(3)
+    messages = [start_message({"token": token})] + [
+        m for m in streaming.media_stream_messages(np.zeros(160, dtype=np.int16))
+        if json.loads(m)["event"] == "media"
+    ]
+
+    with pytest.raises(DecoderCrashed):
+        asyncio.run(calls.twilio_media_stream(ScriptedWebSocket(messages)))
+
+    call = db.query(Call).one()
+    # Left TRANSCRIBING for the reaper; its live state is gone
+    assert call.status == CallStatusEnum.TRANSCRIBING
+    assert hub.closed == [(call.id, {"error": "stream ended"})]
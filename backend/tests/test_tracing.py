@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+from app import tracing
+from app.config import settings
+from app.services.outbox import enqueue_task, TASK_EXTRACT_INFO
+from app.services.transcribe import TranscriptionService
+from app.services.transcription_backends import FakeBackend
+
+
+@pytest.fixture(scope="module")
+def spans_file(tmp_path_factory):
+    path = tmp_path_factory.mktemp("traces") / "traces.jsonl"
+    mp = pytest.MonkeyPatch()
+    mp.setattr(settings, "otel_exporter", "file")
+    mp.setattr(settings, "otel_file_path", str(path))
+    # Another test may have installed the provider already (importing
+    # app.main does); the exporter is then added to it
+    provider = tracing.setup_tracing("smartagent-test", exporter=tracing._exporter())
+    yield provider, path
+    mp.undo()
+
+
+def read_spans(provider, path):
+    provider.force_flush()
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_transcription_spans_nest_under_one_trace(spans_file):
+    provider, path = spans_file
+    fast = {
+        "text": " שלום ???",
+        "language": "he",
+        "segments": [
+            {"start": 0, "end": 2, "text": " שלום", "avg_logprob": -0.1},
+            {"start": 2, "end": 4, "text": " ???", "avg_logprob": -3.0},
+            {"start": 4, "end": 6, "text": " תודה", "avg_logprob": -0.1},
+        ],
+    }
+    backend = FakeBackend({"tiny": fast, "small": {"text": " מזגן", "segments": []}})
+
+    TranscriptionService(backend=backend).transcribe_from_file("call.mp3", org_id=3)
+
+    spans = read_spans(provider, path)
+    (root,) = [s for s in spans if s["name"] == "transcription"]
+    assert root["attributes"]["transcription.tier"] == "escalated"
+    inference = [s for s in spans if s["name"] == "whisper.inference"]
+    assert [s["attributes"]["whisper.model"] for s in inference] == ["tiny", "small"]
+    assert {s["context"]["trace_id"] for s in inference} == {root["context"]["trace_id"]}
+    assert all(s["parent_id"] == root["context"]["span_id"] for s in inference)
+
+
+def test_outbox_messages_carry_the_trace_context(spans_file):
+    tracer = tracing.get_tracer(__name__)
+    with tracer.start_as_current_span("webhook") as span:
+        message = enqueue_task(_NoSession(), TASK_EXTRACT_INFO, 1)
+        trace_id = format(span.get_span_context().trace_id, "032x")
+
+    traceparent = message.options["headers"]["traceparent"]
+    assert traceparent.split("-")[1] == trace_id
+
+
+class _NoSession:
+    def add(self, obj):
+        pass
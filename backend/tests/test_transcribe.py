@@ -0,0 +1,93 @@
+import json
+
+import pytest
+from app.services import transcribe
+from app.services.transcribe import TranscriptionService
+from app.config import settings
+from app.services.transcription_backends import FakeBackend, StubBackend, get_backend
+
+
+def make_service(fast_result, accurate_result):
+    backend = FakeBackend({"tiny": fast_result, "small": accurate_result})
+    return TranscriptionService(backend=backend), backend
+
+
+def test_confident_call_stays_on_fast_tier():
+    fast = {
+        "text": " שלום, המזגן לא מקרר",
+        "language": "he",
+        "segments": [{"start": 0, "end": 3, "text": " שלום, המזגן לא מקרר"}],
+    }
+    service, backend = make_service(fast, {"text": "", "segments": []})
+
+    text, confidence, tier = service.transcribe_from_file("call.mp3")
+
+    assert tier == transcribe.TIER_FAST
+    assert text == "שלום, המזגן לא מקרר"
+    assert [call[0] for call in backend.calls] == ["tiny"]
+
+
+def test_only_weak_segments_are_escalated():
+    fast = {
+        "text": " שלום המזגן",
+        "language": "he",
+        "segments": [
+            {"start": 0, "end": 2, "text": " שלום", "avg_logprob": -0.1},
+            {"start": 2, "end": 4, "text": " המזגן", "avg_logprob": -0.1},
+            {"start": 4, "end": 6, "text": " ???", "avg_logprob": -3.0},
+        ],
+    }
+    accurate = {"text": " לא מקרר", "segments": [{"avg_logprob": -0.2}]}
+    service, backend = make_service(fast, accurate)
+
+    text, confidence, tier = service.transcribe_from_file("call.mp3")
+
+    assert tier == transcribe.TIER_ESCALATED
+    assert text == "שלום המזגן לא מקרר"
+    # Only the 2-second weak clip went to the larger model
+    assert backend.calls[1:] == [("small", 32000, "he")]
+
+
+def test_wrong_language_reruns_whole_call():
+    fast = {"text": " hello", "language": "en", "segments": []}
+    accurate = {"text": " שלום", "segments": []}
+    service, backend = make_service(fast, accurate)
+
+    text, confidence, tier = service.transcribe_from_file("call.mp3")
+
+    assert tier == transcribe.TIER_ACCURATE
+    assert text == "שלום"
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        get_backend("nope")
+
+
+def write_recording(tmp_path, seconds, text):
+    path = tmp_path / "call.json"
+    path.write_text(json.dumps({"seconds": seconds, "text": text}, ensure_ascii=False))
+    return str(path)
+
+
+def test_stub_backend_returns_the_recording_text(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "transcription_stub_rtf_scale", 0.0)
+    path = write_recording(tmp_path, 60, "שלום. המזגן לא מקרר.\nאפשר מחר?")
+    service = TranscriptionService(backend=StubBackend(seed=1))
+
+    text, confidence, tier = service.transcribe_from_file(path)
+
+    assert tier == transcribe.TIER_FAST
+    assert text == "שלום. המזגן לא מקרר. אפשר מחר?"
+
+
+def test_stub_backend_weak_segments_escalate_with_their_text(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "transcription_stub_rtf_scale", 0.0)
+    monkeypatch.setattr(settings, "transcription_stub_weak_ratio", 1.0)
+    path = write_recording(tmp_path, 30, "שלום. המזגן לא מקרר.")
+    service = TranscriptionService(backend=StubBackend(seed=1))
+
+    text, confidence, tier = service.transcribe_from_file(path)
+
+    assert tier in (transcribe.TIER_ESCALATED, transcribe.TIER_ACCURATE)
+    assert text == "שלום. המזגן לא מקרר."
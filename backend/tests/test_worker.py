@@ -0,0 +1,116 @@
+import importlib
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import fakeredis
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app import metrics, redis_client
+from app.models import Call, CallStatusEnum, Organization, OutboxMessage, Transcript
+from app.services import failures
+from app.services.errors import PermanentServiceError, TransientServiceError
+from app.services.transcribe import transcription_service
+
+WORKER_DIR = Path(__file__).resolve().parents[2] / "worker"
+
+
+@pytest.fixture(scope="module")
+def worker_main():
+    # The worker runs from its own directory: `main`, `tasks`, `celeryconfig`
+    sys.path.insert(0, str(WORKER_DIR))
+    try:
+        yield importlib.import_module("main")
+    finally:
+        sys.path.remove(str(WORKER_DIR))
+
+
+def test_worker_entrypoint_shares_the_services_metrics(worker_main):
+    # The services record into app.metrics; the worker must not load a copy
+    importlib.import_module("app.services.transcribe")
+    importlib.import_module("app.services.extract")
+
+    assert worker_main.metrics is metrics
+    assert "backend.app.metrics" not in sys.modules
+
+
+@pytest.fixture
+def tasks(worker_main, db, monkeypatch):
+    module = importlib.import_module("tasks")
+    monkeypatch.setattr(module, "SessionLocal", sessionmaker(bind=db.get_bind()))
+    monkeypatch.setattr(module.transcribe_call, "max_retries", 2)
+    monkeypatch.setattr(redis_client, "_client", fakeredis.FakeRedis())
+    return module
+
+
+@pytest.fixture
+def call(db):
+    db.add(Organization(id=1, name="Org"))
+    call = Call(
+        org_id=1,
+        status=CallStatusEnum.PENDING_TRANSCRIPTION,
+        audio_url="s3://calls/1.mp3",
+        queued_at=datetime.utcnow(),
+    )
+    db.add(call)
+    db.commit()
+    return call
+
+
+def transcribe_raising(monkeypatch, *errors):
+    """Make transcription raise `errors` in turn, then succeed"""
+    attempts = []
+
+    def transcribe_from_url(url, org_id=None):
+        attempts.append(url)
+        if len(attempts) <= len(errors):
+            raise errors[len(attempts) - 1]
+        return "המזגן לא מקרר", 0.9, "small"
+
+    monkeypatch.setattr(transcription_service, "transcribe_from_url", transcribe_from_url)
+    return attempts
+
+
+def outcomes():
+    return {(c["cause"], c["outcome"]): c["count"] for c in failures.failure_counts()}
+
+
+def test_transient_failure_is_retried_until_it_succeeds(tasks, db, call, monkeypatch):
+    attempts = transcribe_raising(monkeypatch, TransientServiceError("s3_timeout"))
+
+    result = tasks.transcribe_call.apply(args=[call.id])
+
+    assert result.successful()
+    assert len(attempts) == 2
+    db.refresh(call)
+    assert call.status == CallStatusEnum.EXTRACTING
+    assert db.query(Transcript).count() == 1
+    assert db.query(OutboxMessage).one().args == [db.query(Transcript).one().id]
+    assert outcomes() == {("s3_timeout", "retry"): 1}
+
+
+def test_transient_failure_fails_the_call_once_retries_run_out(tasks, db, call, monkeypatch):
+    attempts = transcribe_raising(monkeypatch, *[TransientServiceError("s3_timeout")] * 5)
+
+    result = tasks.transcribe_call.apply(args=[call.id])
+
+    assert result.failed() and isinstance(result.result, TransientServiceError)
+    # The first run and max_retries retries
+    assert len(attempts) == 3
+    db.refresh(call)
+    assert call.status == CallStatusEnum.FAILED
+    assert outcomes() == {("s3_timeout", "retry"): 2, ("s3_timeout", "exhausted"): 1}
+
+
+def test_permanent_failure_is_not_retried(tasks, db, call, monkeypatch):
+    attempts = transcribe_raising(monkeypatch, PermanentServiceError("audio_decode"))
+
+    result = tasks.transcribe_call.apply(args=[call.id])
+
+    assert result.failed()
+    assert len(attempts) == 1
+    db.refresh(call)
+    assert call.status == CallStatusEnum.FAILED
+    assert call.claimed_at is not None
+    assert outcomes() == {("audio_decode", "permanent"): 1}
@@ -5,3 +5,40 @@ accept_content = ["json"]
 result_serializer = "json"
 timezone = "Asia/Jerusalem"
 enable_utc = True
+
+# Hard limit well below the TRANSCRIBING SLA, so the reaper never resumes a
+# call that is still being worked on
+task_time_limit = 1200
+
+beat_schedule = {
+    "reap-stuck-calls": {
+        "task": "tasks.reap_stuck_calls",
+        "schedule": 60.0,
+    },
+    "dispatch-deferred-calls": {
+        "task": "tasks.dispatch_deferred_calls",
+        "schedule": 5.0,
+    },
+    "promote-waiting-calls": {
+        "task": "tasks.promote_waiting_calls",
+        "schedule": 30.0,
+    },
+}
+
+# Priority queues on the Redis transport: 0 is served first. Messages
+# without a priority must not land in the top queue, and workers prefetch a
+# single task so a newly arrived urgent call is not stuck behind a buffer.
+broker_transport_options = {
+    "priority_steps": [0, 3, 6],
+    "sep": ":",
+    "queue_order_strategy": "priority",
+}
+task_default_priority = 6
+worker_prefetch_multiplier = 1
+
+# Each pipeline stage has its own queue so transcription nodes can be
+# scaled separately (celery worker -Q transcription)
+task_routes = {
+    "tasks.transcribe_call": {"queue": "transcription"},
+    "tasks.extract_info": {"queue": "extraction"},
+}
@@ -1,5 +1,92 @@
+import os
+import time
+
 from celery import Celery
+from celery.signals import (
+    celeryd_init,
+    setup_logging,
+    task_postrun,
+    task_prerun,
+    worker_process_init,
+    worker_process_shutdown,
+)
+
+# Imported as `app.*`, the path the services use themselves - under a second
+# name each module would load twice, registering its metrics twice
+from app import logging as app_logging
+from app import metrics, tracing
+from app.config import settings
+from app.services.priority import install_flag_invalidation_hooks
+from app.services.response_cache import install_invalidation_hooks
 
 app = Celery("worker", broker="redis://redis:6379/0")
 app.config_from_object("celeryconfig")
 app.autodiscover_tasks(["tasks"])
+
+# Pipeline writes (status changes, new jobs) invalidate the API's cached responses
+# and the cached customer flags calls are prioritized by
+install_invalidation_hooks()
+install_flag_invalidation_hooks()
+
+_correlation_tokens = {}
+_task_started = {}
+
+
+@setup_logging.connect
+def configure_logging(**kwargs):
+    # Connecting to this signal stops Celery from installing its own handlers
+    app_logging.setup_logging()
+
+
+@celeryd_init.connect
+def start_metrics_server(**kwargs):
+    # In the main process, before the pool forks
+    metrics.start_worker_metrics_server(settings.worker_metrics_port)
+
+
+@worker_process_shutdown.connect
+def release_process_metrics(pid=None, **kwargs):
+    metrics.mark_process_dead(pid or os.getpid())
+
+
+@worker_process_init.connect
+def configure_tracing(**kwargs):
+    # Per pool process - the exporter thread does not survive a fork
+    from opentelemetry.instrumentation.celery import CeleryInstrumentor
+    from tasks import engine
+
+    tracing.setup_tracing("smartagent-worker")
+    tracing.instrument_libraries(engine)
+    CeleryInstrumentor().instrument()
+
+
+@task_prerun.connect
+def bind_correlation_id(task_id=None, task=None, **kwargs):
+    """Log a task under the correlation ID of the request that enqueued it"""
+    correlation_id = (
+        task.request.get("correlation_id")
+        or (task.request.headers or {}).get("correlation_id")
+        or app_logging.new_correlation_id()
+    )
+    _correlation_tokens[task_id] = app_logging.set_correlation_id(correlation_id)
+
+
+@task_postrun.connect
+def unbind_correlation_id(task_id=None, **kwargs):
+    token = _correlation_tokens.pop(task_id, None)
+    if token is not None:
+        app_logging.reset_correlation_id(token)
+
+
+@task_prerun.connect
+def start_task_timer(task_id=None, **kwargs):
+    _task_started[task_id] = time.perf_counter()
+
+
+@task_postrun.connect
+def observe_task_duration(task_id=None, task=None, state=None, **kwargs):
+    started = _task_started.pop(task_id, None)
+    if started is not None:
+        metrics.TASK_DURATION.labels(task.name, state or "UNKNOWN").observe(
+            time.perf_counter() - started
+        )
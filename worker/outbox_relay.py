@@ -0,0 +1,48 @@
+"""
+Outbox relay - publishes staged Celery tasks to the broker
+מעביר משימות מהתור היוצא אל ה-broker
+
+Run alongside the workers:
+    python outbox_relay.py
+"""
+
+import time
+from datetime import timedelta
+
+from main import app as celery_app
+from tasks import SessionLocal
+from app.logging import get_logger, setup_logging
+
+logger = get_logger(__name__)
+
+PURGE_INTERVAL_SECONDS = 3600
+
+
+def run():
+    from app.config import settings
+    from app.services.outbox import relay_batch, purge_published
+
+    last_purge = 0.0
+    while True:
+        db = SessionLocal()
+        try:
+            published = relay_batch(db, celery_app, settings.outbox_relay_batch_size)
+
+            if time.monotonic() - last_purge > PURGE_INTERVAL_SECONDS:
+                purge_published(db, timedelta(days=settings.outbox_retention_days))
+                last_purge = time.monotonic()
+        except Exception as e:
+            db.rollback()
+            logger.exception("Outbox relay error: %s", e)
+            published = 0
+        finally:
+            db.close()
+
+        # A full batch means there is a backlog - keep draining without sleeping
+        if published < settings.outbox_relay_batch_size:
+            time.sleep(settings.outbox_relay_poll_seconds)
+
+
+if __name__ == "__main__":
+    setup_logging()
+    run()
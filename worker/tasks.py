@@ -1,7 +1,14 @@
 from celery import shared_task
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy import create_engine
+from app.config import settings
+from app.logging import get_logger
+# The same class the services raise - under a second import path autoretry
+# would never match it
+from app.services.errors import TransientServiceError
+from datetime import datetime
 import os
+import time
 
 
 # Database connection
@@ -9,62 +16,229 @@ DATABASE_URL = os.getenv("DATABASE_URL", "postgresql://smart:agent@db:5432/smart
 engine = create_engine(DATABASE_URL)
 SessionLocal = sessionmaker(bind=engine)
 
+logger = get_logger(__name__)
 
-@shared_task
-def transcribe_call(call_id):
+# Transient errors are retried with exponential backoff and jitter; anything
+# else fails the task immediately
+RETRY_POLICY = {
+    "autoretry_for": (TransientServiceError,),
+    "retry_backoff": True,
+    "retry_backoff_max": settings.task_retry_backoff_max_seconds,
+    "retry_jitter": True,
+    "max_retries": settings.task_max_retries,
+}
+
+
+def _handle_failure(task, db, call, error, retry_status=None):
+    """Record a failure and mark the call FAILED once it will not be retried
+
+    When the task will be retried the call goes back to `retry_status`, so
+    the retry can claim it again.
+    """
+    from app.services.failures import record_failure
+    from app.services.events import publish_call_status
+    from app.models import CallStatusEnum
+
+    db.rollback()
+    will_retry = (
+        isinstance(error, TransientServiceError)
+        and task.request.retries < task.max_retries
+    )
+    record_failure(task.name, error, will_retry, org_id=call.org_id if call else None)
+
+    # The lookup itself may have failed, leaving no call to mark
+    if call is None:
+        return
+    status = call.status
+    if not will_retry:
+        call.status = CallStatusEnum.FAILED
+    else:
+        # Back in the queue: the reaper times it as waiting, not as held
+        call.claimed_at = None
+        call.queued_at = datetime.utcnow()
+        if retry_status is not None:
+            call.status = retry_status
+    db.commit()
+    if call.status != status:
+        publish_call_status(call.org_id, call.id, call.status)
+
+
+def _dispatch_next(db, lease):
+    """Hand a freed slot to the org's next parked call of the same stage"""
+    from app.services import fair_share
+
+    if not lease.admitted:
+        return
+    try:
+        db.rollback()
+        fair_share.dispatch_deferred(db, lease.stage, lease.org_id, 1)
+        db.commit()
+    except Exception as e:
+        # The periodic sweep picks the call up instead
+        db.rollback()
+        logger.warning("Could not dispatch a deferred %s call: %s", lease.stage, e)
+
+
+@shared_task(
+    bind=True,
+    name="tasks.transcribe_call",
+    rate_limit=settings.transcribe_rate_limit,
+    **RETRY_POLICY,
+)
+def transcribe_call(self, call_id):
     """Transcribe audio call and save transcript"""
-    from backend.app.services.transcribe import transcription_service
-    from backend.app.models import Call, Transcript, CallStatusEnum
+    from app.services.transcribe import transcription_service
+    from app.services.events import publish_call_status
+    from app.services.outbox import enqueue_task, TASK_EXTRACT_INFO
+    from app.services.priority import extraction_priority
+    from app.services import fair_share
+    from app.services.queue_metrics import record_arrival, record_service_time
+    from app.services.response_cache import mark_changed
+    from app.models import Call, Transcript, CallStatusEnum
 
     db = SessionLocal()
+    call = None
+    lease = None
     try:
-        # Get call
         call = db.query(Call).filter(Call.id == call_id).first()
-        if not call:
-            return {"error": "Call not found"}
+        if not call or call.status != CallStatusEnum.PENDING_TRANSCRIPTION:
+            return {"skipped": "Call not found or already claimed"}
+
+        # Over its fair share the org waits; the worker moves on
+        lease = fair_share.acquire(
+            fair_share.STAGE_TRANSCRIBE, call.org_id, call.organization.plan
+        )
+        if not lease.admitted:
+            fair_share.defer(call)
+            db.commit()
+            return {"deferred": lease.wait_seconds}
 
-        # Update status
-        call.status = CallStatusEnum.TRANSCRIBING
+        # Claim the call - a duplicate message (outbox redelivery, priority
+        # promotion) finds it no longer pending and does nothing
+        claimed = (
+            db.query(Call)
+            .filter(
+                Call.id == call_id,
+                Call.status == CallStatusEnum.PENDING_TRANSCRIPTION,
+            )
+            .update(
+                {
+                    Call.status: CallStatusEnum.TRANSCRIBING,
+                    Call.claimed_at: datetime.utcnow(),
+                    Call.deferred_at: None,
+                },
+                synchronize_session=False,
+            )
+        )
+        # Bulk updates bypass the session hooks
+        mark_changed(db, call.org_id, "calls")
         db.commit()
+        if not claimed:
+            return {"skipped": "Call not found or already claimed"}
+
+        db.refresh(call)
+        publish_call_status(call.org_id, call.id, call.status)
+        started = time.monotonic()
 
         # Transcribe audio
-        text, confidence = transcription_service.transcribe_from_url(call.audio_url)
+        text, confidence, tier = transcription_service.transcribe_from_url(
+            call.audio_url, org_id=call.org_id
+        )
 
         # Save transcript
         transcript = Transcript(
-            org_id=call.org_id, call_id=call.id, text=text, confidence=confidence
+            org_id=call.org_id,
+            call_id=call.id,
+            text=text,
+            confidence=confidence,
+            model_tier=tier,
         )
         db.add(transcript)
+        db.flush()
 
-        # Update call status
+        # Update call status and enqueue extraction in the same transaction
         call.status = CallStatusEnum.EXTRACTING
+        call.priority = extraction_priority(call.priority, text)
+        call.claimed_at = None
+        call.queued_at = datetime.utcnow()
+        enqueue_task(db, TASK_EXTRACT_INFO, transcript.id, priority=call.priority)
         db.commit()
+        record_service_time(fair_share.STAGE_TRANSCRIBE, time.monotonic() - started)
+        record_arrival(fair_share.STAGE_EXTRACT)
+        publish_call_status(call.org_id, call.id, call.status)
 
-        # Enqueue extraction task
-        extract_info.delay(transcript.id)
-
-        return {"transcript_id": transcript.id, "confidence": float(confidence)}
+        return {
+            "transcript_id": transcript.id,
+            "confidence": float(confidence),
+            "model_tier": tier,
+        }
 
     except Exception as e:
-        call.status = CallStatusEnum.FAILED
-        db.commit()
-        return {"error": str(e)}
+        _handle_failure(
+            self, db, call, e, retry_status=CallStatusEnum.PENDING_TRANSCRIPTION
+        )
+        raise
     finally:
+        if lease is not None:
+            lease.release()
+            _dispatch_next(db, lease)
         db.close()
 
 
-@shared_task
-def extract_info(transcript_id):
+@shared_task(
+    bind=True,
+    name="tasks.extract_info",
+    rate_limit=settings.extract_rate_limit,
+    **RETRY_POLICY,
+)
+def extract_info(self, transcript_id):
     """Extract structured information from transcript using LLM"""
-    from backend.app.services.extract import llm_service
-    from backend.app.models import Transcript, Extraction, Call, CallStatusEnum
+    from app.services.extract import llm_service
+    from app.services.events import publish_call_status
+    from app.services.outbox import (
+        enqueue_task,
+        TASK_CREATE_APPOINTMENT,
+        TASK_SEND_CONFIRMATION,
+    )
+    from app.services import fair_share
+    from app.services.queue_metrics import record_service_time
+    from app.metrics import EXTRACTION_CONFIDENCE
+    from app.models import Transcript, Extraction, Call, CallStatusEnum
 
     db = SessionLocal()
+    call = None
+    lease = None
     try:
         # Get transcript
         transcript = db.query(Transcript).filter(Transcript.id == transcript_id).first()
         if not transcript:
             return {"error": "Transcript not found"}
+        call = db.query(Call).filter(Call.id == transcript.call_id).first()
+
+        # A duplicate message for an already extracted call does nothing
+        already_extracted = (
+            db.query(Extraction.id)
+            .filter(
+                Extraction.call_id == transcript.call_id,
+                Extraction.created_at >= transcript.created_at,
+            )
+            .first()
+        )
+        if already_extracted:
+            return {"skipped": "Already extracted", "extraction_id": already_extracted.id}
+
+        lease = fair_share.acquire(
+            fair_share.STAGE_EXTRACT, call.org_id, call.organization.plan
+        )
+        if not lease.admitted:
+            fair_share.defer(call)
+            db.commit()
+            return {"deferred": lease.wait_seconds}
+        # From here the reaper times the call against the extraction SLA
+        call.claimed_at = datetime.utcnow()
+        call.deferred_at = None
+        db.commit()
+        started = time.monotonic()
 
         # Extract information using LLM
         extraction_result = llm_service.extract_information(transcript.text)
@@ -73,47 +247,102 @@ def extract_info(transcript_id):
         extraction = Extraction(
             org_id=transcript.org_id,
             call_id=transcript.call_id,
-            extracted_data=extraction_result.dict(),
+            extracted_data=extraction_result.model_dump(),
             summary_he=extraction_result.free_text_summary_he,
             confidence=extraction_result.confidence,
         )
         db.add(extraction)
+        db.flush()
 
         # Update call status
-        call = db.query(Call).filter(Call.id == transcript.call_id).first()
         call.status = CallStatusEnum.COMPLETED
-        db.commit()
 
+        # Follow-ups are enqueued through the outbox, in the same transaction
         # If appointment info exists, create appointment
         if extraction_result.appointment and extraction_result.appointment.date:
-            create_appointment_from_extraction.delay(extraction.id)
+            enqueue_task(db, TASK_CREATE_APPOINTMENT, extraction.id)
 
         # Send confirmation message if customer phone exists
         if extraction_result.customer and extraction_result.customer.phone:
-            send_confirmation_message.delay(extraction.id)
+            enqueue_task(db, TASK_SEND_CONFIRMATION, extraction.id)
+
+        db.commit()
+        record_service_time(fair_share.STAGE_EXTRACT, time.monotonic() - started)
+        EXTRACTION_CONFIDENCE.observe(extraction_result.confidence or 0.0)
+        publish_call_status(call.org_id, call.id, call.status)
 
         return {"extraction_id": extraction.id}
 
     except Exception as e:
-        return {"error": str(e)}
+        _handle_failure(self, db, call, e)
+        raise
     finally:
+        if lease is not None:
+            lease.release()
+            _dispatch_next(db, lease)
         db.close()
 
 
-@shared_task
+@shared_task(name="tasks.create_appointment_from_extraction")
 def create_appointment_from_extraction(extraction_id):
     """Create appointment from extraction data"""
     # Implementation for appointment creation and calendar sync
     pass
 
 
-@shared_task
+@shared_task(name="tasks.send_confirmation_message")
 def send_confirmation_message(extraction_id):
     """Send SMS/WhatsApp confirmation to customer"""
     # Implementation for message sending
     pass
 
 
+@shared_task(name="tasks.reap_stuck_calls")
+def reap_stuck_calls():
+    """Resume calls stuck in a status past their SLA (Celery beat)"""
+    from app.services.reaper import reap_stuck_calls as reap
+    from app.services.events import publish_call_status
+
+    db = SessionLocal()
+    try:
+        resumed = reap(db)
+    finally:
+        db.close()
+
+    for org_id, call_id, status in resumed:
+        publish_call_status(org_id, call_id, status)
+
+    return {"resumed": len(resumed)}
+
+
+@shared_task(name="tasks.dispatch_deferred_calls")
+def dispatch_deferred_calls():
+    """Enqueue calls parked by fair share that their org has room for (Celery beat)"""
+    from app.services.fair_share import dispatch_deferred_calls as dispatch
+
+    db = SessionLocal()
+    try:
+        dispatched = dispatch(db)
+    finally:
+        db.close()
+
+    return {"dispatched": sum(len(call_ids) for _, _, call_ids in dispatched)}
+
+
+@shared_task(name="tasks.promote_waiting_calls")
+def promote_waiting_calls():
+    """Raise the priority of calls that waited too long (Celery beat)"""
+    from app.services.priority import promote_waiting_calls as promote
+
+    db = SessionLocal()
+    try:
+        promoted = promote(db)
+    finally:
+        db.close()
+
+    return {"promoted": len(promoted)}
+
+
 @shared_task
 def sync_calendar_events():
     """Sync appointments with external calendars"""